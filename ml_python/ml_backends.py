@@ -0,0 +1,191 @@
+# AgriSmart Python ML System
+# Pluggable model backends
+#
+# A backend builds the yield, crop-conditioned yield and recommendation models.
+# 'random_forest' is the original system: forests on StandardScaler-transformed
+# features, with yield uncertainty from the spread across trees.
+# 'hist_gradient_boosting' fits HistGradientBoostingRegressor / Classifier on
+# the raw features, splitting natively on state, district and crop instead of
+# treating their label codes as ordered numbers. Its yield uncertainty comes
+# from quantile-loss models fitted next to the mean model.
+# scikit-learn is imported only when a model is built.
+
+from statistics import NormalDist
+
+import numpy as np
+
+BACKENDS = ('random_forest', 'hist_gradient_boosting')
+DEFAULT_BACKEND = 'random_forest'
+
+# Model names reported in prediction results and training stats
+ALGORITHMS = {
+    'random_forest': {
+        'name': 'Random Forest (Scikit-learn)',
+        'yield': 'Random Forest Regressor',
+        'recommendation': 'Random Forest Classifier'
+    },
+    'hist_gradient_boosting': {
+        'name': 'Histogram Gradient Boosting (Scikit-learn)',
+        'yield': 'Histogram Gradient Boosting Regressor',
+        'recommendation': 'Histogram Gradient Boosting Classifier'
+    }
+}
+
+# Default gradient-boosting hyperparameters (the forest defaults live in ml_predictor)
+BOOSTING_YIELD_PARAMS = {
+    'max_iter': 200,
+    'learning_rate': 0.05,
+    'max_leaf_nodes': 31,
+    'min_samples_leaf': 20,
+    'l2_regularization': 1.0,
+    'early_stopping': True  # Stop adding trees once a held-out 10% stops improving
+}
+BOOSTING_RECOMMENDATION_PARAMS = {
+    'max_iter': 100,
+    'learning_rate': 0.1,
+    'max_leaf_nodes': 15,
+    'min_samples_leaf': 20,
+    'l2_regularization': 1.0,
+    'early_stopping': True
+}
+
+# HistGradientBoosting bins categories; columns with more labels than this are
+# split as ordered codes instead
+MAX_NATIVE_CATEGORIES = 255
+
+
+def check_backend(backend):
+    """Validated backend name"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend: {backend} (choose from {', '.join(BACKENDS)})")
+    return backend
+
+
+def scales_inputs(backend):
+    """Whether the backend's models take StandardScaler-transformed features"""
+    return backend == 'random_forest'
+
+
+def has_tree_spread(backend):
+    """Whether yield models are forests whose individual trees can be read out"""
+    return backend == 'random_forest'
+
+
+def memory_maps_well(backend):
+    """
+    Whether bundles of the backend should be loaded memory-mapped. Forests hold
+    a few node arrays per tree; boosted ensembles thousands of small
+    per-iteration arrays, each of which would keep a file descriptor open.
+    """
+    return backend == 'random_forest'
+
+
+def native_categoricals(cardinalities):
+    """
+    Column indices to split as categories, from {column: number of labels}.
+    Columns above MAX_NATIVE_CATEGORIES keep ordinal splits (with a note).
+    """
+    columns = []
+    for column, count in cardinalities.items():
+        if count <= MAX_NATIVE_CATEGORIES:
+            columns.append(column)
+        else:
+            print(f"Column {column} has {count} labels (over {MAX_NATIVE_CATEGORIES}); using ordinal splits")
+    return columns
+
+
+def default_params(backend):
+    """{'yield': {...}, 'crop_yield': {...}, 'recommendation': {...}} hyperparameters for a non-forest backend"""
+    if backend == 'hist_gradient_boosting':
+        return {'yield': dict(BOOSTING_YIELD_PARAMS), 'crop_yield': dict(BOOSTING_YIELD_PARAMS),
+                'recommendation': dict(BOOSTING_RECOMMENDATION_PARAMS)}
+    raise ValueError(f"No default parameters for backend: {backend}")
+
+
+def make_regressor(backend, params, categorical, quantiles):
+    """Unfitted yield model; `quantiles` are the uncertainty quantiles to report"""
+    if backend == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(**params, random_state=42, n_jobs=-1)
+    return BoostedYieldModel(params, categorical, quantiles)
+
+
+def stratified_holdout_fits(y, fraction):
+    """
+    Whether a stratified `fraction` holdout of the labels y (as early stopping
+    uses) can give every class a row on both sides: each class needs two rows
+    and each side at least one row per class.
+    """
+    _, counts = np.unique(y, return_counts=True)
+    n_holdout = int(np.ceil(fraction * len(y)))
+    return counts.min() >= 2 and len(counts) <= min(n_holdout, len(y) - n_holdout)
+
+
+def make_classifier(backend, params, categorical, y=None):
+    """
+    Unfitted crop recommendation model. With the training labels y, boosting
+    early stopping is turned off when its stratified holdout cannot be drawn
+    (small data with many crops).
+    """
+    if backend == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**params, random_state=42, n_jobs=-1)
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    if y is not None and params.get('early_stopping') and \
+            not stratified_holdout_fits(y, params.get('validation_fraction', 0.1)):
+        print("Too few rows per crop for an early-stopping holdout; fitting all iterations")
+        params = {**params, 'early_stopping': False}
+    return HistGradientBoostingClassifier(**params, categorical_features=categorical or None, random_state=42)
+
+
+class BoostedYieldModel:
+    """
+    Gradient-boosted yield regressor with a squared-error model for the point
+    prediction and one quantile-loss model per reported quantile. The spread
+    is the normal-equivalent standard deviation of the outer quantiles.
+    """
+
+    def __init__(self, params, categorical, quantiles):
+        self.params = dict(params)
+        self.categorical = list(categorical)
+        self.quantiles = tuple(quantiles)
+        self.mean_model = None
+        self.quantile_models = []
+
+    def _model(self, **loss):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(**self.params, **loss, categorical_features=self.categorical or None,
+                                             random_state=42)
+
+    def fit(self, X, y):
+        self.mean_model = self._model().fit(X, y)
+        self.quantile_models = [self._model(loss='quantile', quantile=q).fit(X, y) for q in self.quantiles]
+        return self
+
+    @property
+    def n_features_in_(self):
+        return self.mean_model.n_features_in_
+
+    def predict(self, X):
+        return self.mean_model.predict(X)
+
+    def distribution(self, X):
+        """Point prediction, standard deviation and (n_quantiles, n_rows) quantiles"""
+        predicted = self.mean_model.predict(X)
+        # Independently fitted quantile models can cross; sort them per row
+        quantiles = np.sort(np.stack([model.predict(X) for model in self.quantile_models]), axis=0)
+        z = NormalDist().inv_cdf
+        spread = z(self.quantiles[-1]) - z(self.quantiles[0])
+        std_dev = (quantiles[-1] - quantiles[0]) / spread if spread > 0 else np.zeros(len(predicted))
+        return {'predicted': predicted, 'std_dev': std_dev, 'quantiles': quantiles}
+
+
+def print_comparison(rows):
+    """Backend comparison rows as a plain-text table"""
+    print(f"\n{'backend':<24} {'size_kb':>8} {'fit_s':>7} {'load_ms':>8} {'yield_ms':>9} {'rec_ms':>7} "
+          f"{'batch_rows_s':>12} {'yield_r2':>9} {'crop_r2':>8} {'accuracy':>8}")
+    for row in rows:
+        print(f"{row['backend']:<24} {row['model_bytes'] / 1024:8.0f} {row['fit_seconds']:7.2f} "
+              f"{row['load_ms']:8.1f} {row['predict_yield_ms']:9.2f} {row['recommend_crops_ms']:7.2f} "
+              f"{row['batch_rows_per_second']:12.0f} {row['yield_r2']:9.3f} {row['crop_yield_r2']:8.3f} "
+              f"{row['crop_accuracy']:8.3f}")
@@ -0,0 +1,179 @@
+# AgriSmart Python ML System
+# Dynamic micro-batching scheduler
+#
+# Concurrent single-row predict_yield / recommend_crops requests are queued on
+# an asyncio event loop (in its own thread) and merged into one batch call per
+# command. A batch is formed as soon as a worker slot is free: it takes
+# everything already queued, then waits at most max_wait for more rows, up to
+# max_batch_size. While every worker is busy, new requests simply accumulate,
+# so batches grow with load and an idle scheduler adds at most max_wait.
+# Batches run on a thread pool (sklearn releases the GIL while predicting), and
+# each caller gets its own row of the batch result. If a batch call raises, its
+# rows are retried one at a time so the failure reaches only its own caller.
+
+import asyncio
+import threading
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+
+BATCHED_COMMANDS = ('predict_yield', 'recommend_crops')
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+DEFAULT_BATCH_WORKERS = 2
+
+
+class MicroBatcher:
+    """
+    predictor_source: callable returning the predictor to use for the next
+    batch (lets a server swap predictors on reload).
+
+    Thread-safe entry point: submit() -> concurrent.futures.Future.
+    asyncio entry point: await predict() from any event loop.
+    """
+
+    def __init__(self, predictor_source, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, workers=DEFAULT_BATCH_WORKERS):
+        self.predictor_source = predictor_source
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='agrismart-batch')
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='agrismart-batcher', daemon=True)
+        self._queues = {}
+        self._slots = None
+        self._collectors = []
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.batch_seconds = 0.0
+
+    def start(self):
+        """Start the event loop thread and one collector per command"""
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+        return self
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _setup(self):
+        self._slots = asyncio.Semaphore(self.workers)
+        for command in BATCHED_COMMANDS:
+            self._queues[command] = asyncio.Queue()
+            self._collectors.append(asyncio.ensure_future(self._collect(command)))
+
+    def submit(self, command, data):
+        """Queue one request from any thread; the future resolves to its result"""
+        if command not in BATCHED_COMMANDS:
+            raise ValueError(f"Command is not batched: {command}")
+        if not isinstance(data, dict):
+            raise ValueError("Request data must be a JSON object")
+        return asyncio.run_coroutine_threadsafe(self._enqueue(command, data), self.loop)
+
+    async def predict(self, command, data):
+        """Awaitable form of submit() for asyncio callers"""
+        return await asyncio.wrap_future(self.submit(command, data))
+
+    async def _enqueue(self, command, data):
+        future = self.loop.create_future()
+        self._pending += 1
+        try:
+            await self._queues[command].put((data, future))
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def _collect(self, command):
+        """Form batches for one command whenever a worker slot is free"""
+        queue = self._queues[command]
+        while True:
+            # Rows keep queueing while this waits for a free worker
+            batch = [await queue.get()]
+            await self._slots.acquire()
+            deadline = self.loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.ensure_future(self._dispatch(command, batch))
+
+    async def _dispatch(self, command, batch):
+        """Run one batch on the thread pool and fan the rows back out"""
+        try:
+            method = getattr(self.predictor_source(), f'{command}_batch')
+            start = perf_counter()
+            try:
+                results = await self.loop.run_in_executor(self.executor, method, [data for data, _ in batch])
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                # One request's bad row must not fail the others: retry each alone
+                await self._dispatch_rows(method, batch)
+                return
+            elapsed = perf_counter() - start
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.batch_seconds += elapsed
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    async def _dispatch_rows(self, method, batch):
+        """Answer each row of a failed batch with its own result or error"""
+        for data, future in batch:
+            try:
+                [result] = await self.loop.run_in_executor(self.executor, method, [data])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """Batch counters for health output"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'workers': self.workers,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'mean_batch_ms': round(self.batch_seconds / self.batches * 1000, 3) if self.batches else 0.0
+            }
+
+    async def _drain(self):
+        while self._pending:
+            await asyncio.sleep(0.001)
+        for collector in self._collectors:
+            collector.cancel()
+
+    def close(self):
+        """Answer every queued request, then stop the loop and the workers"""
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,312 @@
+# AgriSmart Python ML System
+# Reproducible benchmark suite
+#
+# Trains on synthetic data at several scales and measures, for every scale:
+# training time, bundle size, and per command and inference mode the cold
+# start, single-row latency percentiles, batch throughput and peak RSS. Each
+# measurement runs in its own interpreter, so peak RSS and cold start are not
+# polluted by earlier phases. Results are plain JSON and can be compared with a
+# stored baseline to catch regressions.
+
+import os
+import sys
+import json
+import shutil
+import platform
+import tempfile
+import subprocess
+from time import perf_counter
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Training-set sizes benchmarked by default
+DEFAULT_SCALES = [1200, 5000, 20000]
+COMMANDS = ['predict_yield', 'recommend_crops', 'predict_crop_yields']
+INFERENCE_MODES = ['sklearn', 'compiled']
+
+# Single-row calls timed per command (after WARMUP_CALLS untimed ones)
+DEFAULT_REPEATS = 200
+WARMUP_CALLS = 5
+# Rows per batch call and number of timed batch calls
+BATCH_ROWS = 1000
+BATCH_REPEATS = 5
+# Seeds for the training data and for the benchmark inputs
+TRAINING_SEED = 42
+INPUT_SEED = 7
+
+# Machine-specific, so not committed: the first `benchmark --save-baseline` creates it
+BASELINE_PATH = os.path.join(HERE, 'benchmarks', 'baseline.json')
+# Relative slowdown tolerated before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Compared metrics and whether larger values are better
+COMPARED_METRICS = {
+    'train_s': False,
+    'model_bytes': False,
+    'cold_start_ms': False,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'rows_per_s': True,
+    'peak_rss_mb': False
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def directory_bytes(path):
+    """Total size of the files under path"""
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def benchmark_inputs(n, seed=INPUT_SEED):
+    """Reproducible prediction inputs spread over the synthetic data ranges"""
+    from ml_synthetic_data import STATES, DISTRICTS
+
+    rng = np.random.default_rng(seed)
+    return [{
+        'state': STATES[rng.integers(len(STATES))],
+        'district': DISTRICTS[rng.integers(len(DISTRICTS))],
+        'temperature': round(float(rng.uniform(15, 35)), 1),
+        'humidity': round(float(rng.uniform(40, 90)), 1),
+        'rainfall': round(float(rng.uniform(300, 2000)), 1),
+        'ph': round(float(rng.uniform(5.5, 8.0)), 1),
+        'nitrogen': round(float(rng.uniform(20, 150)), 1),
+        'phosphorus': round(float(rng.uniform(10, 80)), 1),
+        'potassium': round(float(rng.uniform(10, 80)), 1)
+    } for _ in range(n)]
+
+
+def _percentile_ms(seconds, q):
+    return round(float(np.percentile(seconds, q)) * 1000, 3)
+
+
+def _train_phase(model_dir, n_samples):
+    """Worker: train and save a bundle; returns timings and peak RSS"""
+    from ml_predictor import AgriSmartMLPredictor
+
+    predictor = AgriSmartMLPredictor(model_path=model_dir, inference='sklearn')
+    start = perf_counter()
+    df = predictor.create_synthetic_training_data(n_samples=n_samples, seed=TRAINING_SEED)
+    generate_s = perf_counter() - start
+
+    start = perf_counter()
+    predictor.train_models(training_data=df)
+    train_s = perf_counter() - start
+
+    return {
+        'generate_s': round(generate_s, 3),
+        'train_s': round(train_s, 3),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def _inference_phase(model_dir, command, inference, repeats):
+    """Worker: cold start, single-row latency and batch throughput of one command"""
+    start = perf_counter()
+    from ml_predictor import AgriSmartMLPredictor
+    import_ms = (perf_counter() - start) * 1000
+
+    # Cache disabled: every call measures the models, not a dictionary lookup
+    predictor = AgriSmartMLPredictor(model_path=model_dir, inference=inference, cache_size=0)
+    start = perf_counter()
+    predictor.ensure_models()
+    load_ms = (perf_counter() - start) * 1000
+
+    rows = benchmark_inputs(max(repeats, BATCH_ROWS))
+    method = getattr(predictor, command)
+    start = perf_counter()
+    method(rows[0])
+    first_ms = (perf_counter() - start) * 1000
+
+    for row in rows[1:1 + WARMUP_CALLS]:
+        method(row)
+    latencies = []
+    for row in rows[:repeats]:
+        start = perf_counter()
+        method(row)
+        latencies.append(perf_counter() - start)
+
+    # Batch throughput where the command has a batch form
+    rows_per_s = None
+    batch_method = getattr(predictor, f'{command}_batch', None)
+    if batch_method is not None:
+        batch = rows[:BATCH_ROWS]
+        batch_method(batch)
+        timings = []
+        for _ in range(BATCH_REPEATS):
+            start = perf_counter()
+            batch_method(batch)
+            timings.append(perf_counter() - start)
+        rows_per_s = round(len(batch) / min(timings), 1)
+
+    return {
+        'import_ms': round(import_ms, 1),
+        'load_ms': round(load_ms, 1),
+        'first_call_ms': round(first_ms, 1),
+        'cold_start_ms': round(import_ms + load_ms + first_ms, 1),
+        'p50_ms': _percentile_ms(latencies, 50),
+        'p95_ms': _percentile_ms(latencies, 95),
+        'p99_ms': _percentile_ms(latencies, 99),
+        'rows_per_s': rows_per_s,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def _run_worker(*args):
+    """Run one phase in a fresh interpreter and return its JSON report"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), *map(str, args)],
+                               cwd=HERE, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark phase {args[0]} failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(scales=None, commands=None, inference_modes=None, repeats=DEFAULT_REPEATS, work_dir=None):
+    """
+    Benchmark every scale x inference mode x command.
+    Returns the report: environment info plus one result row per measurement.
+    """
+    scales = scales or DEFAULT_SCALES
+    commands = commands or COMMANDS
+    inference_modes = inference_modes or INFERENCE_MODES
+    import sklearn
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='agrismart-bench-', dir=work_dir)
+    try:
+        for n_samples in scales:
+            model_dir = os.path.join(work_dir, f'models-{n_samples}')
+            print(f"Training on {n_samples} synthetic samples...")
+            train = _run_worker('train', model_dir, n_samples)
+            results.append({
+                'scale': n_samples,
+                'command': 'train_models',
+                'inference': None,
+                'model_bytes': directory_bytes(model_dir),
+                **train
+            })
+
+            for inference in inference_modes:
+                for command in commands:
+                    print(f"  {command} ({inference})...")
+                    measured = _run_worker('infer', model_dir, command, inference, repeats)
+                    results.append({'scale': n_samples, 'command': command, 'inference': inference, **measured})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'created': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__
+        },
+        'settings': {
+            'scales': scales,
+            'repeats': repeats,
+            'batch_rows': BATCH_ROWS,
+            'training_seed': TRAINING_SEED,
+            'input_seed': INPUT_SEED
+        },
+        'results': results
+    }
+
+
+def _result_key(row):
+    return (row['scale'], row['command'], row['inference'])
+
+
+def compare_with_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Per-metric change against a baseline report. A metric regresses when it is
+    worse than the baseline by more than `tolerance` (relative).
+    Returns a list of {scale, command, inference, metric, baseline, current, change, regression}.
+    """
+    previous = {_result_key(row): row for row in baseline.get('results', [])}
+    comparison = []
+    for row in report['results']:
+        old = previous.get(_result_key(row))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            current, reference = row.get(metric), old.get(metric)
+            if current is None or not reference:
+                continue
+            change = (current - reference) / reference
+            worse = -change if higher_is_better else change
+            comparison.append({
+                'scale': row['scale'],
+                'command': row['command'],
+                'inference': row['inference'],
+                'metric': metric,
+                'baseline': reference,
+                'current': current,
+                'change': round(change, 4),
+                'regression': worse > tolerance
+            })
+    return comparison
+
+
+def print_report(report):
+    """Results as a plain-text table, plus regressions if compared"""
+    print(f"\n{'scale':>6} {'command':<20} {'mode':<9} {'cold_ms':>8} {'p50_ms':>8} {'p95_ms':>8} "
+          f"{'p99_ms':>8} {'rows/s':>9} {'rss_mb':>7}")
+    for row in report['results']:
+        if row['command'] == 'train_models':
+            print(f"{row['scale']:>6} {'train_models':<20} {'-':<9} train {row['train_s']:.2f}s, "
+                  f"bundle {row['model_bytes'] / 1024 / 1024:.1f} MB, rss {row['peak_rss_mb']} MB")
+            continue
+        rows_per_s = f"{row['rows_per_s']:9.0f}" if row['rows_per_s'] else f"{'-':>9}"
+        print(f"{row['scale']:>6} {row['command']:<20} {row['inference']:<9} {row['cold_start_ms']:8.1f} "
+              f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {rows_per_s} "
+              f"{row['peak_rss_mb']!s:>7}")
+
+    regressions = [c for c in report.get('comparison', []) if c['regression']]
+    if 'comparison' in report:
+        print(f"\n{len(regressions)} regression(s) against baseline")
+        for c in regressions:
+            print(f"  {c['scale']} {c['command']} {c['inference'] or ''} {c['metric']}: "
+                  f"{c['baseline']} -> {c['current']} ({c['change']:+.0%})")
+
+
+def write_report(path, report):
+    """Save a report as JSON"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def _worker_main(args):
+    """Entry point of the per-phase interpreters"""
+    # Progress output from training goes to stderr; stdout carries the report
+    report_out = sys.stdout
+    sys.stdout = sys.stderr
+    if args[0] == 'train':
+        report = _train_phase(args[1], int(args[2]))
+    else:
+        report = _inference_phase(args[1], args[2], args[3], int(args[4]))
+    report_out.write(json.dumps(report) + '\n')
+
+
+if __name__ == '__main__':
+    _worker_main(sys.argv[1:])
@@ -0,0 +1,212 @@
+# AgriSmart Python ML System
+# Versioned model bundle storage
+#
+# Layout under the model directory:
+#   CURRENT                      -> name of the active bundle directory
+#   bundle-<version>/manifest.json
+#   bundle-<version>/<artifact>.joblib
+#   surfaces/<version>/          -> data derived from a bundle, pruned with it
+#
+# Bundles are written to a temporary directory and renamed into place, and
+# CURRENT is swapped with os.replace, so readers never see a half-written set.
+
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import joblib
+
+BUNDLE_FORMAT = 'agrismart-model-bundle'
+BUNDLE_FORMAT_VERSION = 1
+CURRENT_POINTER = 'CURRENT'
+MANIFEST_NAME = 'manifest.json'
+KEEP_BUNDLES = 3
+# Directories holding one <version> subdirectory per bundle (precomputed surfaces)
+VERSIONED_DIRS = ('surfaces',)
+
+
+class ModelBundleError(Exception):
+    """Raised when a model bundle is missing pieces, corrupt or unreadable"""
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    """Flush a directory entry to disk where the platform allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def current_bundle_path(model_dir):
+    """Path of the active bundle, or None if no bundle has been written yet"""
+    pointer = os.path.join(model_dir, CURRENT_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, 'r') as f:
+        name = f.read().strip()
+    if not name:
+        raise ModelBundleError(f"Empty bundle pointer: {pointer}")
+    return os.path.join(model_dir, name)
+
+
+def write_bundle(model_dir, artifacts, training_stats, extra_manifest=None):
+    """
+    Atomically write a new bundle and make it the active one.
+    artifacts: {name: object} - each is stored uncompressed so numpy arrays
+    can be memory-mapped on load.
+    Returns the bundle version string.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    version = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}"
+    tmp_dir = os.path.join(model_dir, f'.tmp-bundle-{version}')
+    final_dir = os.path.join(model_dir, f'bundle-{version}')
+    os.makedirs(tmp_dir)
+
+    try:
+        entries = {}
+        for name, obj in artifacts.items():
+            filename = f'{name}.joblib'
+            path = os.path.join(tmp_dir, filename)
+            joblib.dump(obj, path)
+            entries[name] = {
+                'file': filename,
+                'sha256': file_sha256(path),
+                'bytes': os.path.getsize(path)
+            }
+
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'format_version': BUNDLE_FORMAT_VERSION,
+            'version': version,
+            'created': datetime.now().isoformat(),
+            'artifacts': entries,
+            'training_stats': training_stats
+        }
+        manifest.update(extra_manifest or {})
+
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        _fsync_dir(tmp_dir)
+        os.rename(tmp_dir, final_dir)
+
+        # Swap the pointer last: readers see either the old or the new bundle
+        pointer_tmp = os.path.join(model_dir, f'.{CURRENT_POINTER}.{version}')
+        with open(pointer_tmp, 'w') as f:
+            f.write(os.path.basename(final_dir))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, os.path.join(model_dir, CURRENT_POINTER))
+        _fsync_dir(model_dir)
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    prune_bundles(model_dir, keep=KEEP_BUNDLES)
+    return version
+
+
+def read_manifest(bundle_path):
+    """Load and sanity-check a bundle manifest"""
+    manifest_path = os.path.join(bundle_path, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ModelBundleError(f"Unreadable bundle manifest {manifest_path}: {e}")
+
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ModelBundleError(f"Not a model bundle: {bundle_path}")
+    if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+        raise ModelBundleError(
+            f"Bundle format {manifest.get('format_version')} is newer than supported ({BUNDLE_FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def read_bundle(model_dir, required, mmap=True, verify=False, load=None):
+    """
+    Load the active bundle (only the artifacts named in `load`, default all).
+    Every file's size is checked against the manifest; verify=True also
+    re-hashes it (SHA-256), which can cost more than a memory-mapped load.
+    Returns (artifacts, manifest), or (None, None) if no bundle exists.
+    Raises ModelBundleError if the bundle is partial, truncated or any checksum differs.
+    """
+    bundle_path = current_bundle_path(model_dir)
+    if bundle_path is None:
+        return None, None
+    if not os.path.isdir(bundle_path):
+        raise ModelBundleError(f"Active bundle is missing: {bundle_path}")
+
+    manifest = read_manifest(bundle_path)
+    entries = manifest.get('artifacts', {})
+
+    missing = [name for name in required if name not in entries]
+    if missing:
+        raise ModelBundleError(f"Bundle {manifest.get('version')} is missing artifacts: {', '.join(missing)}")
+
+    artifacts = {}
+    for name, entry in entries.items():
+        if load is not None and name not in load:
+            continue
+        path = os.path.join(bundle_path, entry['file'])
+        if not os.path.exists(path):
+            raise ModelBundleError(f"Bundle file missing: {path}")
+        if os.path.getsize(path) != entry.get('bytes', os.path.getsize(path)):
+            raise ModelBundleError(f"Size mismatch for {path}")
+        if verify and file_sha256(path) != entry['sha256']:
+            raise ModelBundleError(f"Checksum mismatch for {path}")
+        try:
+            artifacts[name] = joblib.load(path, mmap_mode='r' if mmap else None)
+        except Exception as e:
+            raise ModelBundleError(f"Failed to load {path}: {e}")
+
+    return artifacts, manifest
+
+
+def prune_bundles(model_dir, keep=KEEP_BUNDLES):
+    """
+    Remove all but the newest `keep` bundles, never touching the active one,
+    together with their per-version directories (VERSIONED_DIRS)
+    """
+    active = current_bundle_path(model_dir)
+    bundles = sorted(
+        name for name in os.listdir(model_dir)
+        if name.startswith('bundle-') and os.path.isdir(os.path.join(model_dir, name))
+    )
+    for name in bundles[:-keep] if keep else bundles:
+        path = os.path.join(model_dir, name)
+        if active and os.path.abspath(path) == os.path.abspath(active):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+    # Also catches directories left behind by bundles pruned before this existed
+    for directory in VERSIONED_DIRS:
+        parent = os.path.join(model_dir, directory)
+        if not os.path.isdir(parent):
+            continue
+        for name in os.listdir(parent):
+            # <version>.tmp-<pid> is still being written for that version
+            version = name.split('.tmp-')[0]
+            if not os.path.isdir(os.path.join(model_dir, f'bundle-{version}')):
+                shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
@@ -0,0 +1,129 @@
+# AgriSmart Python ML System
+# Bounded prediction cache
+#
+# Keys are the command plus the encoded feature vector (after optional
+# per-feature quantization), so requests that differ only in how they spell
+# the same conditions share one entry. Entries expire after a TTL and the
+# least recently used entry is evicted once the cache is full. The predictor
+# clears the cache whenever its models change.
+
+import copy
+import threading
+from time import monotonic
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL = 3600.0
+
+
+def parse_quantization(spec, feature_columns):
+    """
+    Per-feature quantization steps from 'temperature=0.5,rainfall=10'.
+    Returns an array with one step per feature column (0 = exact).
+    """
+    steps = np.zeros(len(feature_columns))
+    if not spec:
+        return steps
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in feature_columns:
+            raise ValueError(f"Unknown feature for cache quantization: {name}")
+        steps[feature_columns.index(name)] = float(value)
+    return steps
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of prediction results.
+    max_size: entries kept (0 disables caching)
+    ttl: seconds an entry stays valid (None = no expiry)
+    steps: per-feature quantization steps; inputs are snapped to the grid
+           before both lookup and prediction, so cached results stay consistent
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, steps=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.steps = None if steps is None or not np.any(steps) else np.asarray(steps, dtype=np.float64)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def quantize(self, features):
+        """Snap the leading (quantized) feature columns to their grid"""
+        if self.steps is None:
+            return features
+        n = len(self.steps)
+        quantized = features.copy()
+        active = self.steps > 0
+        block = quantized[:, :n]
+        block[:, active] = np.round(block[:, active] / self.steps[active]) * self.steps[active]
+        return quantized
+
+    def keys(self, command, features):
+        """One hashable key per feature row"""
+        features = np.ascontiguousarray(features, dtype=np.float64)
+        return [(command, row.tobytes()) for row in features]
+
+    def get(self, key):
+        """Cached result (a private copy) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires is not None and monotonic() >= expires:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Store a result, evicting the least recently used entries when full"""
+        if not self.enabled:
+            return
+        expires = None if self.ttl is None else monotonic() + self.ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (models changed)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Counters for health / metrics output"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
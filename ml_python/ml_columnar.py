@@ -0,0 +1,327 @@
+# AgriSmart Python ML System
+# Columnar batch I/O
+#
+# Bulk scoring reads Arrow IPC (.arrow / .feather), Parquet or NumPy (.npy)
+# files instead of JSON. A .npy input is a structured array, or a 2-D numeric
+# matrix whose columns are named by the caller (numeric inputs only). Only the input fields (plus any requested
+# pass-through columns) are read; Arrow IPC and .npy files are memory-mapped,
+# so float columns reach the feature matrix without intermediate copies, and
+# label columns arrive dictionary-encoded (distinct labels + one index per row).
+# Results are written batch by batch as Arrow IPC / Parquet, or as a
+# structured .npy for predict_yield.
+# pyarrow is optional and imported only for Arrow / Parquet files.
+
+import os
+import sys
+
+import numpy as np
+
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+COLUMNAR_EXTENSIONS = ARROW_EXTENSIONS + ('.parquet', '.npy')
+
+# Rows scored and written per step by score_file
+DEFAULT_BATCH_ROWS = 65536
+
+# Numeric result fields of predict_yield (plus yield_category / error / warnings)
+YIELD_RESULT_FIELDS = ['predicted_yield', 'confidence', 'std_dev', 'p10', 'p50', 'p90']
+
+
+def is_columnar(path):
+    """Whether a path names an Arrow IPC, Parquet or .npy file"""
+    return str(path).endswith(COLUMNAR_EXTENSIONS)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Arrow / Parquet files require pyarrow: pip install pyarrow")
+    return pa
+
+
+class DictionaryColumn:
+    """Label column as its distinct labels plus one label index per row"""
+
+    def __init__(self, labels, indices):
+        self.labels = np.asarray(labels, dtype=object)
+        self.indices = np.asarray(indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @classmethod
+    def of(cls, values):
+        """Dictionary form of any label column"""
+        if isinstance(values, cls):
+            return values
+        labels, indices = np.unique(np.asarray(values).astype(str), return_inverse=True)
+        return cls(labels, indices)
+
+
+def _load_npy(path, matrix_columns=None):
+    """
+    Memory-mapped .npy input as a structured array. A 2-D numeric matrix is
+    viewed as one field per column, named by matrix_columns.
+    """
+    array = np.load(path, mmap_mode='r')
+    if array.dtype.names is not None:
+        return array
+    if array.ndim != 2 or array.dtype.kind not in 'iuf' or not matrix_columns:
+        raise ValueError(f"{path} must hold a structured array, or a 2-D numeric matrix with named columns")
+    if array.shape[1] != len(matrix_columns):
+        raise ValueError(f"{path} has {array.shape[1]} columns; expected {len(matrix_columns)} "
+                         f"({', '.join(matrix_columns)})")
+    fields = np.dtype([(name, array.dtype) for name in matrix_columns])
+    if array.flags.c_contiguous:
+        # Each row's values are the fields of one record: no copy
+        return array.view(fields)[:, 0]
+    from numpy.lib import recfunctions
+    return recfunctions.unstructured_to_structured(np.asarray(array), fields)
+
+
+def read_table(path, columns, matrix_columns=None):
+    """
+    The requested columns that exist in a columnar file: a pyarrow Table
+    (memory-mapped for Arrow IPC) or a memory-mapped structured array (.npy).
+    matrix_columns names the columns of a 2-D .npy matrix.
+    """
+    path = str(path)
+    if path.endswith('.npy'):
+        return _load_npy(path, matrix_columns)
+    pa = _pyarrow()
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        names = pq.read_schema(path).names
+        return pq.read_table(path, columns=[c for c in columns if c in names], memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.select([c for c in columns if c in table.column_names])
+
+
+def file_columns(path, matrix_columns=None):
+    """Column names of a columnar file, read from its schema / header only"""
+    path = str(path)
+    if path.endswith('.npy'):
+        return list(_load_npy(path, matrix_columns).dtype.names)
+    pa = _pyarrow()
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).schema.names
+
+
+def count_rows(path):
+    """Rows in a columnar file, from its metadata where possible"""
+    path = str(path)
+    if path.endswith('.npy'):
+        return len(np.load(path, mmap_mode='r'))
+    pa = _pyarrow()
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+    return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def iter_batches(path, columns, batch_rows=DEFAULT_BATCH_ROWS, matrix_columns=None):
+    """Zero-copy slices (Parquet: streamed record batches) of the projected columns"""
+    path = str(path)
+    if path.endswith('.parquet'):
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+        source = pq.ParquetFile(path, memory_map=True)
+        names = source.schema_arrow.names
+        for batch in source.iter_batches(batch_size=batch_rows, columns=[c for c in columns if c in names]):
+            yield pa.Table.from_batches([batch])
+        return
+    table = read_table(path, columns, matrix_columns)
+    for start in range(0, len(table), batch_rows):
+        yield table[start:start + batch_rows] if isinstance(table, np.ndarray) else table.slice(start, batch_rows)
+
+
+def input_columns(source, fields, categorical):
+    """
+    {field: values} for the fields present in a pyarrow Table / RecordBatch or a
+    structured array; categorical fields become DictionaryColumns.
+    Returns None for any other kind of source.
+    """
+    if isinstance(source, np.ndarray) and source.dtype.names is not None:
+        return {
+            field: DictionaryColumn.of(source[field]) if field in categorical else source[field]
+            for field in fields if field in source.dtype.names
+        }
+
+    pa = sys.modules.get('pyarrow')
+    if pa is None or not isinstance(source, (pa.Table, pa.RecordBatch)):
+        return None
+    import pyarrow.compute as pc
+
+    if isinstance(source, pa.RecordBatch):
+        source = pa.Table.from_batches([source])
+    columns = {}
+    for field in fields:
+        if field not in source.column_names:
+            continue
+        column = source.column(field)
+        kind = column.type.value_type if pa.types.is_dictionary(column.type) else column.type
+        if field in categorical:
+            # Encode distinct labels once; nulls become a label of their own
+            encoded = pc.dictionary_encode(column.cast(kind).combine_chunks(), null_encoding='encode')
+            columns[field] = DictionaryColumn(encoded.dictionary.to_pylist(), encoded.indices.to_numpy())
+        elif pa.types.is_floating(kind) or pa.types.is_integer(kind):
+            # Single-chunk float64 without nulls is a view of the Arrow buffer; nulls become NaN
+            columns[field] = column.cast(kind).to_numpy()
+        else:
+            columns[field] = column.to_pylist()
+    return columns
+
+
+def _flat_results(command, results):
+    """{column: list} for one batch of result dicts"""
+    if command == 'predict_yield':
+        columns = {field: [] for field in YIELD_RESULT_FIELDS + ['yield_category']}
+        for result in results:
+            uncertainty = result.get('uncertainty', {})
+            values = dict(result, std_dev=uncertainty.get('std_dev'), **uncertainty.get('quantiles', {}))
+            for field in columns:
+                columns[field].append(values.get(field))
+    else:
+        columns = {
+            'top_crop': [r['recommendations'][0]['crop'] if r.get('recommendations') else None for r in results],
+            'recommendations': [r.get('recommendations') for r in results],
+            'total_analyzed': [r.get('total_analyzed') for r in results]
+        }
+    columns['error'] = [r.get('error') for r in results]
+    columns['warnings'] = ['; '.join(r['warnings']) if r.get('warnings') else None for r in results]
+    return columns
+
+
+def _result_schema(pa, command):
+    if command == 'predict_yield':
+        fields = [(field, pa.float64()) for field in YIELD_RESULT_FIELDS] + [('yield_category', pa.string())]
+    else:
+        recommendation = pa.struct([
+            ('crop', pa.string()), ('suitability_score', pa.float64()), ('predicted_yield', pa.float64()),
+            ('confidence', pa.float64()), ('yield_category', pa.string())
+        ])
+        fields = [('top_crop', pa.string()), ('recommendations', pa.list_(recommendation)),
+                  ('total_analyzed', pa.int64())]
+    return fields + [('error', pa.string()), ('warnings', pa.string())]
+
+
+def _npy_passthrough(name, values):
+    """
+    One batch of a pass-through column for .npy output, with a dtype that holds
+    the whole column: fields of a structured .npy input as they are, Arrow /
+    Parquet numeric columns (nulls as NaN for floats). Labels have no fixed
+    width until every batch is read, so they are rejected.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    pa = _pyarrow()
+    kind = values.type
+    if pa.types.is_integer(kind) or pa.types.is_boolean(kind):
+        if values.null_count:
+            raise ValueError(f"Pass-through column {name} has nulls, which .npy output cannot hold; "
+                             f"use .arrow or .parquet")
+        return values.to_numpy()
+    if pa.types.is_floating(kind):
+        return values.to_numpy()
+    raise ValueError(f"NumPy output holds numeric pass-through columns only ({name} is {kind}); "
+                     f"use .arrow or .parquet")
+
+
+class ColumnarWriter:
+    """
+    Writes result batches (plus pass-through input columns) to Arrow IPC or
+    Parquet as they arrive, or into a preallocated structured .npy of
+    `rows` rows (predict_yield only). Everything goes to a temporary file that
+    replaces `path` on close; if the `with` block raises, it is deleted instead.
+    """
+
+    def __init__(self, path, command, rows=None, metadata=None):
+        self.path = str(path)
+        self.command = command
+        self.rows = rows
+        self.metadata = {key: str(value) for key, value in (metadata or {}).items()}
+        self.written = 0
+        self._tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        self._writer = None
+        self._array = None
+        if not is_columnar(self.path):
+            raise ValueError(f"Unsupported columnar output: {self.path} (use .arrow, .feather, .parquet or .npy)")
+        if self.path.endswith('.npy') and command != 'predict_yield':
+            raise ValueError("NumPy output holds predict_yield results; use .arrow or .parquet for recommend_crops")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, results, passthrough=None):
+        """Append one batch of result dicts; passthrough: {name: input column values}"""
+        columns = _flat_results(self.command, results)
+        if self.path.endswith('.npy'):
+            self._write_npy(columns, {name: _npy_passthrough(name, values)
+                                      for name, values in (passthrough or {}).items()})
+            return
+
+        pa = _pyarrow()
+        arrays, fields = [], []
+        for name, values in (passthrough or {}).items():
+            array = values if isinstance(values, pa.ChunkedArray) else pa.array(values)
+            arrays.append(array)
+            fields.append(pa.field(name, array.type))
+        for name, kind in _result_schema(pa, self.command):
+            arrays.append(pa.array(columns[name], type=kind))
+            fields.append(pa.field(name, kind))
+        table = pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=self.metadata))
+
+        if self._writer is None:
+            if self.path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._tmp_path, table.schema)
+            else:
+                self._writer = pa.ipc.new_file(self._tmp_path, table.schema)
+        self._writer.write_table(table)
+        self.written += len(results)
+
+    def _write_npy(self, columns, passthrough):
+        if self._array is None:
+            if self.rows is None:
+                raise ValueError("NumPy output needs the total row count")
+            dtype = [(name, values.dtype) for name, values in passthrough.items()]
+            dtype += [(field, np.float64) for field in YIELD_RESULT_FIELDS] + [('valid', np.bool_)]
+            self._array = np.lib.format.open_memmap(self._tmp_path, mode='w+', dtype=dtype, shape=(self.rows,))
+        rows = slice(self.written, self.written + len(columns['error']))
+        for name, values in passthrough.items():
+            self._array[name][rows] = values
+        for field in YIELD_RESULT_FIELDS:
+            self._array[field][rows] = np.array(columns[field], dtype=float)
+        self._array['valid'][rows] = [error is None for error in columns['error']]
+        self.written = rows.stop
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._array is not None:
+            self._array.flush()
+            del self._array
+            self._array = None
+
+    def close(self):
+        """Finish the file and move it into place (an empty input still gets one)"""
+        if self._writer is None and self._array is None:
+            self.write([])
+        self._close_file()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        """Close and delete the partial output, leaving any previous file at `path`"""
+        self._close_file()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
@@ -0,0 +1,281 @@
+# AgriSmart Python ML System
+# Historical training data source
+#
+# Streams the `historical_crop_data` table (database/setup_mysql.sql) in
+# server-side-cursor chunks, maps its columns onto the predictor's feature
+# schema and caches the extracted snapshot locally in a columnar file, so
+# repeat training runs do not touch the database.
+#
+# Any DB-API connection works: MySQL through PyMySQL in production, sqlite3
+# with the same table layout for local runs and tests.
+
+import os
+import re
+import json
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HISTORICAL_TABLE = 'historical_crop_data'
+
+# historical_crop_data column -> training column
+HISTORICAL_COLUMN_MAP = {
+    'state_name': 'state',
+    'district_name': 'district',
+    'crop': 'crop',
+    'crop_year': 'year',
+    'temperature_c': 'temperature',
+    'humidity_percent': 'humidity',
+    'rainfall_mm': 'rainfall',
+    'ph': 'ph',
+    'n_fertilizer': 'nitrogen',
+    'p_fertilizer': 'phosphorus',
+    'k_fertilizer': 'potassium',
+    'yield_kg_per_ha': 'yield_kg_ha'
+}
+
+CATEGORICAL_COLUMNS = ['state', 'district', 'crop']
+NUMERIC_COLUMNS = ['temperature', 'humidity', 'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium']
+# Columns training and updates use
+TRAINING_COLUMNS = CATEGORICAL_COLUMNS + NUMERIC_COLUMNS + ['yield_kg_ha']
+
+# Local snapshot location, next to this file like the model bundles
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _check_identifier(name):
+    """Table names are interpolated into SQL, so only allow plain identifiers"""
+    if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+        raise ValueError(f"Invalid table name: {name}")
+    return name
+
+
+def mysql_settings(host=None, port=None, user=None, password=None, database=None):
+    """Connection settings, defaulting to the DB_* variables from database/.env.example"""
+    return {
+        'host': host or os.environ.get('DB_HOST', 'localhost'),
+        'port': int(port or os.environ.get('DB_PORT', 3306)),
+        'user': user or os.environ.get('DB_USER', 'agrismart_user'),
+        'password': password if password is not None else os.environ.get('DB_PASSWORD', ''),
+        'database': database or os.environ.get('DB_NAME', 'agrismart_db')
+    }
+
+
+def mysql_source(**settings):
+    """Source label for snapshots extracted from MySQL (no password)"""
+    settings = mysql_settings(**settings)
+    return f"mysql://{settings['user']}@{settings['host']}:{settings['port']}/{settings['database']}"
+
+
+def sqlite_source(path):
+    """Source label for snapshots extracted from an SQLite file"""
+    return f"sqlite:{os.path.abspath(path)}"
+
+
+def connect_mysql(host=None, port=None, user=None, password=None, database=None):
+    """
+    Open a MySQL connection whose cursors stream rows from the server
+    (PyMySQL SSCursor) instead of buffering the whole result set.
+    Connection settings default to the DB_* variables from database/.env.example.
+    """
+    try:
+        import pymysql
+        import pymysql.cursors
+    except ImportError:
+        raise ImportError("Training from MySQL requires PyMySQL: pip install pymysql")
+
+    return pymysql.connect(
+        **mysql_settings(host, port, user, password, database),
+        cursorclass=pymysql.cursors.SSCursor
+    )
+
+
+def iter_historical_chunks(connection, defaults, table=HISTORICAL_TABLE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of mapped training rows, chunk_size rows at a time.
+    Rows without a state, district, crop or yield are skipped; missing
+    environmental readings take the same defaults the predictor uses at
+    inference time.
+    """
+    table = _check_identifier(table)
+    source_columns = list(HISTORICAL_COLUMN_MAP)
+    query = (
+        f"SELECT {', '.join(source_columns)} FROM {table} "
+        f"WHERE yield_kg_per_ha IS NOT NULL ORDER BY id"
+    )
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame.from_records(rows, columns=source_columns).rename(columns=HISTORICAL_COLUMN_MAP)
+            yield _clean_chunk(chunk, defaults)
+    finally:
+        cursor.close()
+
+
+def _clean_chunk(chunk, defaults):
+    """Normalize one extracted chunk onto the training schema"""
+    chunk = chunk.dropna(subset=CATEGORICAL_COLUMNS + ['yield_kg_ha'])
+    for column in CATEGORICAL_COLUMNS:
+        chunk[column] = chunk[column].astype(str).str.strip()
+    for column in NUMERIC_COLUMNS + ['yield_kg_ha']:
+        chunk[column] = pd.to_numeric(chunk[column], errors='coerce').astype(np.float64)
+        if column in defaults:
+            chunk[column] = chunk[column].fillna(float(defaults[column]))
+    chunk['year'] = pd.to_numeric(chunk['year'], errors='coerce').fillna(0).astype(np.int32)
+    return chunk.dropna(subset=['yield_kg_ha']).reset_index(drop=True)
+
+
+def default_snapshot_path(table=HISTORICAL_TABLE, source=None):
+    """
+    Parquet when pyarrow is installed, otherwise a compressed NumPy column archive.
+    A source label adds a short hash to the name, so each database keeps its own snapshot.
+    """
+    try:
+        import pyarrow  # noqa: F401
+        extension = 'parquet'
+    except ImportError:
+        extension = 'npz'
+    name = table if source is None else f"{table}-{hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]}"
+    return os.path.join(DATA_DIR, f'{name}.{extension}')
+
+
+def snapshot_info(snapshot_path):
+    """The JSON sidecar written next to a snapshot, or None if it is missing or unreadable"""
+    try:
+        with open(f'{snapshot_path}.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def extract_snapshot(connection, snapshot_path, defaults, table=HISTORICAL_TABLE, chunk_size=DEFAULT_CHUNK_SIZE,
+                     source=None):
+    """
+    Stream the table into a local columnar snapshot.
+    Parquet is written chunk by chunk; the .npz fallback is written once at the end.
+    The file appears atomically, with a small JSON sidecar describing the extract
+    (including the source label). Returns the number of rows written.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = f'{snapshot_path}.tmp-{os.getpid()}'
+    rows = 0
+
+    try:
+        if snapshot_path.endswith('.parquet'):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet snapshots require pyarrow: pip install pyarrow (or use a .npz snapshot)")
+
+            writer = None
+            try:
+                for chunk in iter_historical_chunks(connection, defaults, table, chunk_size):
+                    batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, batch.schema)
+                    writer.write_table(batch)
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                raise ValueError(f"No usable rows in {table}")
+
+        elif snapshot_path.endswith('.npz'):
+            chunks = list(iter_historical_chunks(connection, defaults, table, chunk_size))
+            if not chunks:
+                raise ValueError(f"No usable rows in {table}")
+            df = pd.concat(chunks, ignore_index=True)
+            rows = len(df)
+            with open(tmp_path, 'wb') as f:
+                # Fixed-width unicode for text columns keeps the archive pickle-free
+                np.savez_compressed(f, **{
+                    column: df[column].to_numpy(dtype=str if column in CATEGORICAL_COLUMNS else None)
+                    for column in df.columns
+                })
+
+        else:
+            raise ValueError(f"Unsupported snapshot format: {snapshot_path} (use .parquet or .npz)")
+
+        os.replace(tmp_path, snapshot_path)
+
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    with open(f'{snapshot_path}.json', 'w') as f:
+        json.dump({
+            'table': table,
+            'source': source,
+            'rows': rows,
+            'extracted_at': datetime.now().isoformat(),
+            'columns': list(HISTORICAL_COLUMN_MAP.values())
+        }, f, indent=2)
+    return rows
+
+
+def read_snapshot(snapshot_path):
+    """Load a snapshot written by extract_snapshot"""
+    if snapshot_path.endswith('.parquet'):
+        return pd.read_parquet(snapshot_path)
+    if snapshot_path.endswith('.npz'):
+        with np.load(snapshot_path) as archive:
+            return pd.DataFrame({column: archive[column] for column in archive.files})
+    raise ValueError(f"Unsupported snapshot format: {snapshot_path}")
+
+
+def read_training_file(path, columns=TRAINING_COLUMNS):
+    """
+    Training rows from a CSV file, a .npz snapshot, or a Parquet / Arrow IPC /
+    structured .npy file (columnar files are read with only `columns`)
+    """
+    from ml_columnar import is_columnar, read_table
+
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    if is_columnar(path):
+        table = read_table(path, columns)
+        return pd.DataFrame(table) if isinstance(table, np.ndarray) else table.to_pandas()
+    return read_snapshot(path)
+
+
+def load_historical_data(connect, defaults, snapshot_path=None, refresh=False,
+                         table=HISTORICAL_TABLE, chunk_size=DEFAULT_CHUNK_SIZE, source=None):
+    """
+    Historical training rows as a DataFrame.
+    connect: zero-argument callable returning a DB-API connection; it is only
+    called when the snapshot is missing, was extracted from a different
+    source or table (per its sidecar), or refresh=True.
+    source: label of the database connect() opens (mysql_source / sqlite_source)
+    """
+    snapshot_path = snapshot_path or default_snapshot_path(table, source)
+
+    if not refresh and os.path.exists(snapshot_path) and source is not None:
+        info = snapshot_info(snapshot_path) or {}
+        if (info.get('source'), info.get('table')) != (source, table):
+            print(f"Snapshot {snapshot_path} was extracted from {info.get('source') or 'an unknown source'}; "
+                  f"re-extracting from {source}")
+            refresh = True
+
+    if refresh or not os.path.exists(snapshot_path):
+        connection = connect()
+        try:
+            rows = extract_snapshot(connection, snapshot_path, defaults, table, chunk_size, source=source)
+        finally:
+            connection.close()
+        print(f"Extracted {rows} rows from {table} to {snapshot_path}")
+    else:
+        print(f"Using cached snapshot {snapshot_path}")
+
+    return read_snapshot(snapshot_path)
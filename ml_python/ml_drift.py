@@ -0,0 +1,245 @@
+# AgriSmart Python ML System
+# Input drift monitoring
+#
+# Training stores a FeatureSketch in the bundle: per numeric input, a histogram
+# over training-quantile bins (plus one bin below the training minimum and one
+# above the maximum) and a few summary quantiles; per categorical input, label
+# code frequencies (plus one bin for codes the encoders did not know).
+# A DriftMonitor counts live inputs into the same bins - one fixed-size count
+# array, exponentially decayed so recent traffic dominates - and scores each
+# feature against training with PSI and a binned Kolmogorov-Smirnov distance.
+
+import os
+import threading
+
+import numpy as np
+
+# Quantile bins per numeric feature
+SKETCH_BINS = 20
+# Summary quantiles stored with each numeric sketch
+SKETCH_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Live rows after which older counts weigh half
+DEFAULT_HALF_LIFE = 5000
+
+# Population stability index thresholds (common rule of thumb)
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Below this many (decayed) live rows the scores are not reported as drift
+MIN_REPORT_ROWS = 200
+
+# Added to every bin share so empty bins do not make PSI infinite
+_SMOOTHING = 1e-4
+# Rows binned per broadcast comparison in DriftMonitor.update
+_UPDATE_CHUNK = 4096
+
+
+class FeatureSketch:
+    """
+    Compact training distribution of every model input.
+    columns: feature names in feature-matrix order
+    categories: {column index: number of known labels} for label-coded columns
+    """
+
+    def __init__(self, columns, edges, counts, summaries):
+        self.columns = list(columns)
+        self.edges = edges          # per column: interior bin edges (numeric) or None
+        self.counts = counts        # per column: training count per bin
+        self.summaries = summaries  # per column: {'min', 'max', 'mean', 'std', 'quantiles'} or {'categories'}
+
+    @classmethod
+    def from_training(cls, features, columns, categories, bins=SKETCH_BINS):
+        """Sketch of a raw (unscaled) training feature matrix"""
+        features = np.asarray(features, dtype=np.float64)
+        edges, counts, summaries = [], [], []
+        for j in range(len(columns)):
+            values = features[:, j]
+            if j in categories:
+                edges.append(None)
+                counts.append(np.zeros(categories[j] + 1))
+                summaries.append({'categories': int(categories[j])})
+            else:
+                lo, hi = float(values.min()), float(values.max())
+                inner = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+                edges.append(np.concatenate([[lo], inner, [hi]]))
+                counts.append(np.zeros(len(inner) + 3))
+                summaries.append({
+                    'min': lo, 'max': hi,
+                    'mean': float(values.mean()), 'std': float(values.std()),
+                    'quantiles': {f'p{round(q * 100)}': float(v)
+                                  for q, v in zip(SKETCH_QUANTILES, np.quantile(values, SKETCH_QUANTILES))}
+                })
+        sketch = cls(columns, edges, counts, summaries)
+        sketch.add(features)
+        return sketch
+
+    @property
+    def rows(self):
+        return int(self.counts[0].sum())
+
+    def bin_indices(self, features):
+        """(n, n_columns) bin of every value; bin 0 / the last bin are out of range"""
+        bins = np.empty(features.shape, dtype=np.intp)
+        for j, edges in enumerate(self.edges):
+            values = features[:, j]
+            if edges is None:
+                n = len(self.counts[j]) - 1
+                codes = values.astype(np.intp)
+                bins[:, j] = np.where((codes >= 0) & (codes < n), codes, n)
+            else:
+                # edges[0] / edges[-1] are the training min / max
+                bins[:, j] = np.searchsorted(edges[1:-1], values, side='right') + 1
+                bins[values < edges[0], j] = 0
+                bins[values > edges[-1], j] = len(edges)
+        return bins
+
+    def add(self, features):
+        """Count more training rows (e.g. an incremental update) into the sketch"""
+        features = np.asarray(features, dtype=np.float64)
+        bins = self.bin_indices(features)
+        for j in range(len(self.columns)):
+            self.counts[j] += np.bincount(bins[:, j], minlength=len(self.counts[j]))
+
+    def extend_categories(self, column, n_categories):
+        """Give labels added to an encoder their own bins (before the unknown bin)"""
+        counts = self.counts[column]
+        extra = n_categories + 1 - len(counts)
+        if extra > 0:
+            self.counts[column] = np.concatenate([counts[:-1], np.zeros(extra), counts[-1:]])
+            self.summaries[column]['categories'] = int(n_categories)
+
+    def describe(self):
+        """JSON-friendly summary (training quantiles / category counts)"""
+        return {'rows': self.rows, 'features': dict(zip(self.columns, self.summaries))}
+
+
+class DriftMonitor:
+    """
+    Thread-safe streaming comparison of live inputs with a FeatureSketch.
+    Memory is one count per sketch bin whatever the traffic; every update
+    first decays the existing counts so that half_life rows halve their weight.
+    """
+
+    def __init__(self, sketch, half_life=DEFAULT_HALF_LIFE, key=None):
+        self.sketch = sketch
+        self.half_life = half_life
+        self.key = key
+        sizes = [len(counts) for counts in sketch.counts]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        self.size = int(sum(sizes))
+        
+        # All numeric columns are binned in one comparison against their interior
+        # edges, padded with +inf to a common width
+        self.numeric = [j for j, edges in enumerate(sketch.edges) if edges is not None]
+        self.categorical = [j for j, edges in enumerate(sketch.edges) if edges is None]
+        inner = [sketch.edges[j][1:-1] for j in self.numeric]
+        self.inner = np.full((len(inner), max(map(len, inner), default=0)), np.inf)
+        for k, edges in enumerate(inner):
+            self.inner[k, :len(edges)] = edges
+        self.low = np.array([sketch.edges[j][0] for j in self.numeric])
+        self.high = np.array([sketch.edges[j][-1] for j in self.numeric])
+        self.top = np.array([len(sketch.edges[j]) for j in self.numeric])
+        self.unknown = np.array([sizes[j] - 1 for j in self.categorical])
+        self.expected = [counts / counts.sum() for counts in sketch.counts]
+        self.counts = np.zeros(self.size)
+        self.rows_seen = 0
+        self._lock = threading.Lock()
+
+    def _bins(self, features):
+        """Flat count-array index of every value (same bins as FeatureSketch.bin_indices)"""
+        bins = np.empty(features.shape, dtype=np.intp)
+        values = features[:, self.numeric]
+        inside = (values[:, :, None] >= self.inner).sum(axis=2) + 1
+        bins[:, self.numeric] = np.where(values < self.low, 0, np.where(values > self.high, self.top, inside))
+        codes = features[:, self.categorical].astype(np.intp)
+        bins[:, self.categorical] = np.where((codes >= 0) & (codes < self.unknown), codes, self.unknown)
+        return bins + self.offsets
+
+    def update(self, features):
+        """Count a batch of raw feature rows"""
+        if len(features) == 0:
+            return
+        added = np.zeros(self.size)
+        for start in range(0, len(features), _UPDATE_CHUNK):
+            added += np.bincount(self._bins(features[start:start + _UPDATE_CHUNK]).ravel(), minlength=self.size)
+        decay = 0.5 ** (len(features) / self.half_life) if self.half_life else 1.0
+        with self._lock:
+            self.counts *= decay
+            self.counts += added
+            self.rows_seen += len(features)
+
+    def report(self, min_rows=MIN_REPORT_ROWS):
+        """
+        Per-feature PSI, binned KS distance and share of out-of-range (numeric)
+        or unknown (categorical) values, with a stable / moderate / significant
+        status once enough live rows have been seen.
+        """
+        with self._lock:
+            counts = self.counts.copy()
+            rows_seen = self.rows_seen
+        n_columns = len(self.sketch.columns)
+        effective = float(counts[:len(self.expected[0])].sum())
+        enough = effective >= min_rows
+
+        features = {}
+        for j, name in enumerate(self.sketch.columns):
+            observed = counts[self.offsets[j]:self.offsets[j] + len(self.expected[j])]
+            expected = self.expected[j]
+            actual = observed / observed.sum() if observed.sum() else np.zeros(len(observed))
+            p = (actual + _SMOOTHING) / (1 + _SMOOTHING * len(actual))
+            q = (expected + _SMOOTHING) / (1 + _SMOOTHING * len(expected))
+            psi = float(np.sum((p - q) * np.log(p / q)))
+            entry = {'psi': round(psi, 4)}
+            if self.sketch.edges[j] is None:
+                entry['unknown_share'] = round(float(actual[-1]), 4)
+            else:
+                entry['ks'] = round(float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)))), 4)
+                entry['below_training_share'] = round(float(actual[0]), 4)
+                entry['above_training_share'] = round(float(actual[-1]), 4)
+            if not enough:
+                entry['status'] = 'insufficient_data'
+            elif psi >= PSI_SIGNIFICANT:
+                entry['status'] = 'significant'
+            elif psi >= PSI_MODERATE:
+                entry['status'] = 'moderate'
+            else:
+                entry['status'] = 'stable'
+            features[name] = entry
+
+        drifted = [name for name, entry in features.items() if entry['status'] == 'significant']
+        return {
+            'rows_seen': rows_seen,
+            'effective_rows': round(effective, 1),
+            'half_life': self.half_life,
+            'features_monitored': n_columns,
+            'features': features,
+            'drifted_features': drifted,
+            'retrain_recommended': bool(drifted)
+        }
+
+    def save(self, path):
+        """Write the live counts atomically (for monitors shared across processes)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            counts = self.counts.copy()
+            rows_seen = self.rows_seen
+        tmp_path = f'{path}.tmp-{os.getpid()}.npz'
+        np.savez(tmp_path, counts=counts, rows_seen=rows_seen, key=str(self.key))
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Resume counts saved for the same bundle; returns False if none match"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as state:
+                if str(state['key']) != str(self.key) or state['counts'].shape != (self.size,):
+                    return False
+                counts, rows_seen = state['counts'], int(state['rows_seen'])
+        except (OSError, ValueError, KeyError):
+            return False
+        with self._lock:
+            self.counts = counts.astype(np.float64)
+            self.rows_seen = rows_seen
+        return True
@@ -0,0 +1,192 @@
+# AgriSmart Python ML System
+# Categorical encoding index
+#
+# Plain-Python replacement for the fitted LabelEncoders on the prediction path:
+# a dict from label to code built once at load time gives O(1) lookups, whole
+# columns are encoded and decoded in one pass, and unknown states / districts
+# can fall back to a known value instead of failing the request. The index
+# holds only NumPy arrays and dicts, so loading it does not import sklearn.
+
+import difflib
+
+import numpy as np
+
+# How unknown states / districts are handled
+UNKNOWN_POLICIES = ('error', 'state_default', 'nearest', 'lowest_code')
+DEFAULT_UNKNOWN_POLICY = 'nearest'
+
+# Code used by the 'lowest_code' policy. No code was reserved for unknowns at
+# training time, so an unknown label is scored as the first (lowest) known one,
+# which is where ordered forest splits would send any code below it anyway
+LOWEST_CODE = 0
+
+# Minimum similarity for the 'nearest' policy (difflib ratio)
+NEAREST_CUTOFF = 0.75
+
+# Distinct unknown names remembered per index
+RESOLVED_CACHE_SIZE = 10_000
+
+
+def _normalize(label):
+    """Lookup form of a label: case-insensitive, surrounding/inner spaces collapsed"""
+    return ' '.join(str(label).split()).casefold()
+
+
+class CategoryIndex:
+    """Codes of one categorical feature, in LabelEncoder order"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._build()
+
+    def _build(self):
+        self._codes = {}
+        for code, label in enumerate(self.classes_):
+            self._codes[label] = code
+            self._codes.setdefault(_normalize(label), code)
+        self._normalized = [_normalize(label) for label in self.classes_]
+
+    def __getstate__(self):
+        # Only the labels are stored; lookups are rebuilt on load
+        return {'classes_': self.classes_}
+
+    def __setstate__(self, state):
+        self.classes_ = state['classes_']
+        self._build()
+
+    def __len__(self):
+        return len(self.classes_)
+
+    def __contains__(self, label):
+        return self.code(label) is not None
+
+    def code(self, label):
+        """Code of one label (exact or normalized match), or None"""
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes.get(_normalize(label))
+        return code
+
+    def encode(self, values):
+        """Codes for a sequence of labels; -1 where unknown. Returns (codes, known)"""
+        lookup = self._codes.get
+        codes = np.fromiter((lookup(v, -1) for v in values), dtype=np.int64, count=len(values))
+        missing = np.flatnonzero(codes < 0)
+        for i in missing:
+            code = self._codes.get(_normalize(values[i]))
+            if code is not None:
+                codes[i] = code
+        return codes, codes >= 0
+
+    def decode(self, codes):
+        """Labels for an array of codes"""
+        return self.classes_[np.asarray(codes, dtype=np.int64)]
+
+    def nearest(self, label, cutoff=NEAREST_CUTOFF):
+        """Most similar known label, or None"""
+        match = difflib.get_close_matches(_normalize(label), self._normalized, n=1, cutoff=cutoff)
+        return self.classes_[self._normalized.index(match[0])] if match else None
+
+
+class EncodingIndex:
+    """
+    State, district and crop indexes plus the fallbacks for unknown inputs.
+    state_districts: {state: most common district in the training data},
+    used as the state-level default district.
+    district_states: {district: most common state in the training data}.
+    """
+
+    def __init__(self, state, district, crop, state_districts=None,
+                 default_state=None, default_district=None, district_states=None):
+        self.state = state
+        self.district = district
+        self.crop = crop
+        self.state_districts = dict(state_districts or {})
+        self.district_states = dict(district_states or {})
+        self.default_state = default_state
+        self.default_district = default_district
+        self._resolved = {}
+
+    @classmethod
+    def from_encoders(cls, state_encoder, district_encoder, crop_encoder, **kwargs):
+        """Build from fitted LabelEncoders (codes are identical)"""
+        return cls(CategoryIndex(state_encoder.classes_), CategoryIndex(district_encoder.classes_),
+                   CategoryIndex(crop_encoder.classes_), **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_resolved'] = {}
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('district_states', {})
+        self.__dict__.update(state)
+
+    def district_locations(self):
+        """(state, district) for every known district, paired with its most common state"""
+        states_by_default = {d: s for s, d in self.state_districts.items()}
+        return [(self.district_states.get(district) or states_by_default.get(district, self.default_state),
+                 str(district))
+                for district in self.district.classes_]
+
+    def encode_locations(self, states, districts, policy=DEFAULT_UNKNOWN_POLICY):
+        """
+        State and district codes for two label columns.
+        Returns (state_codes, district_codes, errors, notes) where errors and
+        notes map row index -> message (errors: row cannot be scored; notes:
+        a fallback value was used).
+        """
+        if policy not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown category policy: {policy}")
+
+        state_codes, state_known = self.state.encode(states)
+        district_codes, district_known = self.district.encode(districts)
+        errors, notes = {}, {}
+
+        for i in np.flatnonzero(~state_known):
+            code, note = self._fallback('state', self.state, states[i], policy, None)
+            if code is None:
+                errors[int(i)] = f"Unknown state: {states[i]}"
+            else:
+                state_codes[i] = code
+                notes.setdefault(int(i), []).append(note)
+
+        for i in np.flatnonzero(~district_known):
+            state_label = self.state.classes_[state_codes[i]] if state_codes[i] >= 0 else None
+            code, note = self._fallback('district', self.district, districts[i], policy, state_label)
+            if code is None:
+                errors.setdefault(int(i), f"Unknown district: {districts[i]}")
+            else:
+                district_codes[i] = code
+                notes.setdefault(int(i), []).append(note)
+
+        return state_codes, district_codes, errors, notes
+
+    def _fallback(self, field, index, label, policy, state_label):
+        """(code, note) for an unknown label under the policy, or (None, None)"""
+        if policy == 'error':
+            return None, None
+        if policy == 'lowest_code':
+            return LOWEST_CODE, f"Unknown {field} '{label}', using the lowest {field} code ('{index.classes_[LOWEST_CODE]}')"
+
+        key = (field, policy, label, state_label)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            replacement = index.nearest(label) if policy == 'nearest' else None
+            if replacement is None:
+                replacement = self._default(field, state_label)
+            resolved = (index.code(replacement), replacement) if replacement is not None else (None, None)
+            if len(self._resolved) >= RESOLVED_CACHE_SIZE:
+                self._resolved.clear()
+            self._resolved[key] = resolved
+
+        code, replacement = resolved
+        if code is None:
+            return None, None
+        return code, f"Unknown {field} '{label}', using '{replacement}'"
+
+    def _default(self, field, state_label):
+        """State-level default district, else the global default"""
+        if field == 'district' and state_label in self.state_districts:
+            return self.state_districts[state_label]
+        return self.default_district if field == 'district' else self.default_state
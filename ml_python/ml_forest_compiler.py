@@ -0,0 +1,296 @@
+# AgriSmart Python ML System
+# Compiled Random Forest inference
+#
+# Flattens every tree of a fitted RandomForestRegressor / RandomForestClassifier
+# into a handful of contiguous NumPy arrays and scores a batch across all trees
+# with one vectorized traversal (one loop step per tree level, not per tree).
+# The StandardScaler is folded into the split thresholds, so inference takes
+# raw feature values and skips scaler.transform entirely.
+
+import numpy as np
+
+# (row, tree) pairs traversed together: small enough that the per-level index
+# arrays stay in cache (1 << 20 pairs was about 2x slower per row)
+TRAVERSAL_CHUNK = 1 << 15
+# Levels traversed in the complete-tree layout (2**TOP_LEVELS slots per tree)
+TOP_LEVELS = 10
+# Below that, paths that reached a leaf are dropped every this many levels
+COMPACT_EVERY = 12
+
+
+class CompiledForest:
+    """
+    Array form of a tree ensemble.
+    feature[node]      int8 split feature (0 for leaves)
+    threshold[node]    float64 split threshold in raw (unscaled) feature space,
+                       folded exactly so x_raw <= threshold matches sklearn
+                       (folded boundaries sit within float32 rounding of training
+                       values, so float32 thresholds would change paths)
+    children[2 * node + went_right]
+                       int32 global child index; leaves point to themselves
+    leaf_slot[node]    int32 row into `values` for leaves, -1 for split nodes
+    values[slot]       leaf outputs (n_leaves, n_outputs): float64 for
+                       regressors so rounded yields match exactly; classifier
+                       class fractions are float32 when compiled compact
+    roots[tree]        int32 global index of each tree's root
+    """
+
+    def __init__(self, kind, feature, threshold, children, leaf_slot, values, roots,
+                 max_depth, n_features, classes=None):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.leaf_slot = leaf_slot
+        self.values = values
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.classes_ = classes
+
+    def __setstate__(self, state):
+        # Forests compiled before children were interleaved stored left / right
+        if 'left' in state:
+            state['children'] = np.column_stack([state.pop('left'), state.pop('right')]).ravel()
+        self.__dict__.update(state)
+
+    def __getstate__(self):
+        # The top-level layout is rebuilt on first use rather than pickled
+        state = dict(self.__dict__)
+        state.pop('_top', None)
+        return state
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        """Memory held by the node and leaf arrays"""
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.leaf_slot, self.values, self.roots))
+
+    def _top_levels(self):
+        """
+        The first levels of every tree laid out level by level, built once per
+        forest: level l holds 2**l slots per tree at [T * 2**l, T * 2**(l+1)),
+        so the slot below s is 2s (left) or 2s + 1 (right). Returns
+        (feature, threshold, exit, depth) where exit maps each slot past the
+        last level to the global node it reaches. Leaves point to themselves,
+        so paths that end early just repeat their leaf.
+        """
+        if getattr(self, '_top', None) is None:
+            depth = min(self.max_depth, TOP_LEVELS)
+            level = self.roots[:, None]
+            levels = [np.zeros(self.n_trees, dtype=self.roots.dtype)]
+            for _ in range(depth):
+                levels.append(level.ravel())
+                level = self.children.take(2 * level[:, :, None] + np.arange(2)).reshape(self.n_trees, -1)
+            nodes = np.concatenate(levels)
+            self._top = (self.feature.take(nodes), self.threshold.take(nodes), level.ravel(), depth)
+        return self._top
+
+    def apply(self, features):
+        """(n_rows, n_trees) matrix of global leaf node indices"""
+        features = np.ascontiguousarray(features, dtype=np.float64)
+        n_rows, n_columns = features.shape
+        n_trees = self.n_trees
+        nodes = np.empty((n_rows, n_trees), dtype=np.int32)
+        top_feature, top_threshold, top_exit, top_depth = self._top_levels()
+        first_slots = np.arange(n_trees, 2 * n_trees, dtype=np.int32)
+        is_leaf = self.leaf_slot >= 0
+
+        step = max(1, TRAVERSAL_CHUNK // n_trees)
+        for start in range(0, n_rows, step):
+            block = features[start:start + step]
+            # NaN fails every x <= threshold test and goes right, like +inf
+            flat = np.where(np.isnan(block), np.inf, block).ravel()
+            out = nodes[start:start + step].reshape(-1)
+            # One entry per (row, tree) pair still being traversed
+            base = np.repeat(np.arange(len(block), dtype=np.int32) * n_columns, n_trees)
+
+            node = np.tile(first_slots, len(block))
+            for _ in range(top_depth):
+                went_right = flat.take(base + top_feature.take(node)) > top_threshold.take(node)
+                node *= 2
+                node += went_right
+            node -= n_trees << top_depth
+            node = top_exit.take(node)
+
+            # Deeper levels follow the explicit child links (leaves loop to themselves)
+            position = np.arange(len(block) * n_trees, dtype=np.int32)
+            for depth in range(top_depth, self.max_depth):
+                if (depth - top_depth) % COMPACT_EVERY == COMPACT_EVERY - 1:
+                    done = is_leaf.take(node)
+                    out[position[done]] = node[done]
+                    active = ~done
+                    node, base, position = node[active], base[active], position[active]
+                    if not len(node):
+                        break
+                went_right = flat.take(base + self.feature.take(node)) > self.threshold.take(node)
+                node *= 2
+                node += went_right
+                node = self.children.take(node)
+            out[position] = node
+        return nodes
+
+    def tree_predictions(self, features):
+        """(n_rows, n_trees) matrix of individual tree outputs (regression)"""
+        return self.values[self.leaf_slot[self.apply(features)], 0]
+
+    def predict(self, features):
+        """Forest mean prediction (regression)"""
+        return self.tree_predictions(features).mean(axis=1)
+
+    def predict_proba(self, features):
+        """Class probabilities averaged over trees (classification)"""
+        slots = self.leaf_slot[self.apply(features)]
+        # One (rows x classes) gather per tree, summed in float64 like sklearn
+        proba = np.zeros((len(slots), self.values.shape[1]))
+        for tree in range(self.n_trees):
+            proba += self.values[slots[:, tree]]
+        return proba / self.n_trees
+
+
+def fold_thresholds(threshold, mean, scale):
+    """
+    Map split thresholds from scaled to raw feature space exactly.
+
+    sklearn scales in float64, casts to float32 and then tests
+    float32((x - mean) / scale) <= threshold. That test is monotone in x, so it
+    holds exactly for x <= x*; x* is found by bisection so that raw inputs sitting
+    on a training value (defaults such as rainfall=800) take the same branch.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    def goes_left(x):
+        return ((x - mean) / scale).astype(np.float32).astype(np.float64) <= threshold
+
+    approx = threshold * scale + mean
+    width = np.abs(scale) * (np.abs(threshold) + 1.0) * 1e-5 + 1e-12
+    lo, hi = approx - width, approx + width
+
+    # Widen any bracket that does not straddle the boundary (not expected in practice)
+    for _ in range(32):
+        bad_lo = ~goes_left(lo)
+        bad_hi = goes_left(hi)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        lo = np.where(bad_lo, lo - width, lo)
+        hi = np.where(bad_hi, hi + width, hi)
+        width = width * 2
+
+    # Invariant: goes_left(lo) and not goes_left(hi); stop when they are adjacent doubles
+    for _ in range(128):
+        mid = lo + (hi - lo) / 2
+        active = (mid > lo) & (mid < hi)
+        if not active.any():
+            break
+        left = goes_left(mid)
+        lo = np.where(active & left, mid, lo)
+        hi = np.where(active & ~left, mid, hi)
+    return lo
+
+
+def compile_forest(model, mean=None, scale=None, compact=True):
+    """
+    Flatten a fitted sklearn forest into a CompiledForest.
+    mean / scale: StandardScaler parameters for each input column (None to
+    leave a column unscaled); thresholds are mapped back to raw units.
+    compact: store classifier class fractions as float32 (check the result
+    with verify_compiled and recompile with compact=False if it fails)
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    n_features = model.n_features_in_
+    if n_features > np.iinfo(np.int8).max:
+        raise ValueError(f"Too many features to compile: {n_features}")
+
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    is_classifier = hasattr(model, 'classes_')
+
+    features, thresholds, child_arrays, slots, values, roots = [], [], [], [], [], []
+    node_offset = 0
+    leaf_offset = 0
+    for tree in trees:
+        n_nodes = tree.node_count
+        local = np.arange(n_nodes, dtype=np.int64)
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.zeros(n_nodes)
+        threshold[~is_leaf] = fold_thresholds(
+            tree.threshold[~is_leaf], mean[feature[~is_leaf]], scale[feature[~is_leaf]]
+        )
+
+        children = np.column_stack([np.where(is_leaf, local, tree.children_left),
+                                    np.where(is_leaf, local, tree.children_right)]) + node_offset
+
+        leaf_value = tree.value[is_leaf][:, 0, :]
+        if is_classifier and not np.allclose(leaf_value.sum(axis=1), 1.0):
+            # Older sklearn stores class counts; newer fractions are used as stored
+            # (renormalizing them moves some by an ulp, which can flip a rounded score)
+            leaf_value = leaf_value / leaf_value.sum(axis=1, keepdims=True)
+
+        slot = np.full(n_nodes, -1, dtype=np.int64)
+        slot[is_leaf] = leaf_offset + np.arange(is_leaf.sum())
+
+        features.append(feature)
+        thresholds.append(threshold)
+        child_arrays.append(children.ravel())
+        slots.append(slot)
+        values.append(leaf_value)
+        roots.append(node_offset)
+        node_offset += n_nodes
+        leaf_offset += int(is_leaf.sum())
+
+    return CompiledForest(
+        kind='classifier' if is_classifier else 'regressor',
+        feature=np.concatenate(features).astype(np.int8),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        children=np.concatenate(child_arrays).astype(np.int32),
+        leaf_slot=np.concatenate(slots).astype(np.int32),
+        values=np.concatenate(values).astype(np.float32 if compact and is_classifier else np.float64),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max(tree.max_depth for tree in trees),
+        n_features=n_features,
+        classes=np.asarray(model.classes_) if is_classifier else None
+    )
+
+
+def verify_compiled(compiled, model, features_raw, transform, max_mismatch_rate=0.0, atol=1e-6):
+    """
+    Compare a CompiledForest against the sklearn model on sample inputs.
+    transform maps raw features to what the sklearn model expects.
+
+    Tree paths are exact, so only summation order should differ. A row
+    counts as a mismatch if any output differs by more than atol (relative for
+    regression); the check passes if at most max_mismatch_rate of rows mismatch.
+    """
+    expected_input = transform(features_raw)
+    if compiled.kind == 'classifier':
+        expected = model.predict_proba(expected_input)
+        actual = compiled.predict_proba(features_raw)
+        row_diff = np.abs(expected - actual).max(axis=1)
+        # Classes tied within atol may legitimately swap places
+        chosen = expected[np.arange(len(expected)), actual.argmax(axis=1)]
+        argmax_agreement = float((chosen >= expected.max(axis=1) - atol).mean())
+    else:
+        expected = model.predict(expected_input)
+        actual = compiled.predict(features_raw)
+        row_diff = np.abs(expected - actual) / np.maximum(np.abs(expected), 1.0)
+        argmax_agreement = None
+
+    mismatch_rate = float((row_diff > atol).mean())
+    report = {
+        'rows': len(features_raw),
+        'max_diff': float(row_diff.max()),
+        'mismatch_rate': mismatch_rate,
+        'ok': mismatch_rate <= max_mismatch_rate
+    }
+    if argmax_agreement is not None:
+        report['argmax_agreement'] = argmax_agreement
+        report['ok'] = report['ok'] and argmax_agreement >= 1 - max_mismatch_rate
+    return report
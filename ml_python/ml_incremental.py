@@ -0,0 +1,103 @@
+# AgriSmart Python ML System
+# Incremental (warm-start) forest updates
+#
+# A new season of data is folded into an existing bundle without refitting
+# from scratch: the encoders are extended in place, a small batch of new trees
+# fitted on the new rows only is appended (optionally retiring the oldest
+# trees), and - on request - the scaler is updated from running statistics
+# with the existing trees re-expressed in the updated scaled space.
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.tree._tree import Tree
+
+from ml_forest_compiler import fold_thresholds
+
+
+def extend_encoder(encoder, values):
+    """
+    Append unseen labels to a fitted LabelEncoder without renumbering.
+    Existing codes keep their meaning; new labels get the next codes in
+    sorted order. Returns the list of labels added.
+    """
+    known = set(encoder.classes_.tolist())
+    added = sorted({str(v) for v in values} - known)
+    if added:
+        encoder.classes_ = np.concatenate([np.asarray(encoder.classes_, dtype=object),
+                                           np.array(added, dtype=object)])
+    return added
+
+
+def remap_thresholds(model, old_mean, old_scale, new_mean, new_scale):
+    """
+    Move every split of a fitted forest from one StandardScaler space to another.
+
+    The raw-space boundary of each split is recovered exactly (fold_thresholds)
+    and re-scaled with the new statistics. sklearn compares float32-cast scaled
+    inputs, so inputs that share a float32 value with the boundary in the new
+    space (at most one float32 step away from it) can change branch.
+    Columns beyond len(old_mean) (e.g. the crop code) are left untouched.
+    """
+    n_scaled = len(old_mean)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        feature = tree.feature
+        split = (tree.children_left != -1) & (feature < n_scaled)
+        if not split.any():
+            continue
+        f = feature[split]
+        raw = fold_thresholds(tree.threshold[split], old_mean[f], old_scale[f])
+        rescaled = ((raw - new_mean[f]) / new_scale[f]).astype(np.float32).astype(np.float64)
+        # Writes through to the tree's node storage
+        tree.threshold[split] = rescaled
+
+
+def widen_classifier(model, n_classes):
+    """
+    Give every tree of a fitted RandomForestClassifier the class axis
+    0..n_classes-1 (labels are encoder codes), so forests fitted on different
+    subsets of crops can be merged. Leaf values of absent classes are zero.
+    """
+    columns = np.asarray(model.classes_, dtype=np.intp)
+    if len(columns) == n_classes and (columns == np.arange(n_classes)).all():
+        return
+
+    for estimator in model.estimators_:
+        old = estimator.tree_
+        state = old.__getstate__()
+        values = np.zeros((old.node_count, old.n_outputs, n_classes), dtype=state['values'].dtype)
+        values[:, :, columns] = state['values'][:, :, :len(columns)]
+        state['values'] = values
+
+        tree = Tree(old.n_features, np.array([n_classes], dtype=np.intp), old.n_outputs)
+        tree.__setstate__(state)
+        estimator.tree_ = tree
+        estimator.n_classes_ = n_classes
+        estimator.classes_ = np.arange(n_classes, dtype=np.float64)
+
+    model.n_classes_ = n_classes
+    model.classes_ = np.arange(n_classes)
+
+
+def grow_forest(model, X, y, n_new_trees, max_trees=None, random_state=None, n_classes=None):
+    """
+    Fit n_new_trees on (X, y) with the model's own hyperparameters and append
+    them to the forest. With max_trees set, the oldest trees are retired first.
+    Classifiers are widened to n_classes so old and new trees share one class axis.
+    """
+    params = {'n_estimators': n_new_trees, 'warm_start': False}
+    if random_state is not None:
+        params['random_state'] = random_state
+    addition = clone(model).set_params(**params)
+    addition.fit(X, y)
+
+    if n_classes is not None:
+        widen_classifier(model, n_classes)
+        widen_classifier(addition, n_classes)
+
+    trees = list(model.estimators_) + list(addition.estimators_)
+    if max_trees is not None and len(trees) > max_trees:
+        trees = trees[-max_trees:]
+    model.estimators_ = trees
+    model.n_estimators = len(trees)
+    return model
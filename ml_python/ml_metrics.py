@@ -0,0 +1,252 @@
+# AgriSmart Python ML System
+# Hot-path instrumentation
+#
+# Per-stage timers and event counters for the predictor, exported as JSON or
+# Prometheus text to stderr or a side-channel file (never stdout, which carries
+# results). When disabled, stage() returns a shared no-op context manager and
+# count() returns immediately, so instrumented code pays one attribute check.
+# An optional sampling profiler records collapsed stacks for flame graphs.
+
+import os
+import sys
+import json
+import bisect
+import threading
+import contextlib
+from time import perf_counter
+from collections import Counter
+
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_FORMATS = ('json', 'prometheus')
+METRIC_PREFIX = 'agrismart'
+
+# Sampling profiler interval
+DEFAULT_PROFILE_INTERVAL_MS = 5.0
+
+_DISABLED_STAGE = contextlib.nullcontext()
+
+# The process's sampling profiler, shared by every Metrics.from_env() (predictors
+# are created several times per process: reloads, benchmarks, backend comparisons)
+_PROFILER = None
+_PROFILER_LOCK = threading.Lock()
+
+
+class _StageTimer:
+    """Times one `with metrics.stage(name):` block"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Thread-safe stage timings (count, sum, max, histogram), counters and gauges.
+    fmt: 'json' or 'prometheus' for export()
+    path: side-channel file written on export (default: stderr)
+    """
+
+    def __init__(self, enabled=False, fmt='json', path=None, profiler=None):
+        if fmt not in METRIC_FORMATS:
+            raise ValueError(f"Unknown metrics format: {fmt}")
+        self.enabled = enabled
+        self.fmt = fmt
+        self.path = path
+        self.profiler = profiler
+        self._stages = {}
+        self._counters = Counter()
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Configure from AGRISMART_METRICS (off | json | prometheus),
+        AGRISMART_METRICS_FILE and AGRISMART_PROFILE (collapsed-stack output path)
+        """
+        setting = os.environ.get('AGRISMART_METRICS', '').strip().lower()
+        enabled = setting not in ('', '0', 'off', 'false', 'no')
+        fmt = setting if setting in METRIC_FORMATS else 'json'
+
+        profiler = None
+        profile_path = os.environ.get('AGRISMART_PROFILE')
+        if profile_path:
+            interval = float(os.environ.get('AGRISMART_PROFILE_INTERVAL_MS', DEFAULT_PROFILE_INTERVAL_MS))
+            profiler = process_profiler(profile_path, interval_ms=interval)
+        return cls(enabled=enabled or profiler is not None, fmt=fmt,
+                   path=os.environ.get('AGRISMART_METRICS_FILE') or None, profiler=profiler)
+
+    def stage(self, name):
+        """Context manager timing one stage (no-op when disabled)"""
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _StageTimer(self, name)
+
+    def observe(self, name, seconds):
+        """Record one stage duration"""
+        with self._lock:
+            record = self._stages.get(name)
+            if record is None:
+                record = self._stages[name] = {'count': 0, 'sum': 0.0, 'max': 0.0,
+                                               'buckets': [0] * len(STAGE_BUCKETS)}
+            record['count'] += 1
+            record['sum'] += seconds
+            record['max'] = max(record['max'], seconds)
+            index = bisect.bisect_left(STAGE_BUCKETS, seconds)
+            if index < len(STAGE_BUCKETS):
+                record['buckets'][index] += 1
+
+    def count(self, name, n=1):
+        """Increment an event counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += n
+
+    def gauge(self, name, value):
+        """Set a point-in-time value"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        """Everything recorded so far as a JSON-friendly dict"""
+        with self._lock:
+            return {
+                'stages': {
+                    name: {
+                        'count': r['count'],
+                        'total_ms': round(r['sum'] * 1000, 3),
+                        'mean_ms': round(r['sum'] / r['count'] * 1000, 3),
+                        'max_ms': round(r['max'] * 1000, 3)
+                    }
+                    for name, r in sorted(self._stages.items())
+                },
+                'counters': dict(sorted(self._counters.items())),
+                'gauges': dict(sorted(self._gauges.items()))
+            }
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        stage_metric = f'{METRIC_PREFIX}_stage_seconds'
+        lines = [f'# HELP {stage_metric} Time spent in each prediction stage',
+                 f'# TYPE {stage_metric} histogram']
+        with self._lock:
+            for name, r in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, n in zip(STAGE_BUCKETS, r['buckets']):
+                    cumulative += n
+                    lines.append(f'{stage_metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{stage_metric}_bucket{{stage="{name}",le="+Inf"}} {r["count"]}')
+                lines.append(f'{stage_metric}_sum{{stage="{name}"}} {r["sum"]:.9f}')
+                lines.append(f'{stage_metric}_count{{stage="{name}"}} {r["count"]}')
+
+            event_metric = f'{METRIC_PREFIX}_events_total'
+            lines += [f'# HELP {event_metric} Predictor events',
+                      f'# TYPE {event_metric} counter']
+            lines += [f'{event_metric}{{event="{name}"}} {value}'
+                      for name, value in sorted(self._counters.items())]
+
+            for name, value in sorted(self._gauges.items()):
+                lines += [f'# TYPE {METRIC_PREFIX}_{name} gauge', f'{METRIC_PREFIX}_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def render(self, fmt=None):
+        fmt = fmt or self.fmt
+        if fmt == 'prometheus':
+            return self.render_prometheus()
+        return json.dumps(self.snapshot()) + '\n'
+
+    def export(self):
+        """
+        Write the metrics to the side-channel file (replaced atomically, as a
+        Prometheus textfile collector expects) or to stderr, and flush the
+        profiler's samples if one is running.
+        """
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler.write()
+        if not self.enabled:
+            return
+
+        text = self.render()
+        if self.path:
+            tmp_path = f'{self.path}.tmp-{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        else:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+
+def process_profiler(path, interval_ms=DEFAULT_PROFILE_INTERVAL_MS):
+    """The process-wide SamplingProfiler, started on first use"""
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            _PROFILER = SamplingProfiler(path, interval_ms=interval_ms)
+            _PROFILER.start()
+        return _PROFILER
+
+
+class SamplingProfiler:
+    """
+    Background thread sampling the stacks of all other threads every interval.
+    write() saves collapsed stacks ('outer;inner count' lines), the input format
+    of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, path, interval_ms=DEFAULT_PROFILE_INTERVAL_MS):
+        self.path = path
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='agrismart-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self):
+        with open(self.path, 'w') as f:
+            for stack, n in self.samples.most_common():
+                f.write(f'{stack} {n}\n')
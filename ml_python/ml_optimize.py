@@ -0,0 +1,113 @@
+# AgriSmart Python ML System
+# Fertilizer / input optimization sweep
+#
+# Finds the nitrogen, phosphorus, potassium (and optionally irrigation) levels
+# that maximize predicted yield - or net value when prices are given - for
+# fixed site conditions. Candidates are scored in batched forest calls: either
+# one full grid, or a coarse-to-fine search that re-grids a shrinking box
+# around the best candidate each round.
+
+import numpy as np
+
+# Inputs that can be optimized; irrigation (mm) is added to rainfall
+OPTIMIZED_INPUTS = ('nitrogen', 'phosphorus', 'potassium', 'irrigation')
+
+# Searched by default (kg/ha), matching the synthetic training ranges
+DEFAULT_INPUT_RANGES = {
+    'nitrogen': (40.0, 250.0),
+    'phosphorus': (15.0, 120.0),
+    'potassium': (20.0, 180.0)
+}
+
+OPTIMIZE_METHODS = ('grid', 'refine')
+# Points per input: full grid / each coarse-to-fine round
+DEFAULT_GRID_POINTS = 11
+DEFAULT_REFINE_POINTS = 7
+DEFAULT_REFINE_ROUNDS = 3
+
+TOP_CANDIDATES = 5
+
+
+def parse_ranges(ranges=None):
+    """
+    Validated {name: (low, high)} for the inputs to optimize, in
+    OPTIMIZED_INPUTS order. Defaults to DEFAULT_INPUT_RANGES.
+    """
+    ranges = ranges or DEFAULT_INPUT_RANGES
+    parsed = {}
+    for name, bounds in ranges.items():
+        if name not in OPTIMIZED_INPUTS:
+            raise ValueError(f"Cannot optimize input: {name}")
+        low, high = (float(v) for v in bounds)
+        if low < 0 or high < low:
+            raise ValueError(f"Invalid range for {name}: {low} to {high}")
+        parsed[name] = (low, high)
+    return {name: parsed[name] for name in OPTIMIZED_INPUTS if name in parsed}
+
+
+def candidate_grid(lows, highs, points):
+    """(n, d) matrix of every combination of `points` values per input"""
+    axes = [np.linspace(low, high, points if high > low else 1) for low, high in zip(lows, highs)]
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+def objective(predicted, candidates, names, prices=None):
+    """
+    Yield, or net value per hectare when prices are given:
+    yield * prices['crop'] - sum(input amount * prices[input])
+    """
+    if not prices:
+        return predicted
+    cost = sum(candidates[:, j] * float(prices.get(name, 0)) for j, name in enumerate(names))
+    return predicted * float(prices.get('crop', 0)) - cost
+
+
+def _rank(values, candidates, lows, highs):
+    """Candidate indices best first; ties go to the smallest (normalized) amount of inputs"""
+    spans = np.where(highs > lows, highs - lows, 1)
+    amount = ((candidates - lows) / spans).sum(axis=1)
+    return np.lexsort((amount, -values))
+
+
+def search(evaluate, ranges, method='refine', points=None, rounds=DEFAULT_REFINE_ROUNDS, prices=None):
+    """
+    Score candidate inputs and return the evaluated candidates with their
+    distribution and objective, plus `order` (indices, best first).
+    evaluate(candidates (n, d)) -> {'predicted', 'confidence', 'std_dev', ...}
+    """
+    if method not in OPTIMIZE_METHODS:
+        raise ValueError(f"Unknown optimization method: {method}")
+    names = list(ranges)
+    lows = np.array([ranges[name][0] for name in names])
+    highs = np.array([ranges[name][1] for name in names])
+
+    if method == 'grid':
+        points, rounds = points or DEFAULT_GRID_POINTS, 1
+    else:
+        points = points or DEFAULT_REFINE_POINTS
+    if points < 2:
+        raise ValueError("At least 2 points per input are needed")
+
+    batches = []
+    box_low, box_high = lows.copy(), highs.copy()
+    for _ in range(rounds):
+        candidates = candidate_grid(box_low, box_high, points)
+        distribution = evaluate(candidates)
+        batches.append((candidates, distribution))
+
+        # Next round: one grid step either side of the best candidate so far
+        all_candidates = np.concatenate([c for c, _ in batches])
+        values = objective(np.concatenate([d['predicted'] for _, d in batches]), all_candidates, names, prices)
+        best = all_candidates[_rank(values, all_candidates, lows, highs)[0]]
+        step = (box_high - box_low) / (points - 1)
+        box_low, box_high = np.maximum(lows, best - step), np.minimum(highs, best + step)
+
+    candidates = np.concatenate([c for c, _ in batches])
+    result = {key: np.concatenate([d[key] for _, d in batches], axis=-1 if key == 'quantiles' else 0)
+              for key in batches[0][1]}
+    result['candidates'] = candidates
+    result['objective'] = objective(result['predicted'], candidates, names, prices)
+    result['order'] = _rank(result['objective'], candidates, lows, highs)
+    result['names'] = names
+    return result
@@ -3,243 +3,368 @@
 # Trained with same data as TypeScript version
 
 import sys
+from time import perf_counter
+_IMPORT_STARTED = perf_counter()
+import copy
 import json
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import mean_squared_error, accuracy_score, r2_score
-import joblib
 import os
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from ml_bundle import ModelBundleError, read_bundle, write_bundle
+from ml_cache import PredictionCache, parse_quantization, DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+from ml_encoding import EncodingIndex, UNKNOWN_POLICIES, DEFAULT_UNKNOWN_POLICY
+from ml_forest_compiler import compile_forest, verify_compiled
+from ml_metrics import Metrics
+from ml_surface import (
+    RecommendationSurface, build_surface, validate_surface, parse_axes, SURFACE_METHODS,
+    DEFAULT_TOP_K, DEFAULT_VALIDATION_SAMPLES, DEFAULT_MAX_YIELD_ERROR, DEFAULT_MAX_PROBABILITY_ERROR
+)
+from ml_backends import (
+    BACKENDS, DEFAULT_BACKEND, ALGORITHMS, check_backend, scales_inputs, has_tree_spread, memory_maps_well,
+    native_categoricals, default_params, make_regressor, make_classifier
+)
+from ml_columnar import (
+    DictionaryColumn, ColumnarWriter, is_columnar, read_table, input_columns, file_columns,
+    count_rows, iter_batches, DEFAULT_BATCH_ROWS
+)
+from ml_drift import FeatureSketch, DriftMonitor, DEFAULT_HALF_LIFE
+from ml_optimize import (
+    parse_ranges, search as search_inputs, objective as input_objective,
+    DEFAULT_REFINE_ROUNDS, TOP_CANDIDATES
+)
+from ml_synthetic_data import (
+    BASE_YIELDS, DEFAULT_BASE_YIELD, TEMPERATURE_PREFS, DEFAULT_TEMPERATURE_RANGE,
+    RAINFALL_PREFS, DEFAULT_RAINFALL_RANGE, SOIL_SUITABILITY, DEFAULT_SOIL_SUITABILITY,
+    temperature_factor, humidity_factor, rainfall_factor, ph_factor, nutrient_factor,
+    generate_synthetic_data, write_synthetic_data
+)
+
+# Training-only modules (pandas, sklearn model_selection / metrics / ensemble,
+# ml_data_sources, ml_incremental, ml_tuning) are imported inside the methods that
+# need them, so the prediction commands start quickly. `startup_check` measures it.
+
+# Model bundles live next to this file, whatever the caller's working directory
+# (AGRISMART_MODEL_DIR points elsewhere, e.g. for benchmarks)
+MODEL_DIR = os.environ.get('AGRISMART_MODEL_DIR') or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Artifacts every bundle must contain
+BUNDLE_ARTIFACTS = ['yield_model', 'crop_yield_model', 'recommendation_model', 'scaler',
+                    'crop_encoder', 'state_encoder', 'district_encoder']
+
+# Forests that get a compiled array form, stored as 'compiled_<name>'
+COMPILED_MODELS = ['yield_model', 'crop_yield_model', 'recommendation_model']
+
+# Lookup-based encoders for prediction (ml_encoding.EncodingIndex); bundles written
+# before it existed are still loadable in sklearn mode, which rebuilds it
+ENCODING_ARTIFACT = 'encoding_index'
+
+# Training distribution of every input (ml_drift.FeatureSketch); optional, so
+# bundles written before it load without drift monitoring
+SKETCH_ARTIFACT = 'feature_sketch'
+
+# Artifacts needed for inference='compiled': no sklearn objects at all, so
+# loading does not import scikit-learn (re-run `compile` for older bundles)
+COMPILED_ARTIFACTS = [ENCODING_ARTIFACT] + [f'compiled_{name}' for name in COMPILED_MODELS]
+
+# Rows of synthetic inputs used to check compiled forests against sklearn
+COMPILE_VERIFY_ROWS = 2000
+
+# Model feature schema, in column order
+FEATURE_COLUMNS = ['state_encoded', 'district_encoded', 'temperature', 'humidity',
+                   'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium']
+
+# Defaults for missing input fields (same values the Node bridge sends)
+DEFAULT_INPUTS = {
+    'state': 'Punjab',
+    'district': 'Ludhiana',
+    'temperature': 25,
+    'humidity': 65,
+    'rainfall': 800,
+    'ph': 6.8,
+    'nitrogen': 120,
+    'phosphorus': 60,
+    'potassium': 80
+}
+
+NUMERIC_INPUTS = ['temperature', 'humidity', 'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium']
+
+# Default forest hyperparameters (override with `train --params <leaderboard.json>` from `tune`)
+YIELD_FOREST_PARAMS = {
+    'n_estimators': 100,  # Same as your current system
+    'max_depth': 15,
+    'min_samples_split': 5,
+    'min_samples_leaf': 3
+}
+# Crop-conditioned yield forest: smaller than the yield forest (about 1/7 of its
+# size and 1/3 of its fit time at 5k-20k rows, R2 within 0.003)
+CROP_YIELD_FOREST_PARAMS = {
+    'n_estimators': 40,
+    'max_depth': 12,
+    'min_samples_split': 10,
+    'min_samples_leaf': 8
+}
+RECOMMENDATION_FOREST_PARAMS = {
+    'n_estimators': 100,  # Same as your current system
+    'max_depth': 20,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+
+# Crops are reported only above this probability. Probabilities that are exact
+# fractions of the tree count can round to either side of the cutoff depending
+# on summation order (sklearn vs compiled), so values within the tolerance count
+# as at the cutoff.
+MIN_CROP_PROBABILITY = 0.01 + 1e-9
+# recommend_crops reports this many crops, ranked by suitability score (percent, 1 decimal)
+RECOMMENDED_CROPS = 5
+
+# Cold-start budget: `import ml_predictor` in a fresh interpreter (startup_check)
+IMPORT_BUDGET_MS = 500
+
+# Modules that importing ml_predictor must not pull in
+TRAINING_ONLY_MODULES = ['pandas', 'sklearn', 'sklearn.ensemble', 'sklearn.model_selection',
+                         'sklearn.metrics', 'matplotlib', 'seaborn']
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+_STARTUP_PROBE = '''
+import sys, json, time
+start = time.perf_counter()
+import ml_predictor
+report = {'import_ms': (time.perf_counter() - start) * 1000,
+          'imported_training_modules': [m for m in ml_predictor.TRAINING_ONLY_MODULES if m in sys.modules]}
+predictor = ml_predictor.AgriSmartMLPredictor(cache_size=0)
+try:
+    start = time.perf_counter()
+    predictor.ensure_models()
+    report['load_ms'] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    predictor.predict_yield({})
+    report['first_prediction_ms'] = (time.perf_counter() - start) * 1000
+except ml_predictor.ModelBundleError:
+    report['load_ms'] = report['first_prediction_ms'] = None
+print(json.dumps(report))
+'''
+
+# Quantiles reported with every yield prediction
+YIELD_QUANTILES = (0.1, 0.5, 0.9)
+
+class ForestUncertainty:
+    """
+    Per-tree outputs of a fitted RandomForestRegressor in one vectorized pass.
+    One apply() call gives the leaf index of every row in every tree; a flat
+    lookup array of all leaf values turns that into an (n_rows, n_trees) matrix.
+    """
+    
+    def __init__(self, model):
+        self.model = model
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        self.offsets = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+        self.leaf_values = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+    
+    def tree_predictions(self, features_scaled):
+        """(n_rows, n_trees) matrix of individual tree predictions"""
+        leaves = self.model.apply(features_scaled)
+        return self.leaf_values[leaves + self.offsets]
+
+def yield_confidence(predicted, std_dev):
+    """60-95% confidence score from the relative spread of a yield prediction"""
+    return np.clip(1 - (std_dev / predicted) * 2, 0.6, 0.95)
+
+def summarize_tree_predictions(per_tree, quantiles=YIELD_QUANTILES):
+    """Mean prediction, spread across all trees and the 60-95% confidence score"""
+    predicted = per_tree.mean(axis=1)
+    std_dev = per_tree.std(axis=1)
+    return {
+        'predicted': predicted,
+        'std_dev': std_dev,
+        'quantiles': np.quantile(per_tree, quantiles, axis=1),
+        'confidence': yield_confidence(predicted, std_dev)
+    }
+
 class AgriSmartMLPredictor:
-    def __init__(self):
+    def __init__(self, model_path=None, inference=None, cache_size=None, cache_ttl=None, cache_quantization=None,
+                 unknown_category=None, metrics=None, surface=None):
         self.yield_model = None
+        self.crop_yield_model = None
         self.recommendation_model = None
         self.scaler = None
         self.crop_encoder = None
         self.state_encoder = None
         self.district_encoder = None
+        self.encoding = None
         self.is_trained = False
-        self.model_path = 'ml_python/models/'
+        self.model_path = model_path or MODEL_DIR
+        self.bundle_version = None
         self.training_stats = {}
+        self._uncertainty_engines = {}
+        # Loads always check artifact sizes; full SHA-256 checks run on server reloads
+        # and updates, or on every load with AGRISMART_VERIFY_BUNDLE=1
+        self.verify_bundle = os.environ.get('AGRISMART_VERIFY_BUNDLE', '0').lower() in ('1', 'true', 'on')
+        
+        # 'sklearn' runs the fitted forests; 'compiled' loads only the flattened
+        # array form (scaler folded in), which loads faster and uses less RAM
+        self.inference = inference or os.environ.get('AGRISMART_INFERENCE', 'sklearn')
+        if self.inference not in ('sklearn', 'compiled'):
+            raise ValueError(f"Unknown inference mode: {self.inference}")
+        self.compiled_models = {}
+        
+        # Unknown states / districts: 'nearest' known name (else the state's default
+        # district), 'state_default', 'lowest_code' (the first known label), or 'error'
+        self.unknown_category = unknown_category or os.environ.get('AGRISMART_UNKNOWN_CATEGORY',
+                                                                   DEFAULT_UNKNOWN_POLICY)
+        if self.unknown_category not in UNKNOWN_POLICIES:
+            raise ValueError(f"Unknown category policy: {self.unknown_category}")
+        
+        # Repeated requests are answered from an LRU + TTL cache keyed on the
+        # encoded features; cleared whenever models are loaded, trained or updated
+        if cache_size is None:
+            cache_size = int(os.environ.get('AGRISMART_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+        if cache_ttl is None:
+            cache_ttl = float(os.environ.get('AGRISMART_CACHE_TTL', DEFAULT_CACHE_TTL))
+        if cache_quantization is None:
+            cache_quantization = os.environ.get('AGRISMART_CACHE_QUANTIZE', '')
+        self.cache = PredictionCache(
+            max_size=cache_size,
+            ttl=cache_ttl if cache_ttl > 0 else None,
+            steps=parse_quantization(cache_quantization, FEATURE_COLUMNS)
+        )
+        
+        # Precomputed recommendation surface ('nearest' / 'multilinear', see
+        # precompute_surface); locations outside the error bounds use the models
+        self.surface_method = surface or os.environ.get('AGRISMART_SURFACE', 'off')
+        if self.surface_method not in ('off',) + SURFACE_METHODS:
+            raise ValueError(f"Unknown surface method: {self.surface_method}")
+        self.surface_bounds = (
+            float(os.environ.get('AGRISMART_SURFACE_MAX_YIELD_ERROR', DEFAULT_MAX_YIELD_ERROR)),
+            float(os.environ.get('AGRISMART_SURFACE_MAX_PROBABILITY_ERROR', DEFAULT_MAX_PROBABILITY_ERROR))
+        )
+        self.surface = None
+        
+        # Live inputs are compared with the bundle's training sketch on every
+        # prediction (AGRISMART_DRIFT=off disables); AGRISMART_DRIFT_FILE keeps the
+        # counts across processes, e.g. one-shot CLI calls
+        self.drift_enabled = os.environ.get('AGRISMART_DRIFT', 'on') != 'off'
+        self.drift_half_life = float(os.environ.get('AGRISMART_DRIFT_HALF_LIFE', DEFAULT_HALF_LIFE))
+        self.drift_file = os.environ.get('AGRISMART_DRIFT_FILE')
+        self.feature_sketch = None
+        self.drift = None
+        
+        # Per-stage timers and counters (AGRISMART_METRICS=json|prometheus); written to
+        # stderr or AGRISMART_METRICS_FILE by export_metrics, never to stdout
+        self.metrics = metrics if metrics is not None else Metrics.from_env()
+        self.metrics.gauge('import_seconds', round(IMPORT_SECONDS, 6))
         
         # Create models directory
         os.makedirs(self.model_path, exist_ok=True)
         
-    def create_synthetic_training_data(self):
+    @property
+    def backend(self):
+        """Model backend of the trained / loaded bundle (see ml_backends)"""
+        return self.training_stats.get('backend', DEFAULT_BACKEND)
+    
+    def create_synthetic_training_data(self, n_samples=1200, seed=42, chunk_size=1_000_000):
         """
         Create comprehensive training dataset similar to your current system
         37+ crops, 15 soil types, multiple environmental conditions
         """
         print("Creating synthetic training dataset...")
         
-        # Your 37+ crops from the current system
-        crops = [
-            'Rice', 'Wheat', 'Maize', 'Barley', 'Millet', 'Sorghum',  # Cereals
-            'Cotton', 'Sugarcane', 'Tobacco', 'Jute',  # Cash crops
-            'Groundnut', 'Sunflower', 'Sesame', 'Safflower', 'Mustard', 'Soybean',  # Oilseeds
-            'Chickpea', 'Pigeon Pea', 'Black Gram', 'Green Gram', 'Lentil', 'Field Pea',  # Pulses
-            'Potato', 'Tomato', 'Onion', 'Cabbage', 'Cauliflower', 'Carrot', 'Brinjal', 'Okra', 'Cucumber', 'Pumpkin',  # Vegetables
-            'Apple', 'Banana', 'Orange', 'Mango', 'Grapes', 'Pomegranate',  # Fruits
-            'Chili', 'Turmeric', 'Coriander', 'Cumin', 'Fenugreek'  # Spices
-        ]
-        
-        # Indian states and districts
-        states = [
-            'Punjab', 'Haryana', 'Uttar Pradesh', 'Madhya Pradesh', 'Maharashtra', 
-            'Gujarat', 'Rajasthan', 'West Bengal', 'Bihar', 'Odisha',
-            'Andhra Pradesh', 'Tamil Nadu', 'Karnataka', 'Kerala', 'Telangana'
-        ]
-        
-        districts = [
-            'Ludhiana', 'Amritsar', 'Chandigarh', 'Gurugram', 'Faridabad',
-            'Agra', 'Lucknow', 'Kanpur', 'Indore', 'Bhopal', 'Mumbai', 'Pune',
-            'Ahmedabad', 'Surat', 'Jaipur', 'Jodhpur', 'Kolkata', 'Howrah'
-        ]
-        
-        # Soil types from your current system
-        soil_types = [
-            'Red', 'Black', 'Alluvial', 'Clayey', 'Sandy', 'Loamy', 'Silt',
-            'Peat', 'Chalk', 'Saline', 'Acidic', 'Alkaline', 'Volcanic', 'Desert', 'Laterite'
-        ]
-        
-        # Generate comprehensive training data
-        training_data = []
-        np.random.seed(42)  # For reproducible results
-        
-        # Create 1000+ training samples (matching your current training size)
-        for _ in range(1200):
-            crop = np.random.choice(crops)
-            state = np.random.choice(states)
-            district = np.random.choice(districts) 
-            soil_type = np.random.choice(soil_types)
-            
-            # Environmental parameters with realistic ranges
-            temperature = np.random.normal(25, 8)  # 15-35°C typical range
-            humidity = np.random.normal(65, 15)    # 40-90% typical range
-            rainfall = np.random.normal(800, 300)  # 200-1500mm typical range
-            ph = np.random.normal(6.8, 1.2)       # 4.5-8.5 typical range
-            nitrogen = np.random.normal(120, 40)   # 50-200 kg/ha
-            phosphorus = np.random.normal(60, 20)  # 20-100 kg/ha
-            potassium = np.random.normal(80, 30)   # 30-150 kg/ha
-            
-            # Ensure realistic bounds
-            temperature = np.clip(temperature, 15, 40)
-            humidity = np.clip(humidity, 30, 95)
-            rainfall = np.clip(rainfall, 200, 1800)
-            ph = np.clip(ph, 4.5, 9.0)
-            nitrogen = np.clip(nitrogen, 40, 250)
-            phosphorus = np.clip(phosphorus, 15, 120)
-            potassium = np.clip(potassium, 20, 180)
-            
-            # Calculate yield based on crop-specific factors and conditions
-            base_yield = self.get_base_yield(crop)
-            
-            # Environmental factors affecting yield
-            temp_factor = self.get_temperature_factor(crop, temperature)
-            humidity_factor = self.get_humidity_factor(crop, humidity)
-            rainfall_factor = self.get_rainfall_factor(crop, rainfall)
-            ph_factor = self.get_ph_factor(crop, ph)
-            soil_factor = self.get_soil_factor(crop, soil_type)
-            nutrient_factor = self.get_nutrient_factor(nitrogen, phosphorus, potassium)
-            
-            # Calculate final yield with some randomness
-            yield_kg_ha = base_yield * temp_factor * humidity_factor * rainfall_factor * ph_factor * soil_factor * nutrient_factor
-            yield_kg_ha = yield_kg_ha * np.random.normal(1.0, 0.15)  # Add 15% variability
-            yield_kg_ha = max(100, yield_kg_ha)  # Minimum viable yield
-            
-            training_data.append({
-                'crop': crop,
-                'state': state,
-                'district': district,
-                'soil_type': soil_type,
-                'temperature': round(temperature, 1),
-                'humidity': round(humidity, 1),
-                'rainfall': round(rainfall, 1),
-                'ph': round(ph, 2),
-                'nitrogen': round(nitrogen, 1),
-                'phosphorus': round(phosphorus, 1),
-                'potassium': round(potassium, 1),
-                'yield_kg_ha': round(yield_kg_ha, 0)
-            })
-        
-        df = pd.DataFrame(training_data)
+        df = generate_synthetic_data(n_samples=n_samples, seed=seed, chunk_size=chunk_size)
         print(f"Created training dataset with {len(df)} samples")
         print(f"Crops: {len(df['crop'].unique())}, States: {len(df['state'].unique())}")
         return df
     
     def get_base_yield(self, crop):
         """Get base yield for different crops (kg/ha)"""
-        base_yields = {
-            # Cereals - high yield potential
-            'Rice': 3500, 'Wheat': 3200, 'Maize': 4000, 'Barley': 2800, 'Millet': 1500, 'Sorghum': 2000,
-            
-            # Cash crops - very high yield potential  
-            'Cotton': 2500, 'Sugarcane': 75000, 'Tobacco': 2200, 'Jute': 2800,
-            
-            # Oilseeds - moderate yield
-            'Groundnut': 2200, 'Sunflower': 1800, 'Sesame': 800, 'Safflower': 1200, 'Mustard': 1500, 'Soybean': 2500,
-            
-            # Pulses - moderate yield
-            'Chickpea': 1800, 'Pigeon Pea': 1500, 'Black Gram': 1200, 'Green Gram': 1000, 'Lentil': 1300, 'Field Pea': 1800,
-            
-            # Vegetables - high yield potential
-            'Potato': 25000, 'Tomato': 35000, 'Onion': 20000, 'Cabbage': 30000, 'Cauliflower': 25000, 
-            'Carrot': 22000, 'Brinjal': 18000, 'Okra': 12000, 'Cucumber': 15000, 'Pumpkin': 20000,
-            
-            # Fruits - very high yield potential
-            'Apple': 15000, 'Banana': 40000, 'Orange': 20000, 'Mango': 12000, 'Grapes': 18000, 'Pomegranate': 10000,
-            
-            # Spices - moderate yield
-            'Chili': 3000, 'Turmeric': 6000, 'Coriander': 1500, 'Cumin': 1200, 'Fenugreek': 1800
-        }
-        return base_yields.get(crop, 2000)
+        return BASE_YIELDS.get(crop, DEFAULT_BASE_YIELD)
     
     def get_temperature_factor(self, crop, temp):
         """Temperature suitability factor for crops"""
-        # Optimal temperature ranges for different crop categories
-        temp_prefs = {
-            'Rice': (20, 35), 'Wheat': (15, 25), 'Maize': (18, 32), 'Cotton': (21, 30),
-            'Sugarcane': (20, 35), 'Potato': (15, 25), 'Tomato': (18, 28)
-        }
-        
-        if crop in temp_prefs:
-            opt_min, opt_max = temp_prefs[crop]
-        else:
-            opt_min, opt_max = 18, 30  # Default range
-            
-        if opt_min <= temp <= opt_max:
-            return 1.0
-        elif temp < opt_min:
-            return max(0.3, 1 - (opt_min - temp) * 0.05)
-        else:
-            return max(0.3, 1 - (temp - opt_max) * 0.05)
+        opt_min, opt_max = TEMPERATURE_PREFS.get(crop, DEFAULT_TEMPERATURE_RANGE)
+        return float(temperature_factor(temp, opt_min, opt_max))
     
     def get_humidity_factor(self, crop, humidity):
         """Humidity suitability factor"""
-        if 50 <= humidity <= 80:
-            return 1.0
-        elif humidity < 50:
-            return max(0.4, 1 - (50 - humidity) * 0.02)
-        else:
-            return max(0.6, 1 - (humidity - 80) * 0.01)
+        return float(humidity_factor(humidity))
     
     def get_rainfall_factor(self, crop, rainfall):
         """Rainfall suitability factor"""
-        rainfall_prefs = {
-            'Rice': (1000, 1500), 'Wheat': (400, 800), 'Cotton': (600, 1200),
-            'Sugarcane': (1200, 1800), 'Potato': (500, 800)
-        }
-        
-        if crop in rainfall_prefs:
-            opt_min, opt_max = rainfall_prefs[crop]
-        else:
-            opt_min, opt_max = 600, 1200  # Default range
-            
-        if opt_min <= rainfall <= opt_max:
-            return 1.0
-        elif rainfall < opt_min:
-            return max(0.3, 1 - (opt_min - rainfall) * 0.0005)
-        else:
-            return max(0.7, 1 - (rainfall - opt_max) * 0.0003)
+        opt_min, opt_max = RAINFALL_PREFS.get(crop, DEFAULT_RAINFALL_RANGE)
+        return float(rainfall_factor(rainfall, opt_min, opt_max))
     
     def get_ph_factor(self, crop, ph):
         """Soil pH suitability factor"""
-        if 6.0 <= ph <= 7.5:
-            return 1.0
-        elif ph < 6.0:
-            return max(0.4, 1 - (6.0 - ph) * 0.1)
-        else:
-            return max(0.5, 1 - (ph - 7.5) * 0.08)
+        return float(ph_factor(ph))
     
     def get_soil_factor(self, crop, soil_type):
         """Soil type suitability factor"""
-        soil_suitability = {
-            'Alluvial': 1.0, 'Loamy': 0.95, 'Black': 0.9, 'Red': 0.85,
-            'Clayey': 0.8, 'Sandy': 0.7, 'Silt': 0.75, 'Laterite': 0.6
-        }
-        return soil_suitability.get(soil_type, 0.7)
+        return SOIL_SUITABILITY.get(soil_type, DEFAULT_SOIL_SUITABILITY)
     
     def get_nutrient_factor(self, n, p, k):
         """Nutrient availability factor"""
-        # Optimal NPK ranges
-        n_factor = min(1.0, n / 100) if n > 0 else 0.3
-        p_factor = min(1.0, p / 50) if p > 0 else 0.3  
-        k_factor = min(1.0, k / 60) if k > 0 else 0.3
+        return float(nutrient_factor(n, p, k))
+    
+    def load_historical_training_data(self, sqlite_path=None, snapshot_path=None, refresh=False):
+        """
+        Training rows from the historical_crop_data table.
+        Reads the local snapshot of the same database if present; otherwise
+        streams the table from MySQL (or an SQLite copy of it) and caches it first.
+        """
+        from ml_data_sources import connect_mysql, load_historical_data, mysql_source, sqlite_source
         
-        return (n_factor + p_factor + k_factor) / 3
+        if sqlite_path:
+            import sqlite3
+            connect = lambda: sqlite3.connect(sqlite_path)
+            source = sqlite_source(sqlite_path)
+        else:
+            connect = connect_mysql
+            source = mysql_source()
+        return load_historical_data(connect, DEFAULT_INPUTS, snapshot_path=snapshot_path, refresh=refresh,
+                                    source=source)
     
-    def train_models(self):
-        """Train Random Forest models for yield prediction and crop recommendation"""
-        print("Training Random Forest models...")
+    def train_models(self, n_samples=1200, seed=42, training_data=None, data_source='synthetic',
+                     forest_params=None, backend=None, params_backend=None):
+        """
+        Train the yield prediction and crop recommendation models.
+        training_data: optional DataFrame (e.g. historical rows) used instead of synthetic samples
+        forest_params: optional {'yield': {...}, 'crop_yield': {...}, 'recommendation': {...}}; each given
+            task's parameters replace its defaults (see `tune`)
+        backend: 'random_forest' (default, or AGRISMART_BACKEND) or 'hist_gradient_boosting'
+        params_backend: backend forest_params were tuned for; must match the backend trained
+        """
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        from sklearn.metrics import mean_squared_error, accuracy_score, r2_score
+        
+        backend = check_backend(backend or os.environ.get('AGRISMART_BACKEND', DEFAULT_BACKEND))
+        if params_backend is not None and params_backend != backend:
+            raise ValueError(f"Parameters were tuned for {params_backend}, not {backend}; "
+                             f"train with --backend {params_backend} or without --params")
+        print(f"Training {ALGORITHMS[backend]['name']} models...")
+        forest_params = forest_params or {}
+        if backend == 'random_forest':
+            defaults = {'yield': YIELD_FOREST_PARAMS, 'crop_yield': CROP_YIELD_FOREST_PARAMS,
+                        'recommendation': RECOMMENDATION_FOREST_PARAMS}
+        else:
+            defaults = default_params(backend)
+        # A task's tuned parameters replace its defaults: the search scored each
+        # configuration with sklearn defaults for everything it does not list
+        yield_params = dict(forest_params.get('yield') or defaults['yield'])
+        crop_yield_params = dict(forest_params.get('crop_yield') or defaults['crop_yield'])
+        recommendation_params = dict(forest_params.get('recommendation') or defaults['recommendation'])
         
         # Create training data
-        df = self.create_synthetic_training_data()
+        if training_data is None:
+            df = self.create_synthetic_training_data(n_samples=n_samples, seed=seed)
+        else:
+            df = training_data
+            if len(df) < 10:
+                raise ValueError(f"Not enough training rows: {len(df)}")
         
         # Prepare encoders
         self.crop_encoder = LabelEncoder()
@@ -251,34 +376,35 @@ class AgriSmartMLPredictor:
         df_encoded['crop_encoded'] = self.crop_encoder.fit_transform(df['crop'])
         df_encoded['state_encoded'] = self.state_encoder.fit_transform(df['state'])
         df_encoded['district_encoded'] = self.district_encoder.fit_transform(df['district'])
+        self.encoding = self._build_encoding(df)
         
         # Features for training
-        feature_cols = ['state_encoded', 'district_encoded', 'temperature', 'humidity', 
-                       'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium']
+        feature_cols = FEATURE_COLUMNS
         
-        X = df_encoded[feature_cols]
+        X = df_encoded[feature_cols].to_numpy(dtype=float)
+        self.feature_sketch = self._build_sketch(X)
         y_yield = df_encoded['yield_kg_ha']
         y_crop = df_encoded['crop_encoded']
         
-        # Scale features
+        # Scale features (kept for every backend: compile and surface checks use its statistics).
+        # Fitted on the bare matrix: prediction hands the scaler arrays, not named columns
         self.scaler = StandardScaler()
         X_scaled = self.scaler.fit_transform(X)
+        X_model = X_scaled if scales_inputs(backend) else X
+        
+        # Label-coded columns the backend may split on as categories
+        categorical = native_categoricals({0: len(self.state_encoder.classes_), 1: len(self.district_encoder.classes_)})
+        crop_categorical = categorical + native_categoricals({len(feature_cols): len(self.crop_encoder.classes_)})
         
         # Split data
         X_train, X_test, y_yield_train, y_yield_test, y_crop_train, y_crop_test = train_test_split(
-            X_scaled, y_yield, y_crop, test_size=0.2, random_state=42
+            X_model, y_yield, y_crop, test_size=0.2, random_state=42
         )
+        fit_started = perf_counter()
         
-        # Train Yield Prediction Model (Random Forest Regressor)
+        # Train Yield Prediction Model
         print("Training yield prediction model...")
-        self.yield_model = RandomForestRegressor(
-            n_estimators=100,  # Same as your current system
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=3,
-            random_state=42,
-            n_jobs=-1
-        )
+        self.yield_model = make_regressor(backend, yield_params, categorical, YIELD_QUANTILES)
         
         self.yield_model.fit(X_train, y_yield_train)
         
@@ -287,18 +413,20 @@ class AgriSmartMLPredictor:
         yield_mse = mean_squared_error(y_yield_test, yield_pred)
         yield_r2 = r2_score(y_yield_test, yield_pred)
         
-        # Train Crop Recommendation Model (Random Forest Classifier)
+        # Train Crop-Conditioned Yield Model (same features plus the crop code)
+        print("Training crop-conditioned yield model...")
+        self.crop_yield_model = make_regressor(backend, crop_yield_params, crop_categorical, YIELD_QUANTILES)
+        
+        self.crop_yield_model.fit(np.column_stack([X_train, y_crop_train]), y_yield_train)
+        crop_yield_pred = self.crop_yield_model.predict(np.column_stack([X_test, y_crop_test]))
+        crop_yield_r2 = r2_score(y_yield_test, crop_yield_pred)
+        
+        # Train Crop Recommendation Model
         print("Training crop recommendation model...")
-        self.recommendation_model = RandomForestClassifier(
-            n_estimators=100,  # Same as your current system
-            max_depth=20,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
-        )
+        self.recommendation_model = make_classifier(backend, recommendation_params, categorical, y_crop_train)
         
         self.recommendation_model.fit(X_train, y_crop_train)
+        fit_seconds = perf_counter() - fit_started
         
         # Evaluate recommendation model
         crop_pred = self.recommendation_model.predict(X_test)
@@ -311,9 +439,15 @@ class AgriSmartMLPredictor:
             'num_states': len(df['state'].unique()),
             'yield_mse': float(yield_mse),
             'yield_r2': float(yield_r2),
+            'crop_yield_r2': float(crop_yield_r2),
             'crop_accuracy': float(crop_accuracy),
             'training_date': datetime.now().isoformat(),
-            'algorithm': 'Random Forest (Scikit-learn)',
+            'algorithm': ALGORITHMS[backend]['name'],
+            'backend': backend,
+            'fit_seconds': round(fit_seconds, 3),
+            'data_source': data_source,
+            'forest_params': {'yield': yield_params, 'crop_yield': crop_yield_params,
+                              'recommendation': recommendation_params},
             'features': feature_cols
         }
         
@@ -326,159 +460,1143 @@ class AgriSmartMLPredictor:
         # Save models
         self.save_models()
         
+    def tune_models(self, n_samples=1200, seed=42, training_data=None, folds=5, workers=None,
+                    grid=None, targets=None, output=None):
+        """
+        Cross-validated hyperparameter search over all three forests (see ml_tuning).
+        Writes the leaderboard plus the selected parameters to `output`
+        (default <model_path>/tuning/leaderboard.json) for `train --params`.
+        """
+        from sklearn.preprocessing import LabelEncoder
+        from ml_tuning import cache_dataset, run_search, select_configs, print_leaderboard, write_leaderboard
+        
+        df = training_data if training_data is not None else \
+            self.create_synthetic_training_data(n_samples=n_samples, seed=seed)
+        
+        # Forests are insensitive to feature scaling, so the search uses raw features
+        X = np.column_stack([
+            LabelEncoder().fit_transform(df['state']),
+            LabelEncoder().fit_transform(df['district'])
+        ] + [df[column].to_numpy(dtype=float) for column in NUMERIC_INPUTS])
+        y_yield = df['yield_kg_ha'].to_numpy(dtype=float)
+        y_crop = LabelEncoder().fit_transform(df['crop'])
+        
+        tuning_dir = os.path.join(self.model_path, 'tuning')
+        dataset_path = cache_dataset(tuning_dir, X, y_yield, y_crop, folds=folds, seed=seed)
+        leaderboard = run_search(dataset_path, grid=grid, workers=workers, folds=folds)
+        selected = select_configs(leaderboard, targets)
+        
+        print_leaderboard(leaderboard)
+        output = output or os.path.join(tuning_dir, 'leaderboard.json')
+        write_leaderboard(output, leaderboard, selected, {'samples': len(df), 'folds': folds})
+        for task, row in selected.items():
+            print(f"Selected {task}: {row['params']} ({row['metric']} {row['cv_mean']:.3f}, {row['predict_ms']:.2f} ms/row)")
+        print(f"Leaderboard written to {output}")
+        return leaderboard, selected
+    
+    def compare_backends(self, n_samples=5000, seed=42, training_data=None, backends=BACKENDS,
+                         latency_rows=1000, repeats=20, output=None):
+        """
+        Train every backend on the same rows (and the same held-out split) in a
+        scratch directory and report model size, fit time, load time, single-row
+        and batch latency, and held-out accuracy side by side.
+        """
+        import tempfile
+        from ml_backends import print_comparison
+        from ml_benchmark import benchmark_inputs
+        
+        df = training_data if training_data is not None else \
+            self.create_synthetic_training_data(n_samples=n_samples, seed=seed)
+        rows = benchmark_inputs(latency_rows)
+        
+        def median_ms(call):
+            times = []
+            for _ in range(repeats):
+                start = perf_counter()
+                call()
+                times.append((perf_counter() - start) * 1000)
+            return float(np.median(times))
+        
+        report = []
+        with tempfile.TemporaryDirectory(prefix='agrismart-backends-') as scratch:
+            for backend in backends:
+                model_path = os.path.join(scratch, check_backend(backend))
+                trainer = AgriSmartMLPredictor(model_path=model_path, cache_size=0)
+                trainer.train_models(training_data=df, data_source='backend_comparison', backend=backend)
+                _, manifest = read_bundle(model_path, [], load=[])
+                
+                predictor = AgriSmartMLPredictor(model_path=model_path, inference='sklearn', cache_size=0)
+                start = perf_counter()
+                predictor.ensure_models()
+                load_ms = (perf_counter() - start) * 1000
+                
+                batch_ms = median_ms(lambda: predictor.recommend_crops_batch(rows))
+                stats = predictor.training_stats
+                report.append({
+                    'backend': backend,
+                    'model_bytes': sum(manifest['artifacts'][name]['bytes'] for name in COMPILED_MODELS),
+                    'artifact_bytes': {name: manifest['artifacts'][name]['bytes'] for name in COMPILED_MODELS},
+                    'fit_seconds': stats['fit_seconds'],
+                    'load_ms': round(load_ms, 1),
+                    'predict_yield_ms': round(median_ms(lambda: predictor.predict_yield(rows[0])), 3),
+                    'recommend_crops_ms': round(median_ms(lambda: predictor.recommend_crops(rows[0])), 3),
+                    'batch_rows_per_second': round(len(rows) / batch_ms * 1000, 1),
+                    'yield_r2': stats['yield_r2'],
+                    'crop_yield_r2': stats['crop_yield_r2'],
+                    'crop_accuracy': stats['crop_accuracy']
+                })
+        
+        print_comparison(report)
+        if output:
+            with open(output, 'w') as f:
+                json.dump({'samples': len(df), 'latency_rows': latency_rows, 'backends': report}, f, indent=2)
+            print(f"Comparison written to {output}")
+        return report
+    
+    def update_models(self, new_data, n_new_trees=20, max_trees=None, rescale=False, seed=None,
+                      data_source='incremental'):
+        """
+        Fold new rows into the active bundle instead of retraining from scratch.
+        Encoders are extended (existing codes unchanged) and n_new_trees fitted on
+        the new rows only are added to each forest; max_trees retires the oldest
+        trees beyond that count.
+        The scaler is kept as is by default (forests do not depend on the scale,
+        and existing trees stay exact). rescale=True updates it from running
+        statistics and re-expresses the existing splits in the new scaled space.
+        """
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score, r2_score
+        from ml_incremental import extend_encoder, remap_thresholds, grow_forest
+        
+        print(f"Updating models with {len(new_data)} new rows...")
+        
+        # Fresh, writable copies of the sklearn forests (not the memory-mapped ones)
+        artifacts, manifest = read_bundle(self.model_path, BUNDLE_ARTIFACTS, mmap=False, verify=True,
+                                          load=BUNDLE_ARTIFACTS + [ENCODING_ARTIFACT, SKETCH_ARTIFACT])
+        if artifacts is None:
+            raise ModelBundleError(
+                f"No trained model bundle in {self.model_path}; run `python ml_predictor.py train` first"
+            )
+        for name in BUNDLE_ARTIFACTS:
+            setattr(self, name, artifacts[name])
+        previous_encoding = artifacts.get(ENCODING_ARTIFACT)
+        self.training_stats = dict(manifest.get('training_stats', {}))
+        if self.backend != 'random_forest':
+            raise ValueError(f"Incremental updates need random_forest models; retrain the {self.backend} bundle instead")
+        
+        df = new_data
+        added = {}
+        for field, encoder in (('crop', self.crop_encoder), ('state', self.state_encoder),
+                               ('district', self.district_encoder)):
+            added[field] = extend_encoder(encoder, df[field].astype(str))
+            if added[field]:
+                print(f"New {field} labels: {', '.join(added[field])}")
+        self.encoding = self._build_encoding(df, previous_encoding)
+        
+        X_raw = np.column_stack([
+            self.state_encoder.transform(df['state'].astype(str)),
+            self.district_encoder.transform(df['district'].astype(str))
+        ] + [df[column].to_numpy(dtype=float) for column in NUMERIC_INPUTS])
+        y_yield = df['yield_kg_ha'].to_numpy(dtype=float)
+        y_crop = self.crop_encoder.transform(df['crop'].astype(str))
+        
+        # The training sketch keeps its bins and counts the new rows in
+        self.feature_sketch = artifacts.get(SKETCH_ARTIFACT)
+        if self.feature_sketch is not None:
+            self.feature_sketch.extend_categories(0, len(self.state_encoder.classes_))
+            self.feature_sketch.extend_categories(1, len(self.district_encoder.classes_))
+            self.feature_sketch.add(X_raw)
+        
+        if rescale:
+            # Running-statistics scaler update, then move the old splits to match
+            old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+            self.scaler.partial_fit(X_raw)
+            for name in COMPILED_MODELS:
+                remap_thresholds(getattr(self, name), old_mean, old_scale, self.scaler.mean_, self.scaler.scale_)
+        
+        X_scaled = self.scaler.transform(X_raw)
+        X_train, X_test, y_yield_train, y_yield_test, y_crop_train, y_crop_test = train_test_split(
+            X_scaled, y_yield, y_crop, test_size=0.2, random_state=42
+        )
+        
+        updates = self.training_stats.get('incremental_updates', 0) + 1
+        random_state = (seed if seed is not None else 42) + updates
+        n_crops = len(self.crop_encoder.classes_)
+        
+        print("Growing yield prediction model...")
+        grow_forest(self.yield_model, X_train, y_yield_train, n_new_trees, max_trees, random_state)
+        print("Growing crop-conditioned yield model...")
+        grow_forest(self.crop_yield_model, np.column_stack([X_train, y_crop_train]), y_yield_train,
+                    n_new_trees, max_trees, random_state)
+        print("Growing crop recommendation model...")
+        grow_forest(self.recommendation_model, X_train, y_crop_train, n_new_trees, max_trees,
+                    random_state, n_classes=n_crops)
+        
+        # Evaluate the updated forests on held-out new rows
+        yield_r2 = r2_score(y_yield_test, self.yield_model.predict(X_test))
+        crop_yield_r2 = r2_score(y_yield_test, self.crop_yield_model.predict(np.column_stack([X_test, y_crop_test])))
+        crop_accuracy = accuracy_score(y_crop_test, self.recommendation_model.predict(X_test))
+        
+        self.training_stats.update({
+            'training_samples': self.training_stats.get('training_samples', 0) + len(df),
+            'num_crops': n_crops,
+            'num_states': len(self.state_encoder.classes_),
+            'update_yield_r2': float(yield_r2),
+            'update_crop_yield_r2': float(crop_yield_r2),
+            'update_crop_accuracy': float(crop_accuracy),
+            'incremental_updates': updates,
+            'last_update': datetime.now().isoformat(),
+            'last_update_source': data_source,
+            'scaler_samples_seen': int(np.max(self.scaler.n_samples_seen_)),
+            'n_trees': {name: len(getattr(self, name).estimators_) for name in COMPILED_MODELS}
+        })
+        
+        print(f"Update completed! (trees: {', '.join(f'{name} {n}' for name, n in self.training_stats['n_trees'].items())})")
+        print(f"Yield Prediction R2 Score (new rows): {yield_r2:.3f}")
+        print(f"Crop Classification Accuracy (new rows): {crop_accuracy:.3f}")
+        
+        # Forests were modified in place; drop cached per-tree lookups
+        self._uncertainty_engines = {}
+        self.is_trained = True
+        self.save_models()
+        return added
+    
+    def _build_encoding(self, df, previous=None):
+        """
+        EncodingIndex for the current encoders. Each state's default district is
+        its most common district in df, and each district's state its most common
+        state (both kept from `previous` for labels it already knows).
+        """
+        counts = df.groupby(['state', 'district'], observed=True).size()
+        state_districts = dict(previous.state_districts) if previous is not None else {}
+        for state in counts.index.get_level_values(0).unique():
+            state_districts.setdefault(str(state), str(counts[state].idxmax()))
+        district_states = dict(previous.district_states) if previous is not None else {}
+        by_district = counts.swaplevel()
+        for district in counts.index.get_level_values(1).unique():
+            district_states.setdefault(str(district), str(by_district[district].idxmax()))
+        
+        return EncodingIndex.from_encoders(
+            self.state_encoder, self.district_encoder, self.crop_encoder,
+            state_districts=state_districts,
+            district_states=district_states,
+            default_state=DEFAULT_INPUTS['state'],
+            default_district=DEFAULT_INPUTS['district']
+        )
+    
     def save_models(self):
-        """Save trained models and encoders"""
+        """Save trained models, encoders and stats as a new versioned bundle"""
         print("Saving models...")
         
-        joblib.dump(self.yield_model, f'{self.model_path}/yield_model.pkl')
-        joblib.dump(self.recommendation_model, f'{self.model_path}/recommendation_model.pkl')
-        joblib.dump(self.scaler, f'{self.model_path}/scaler.pkl')
-        joblib.dump(self.crop_encoder, f'{self.model_path}/crop_encoder.pkl')
-        joblib.dump(self.state_encoder, f'{self.model_path}/state_encoder.pkl')
-        joblib.dump(self.district_encoder, f'{self.model_path}/district_encoder.pkl')
+        artifacts = {name: getattr(self, name) for name in BUNDLE_ARTIFACTS}
+        if self.encoding is None:
+            self.encoding = EncodingIndex.from_encoders(
+                self.state_encoder, self.district_encoder, self.crop_encoder,
+                default_state=DEFAULT_INPUTS['state'], default_district=DEFAULT_INPUTS['district']
+            )
+        artifacts[ENCODING_ARTIFACT] = self.encoding
+        if self.feature_sketch is not None:
+            artifacts[SKETCH_ARTIFACT] = self.feature_sketch
+        compile_reports = self.compile_models()
+        for name, compiled in self.compiled_models.items():
+            artifacts[f'compiled_{name}'] = compiled
         
-        # Save training stats
-        with open(f'{self.model_path}/training_stats.json', 'w') as f:
-            json.dump(self.training_stats, f, indent=2)
-            
-        print("Models saved successfully!")
+        self.bundle_version = write_bundle(
+            self.model_path, artifacts, self.training_stats,
+            extra_manifest={'compiled': compile_reports}
+        )
+        # Surfaces belong to the bundle they were computed from
+        self.surface = None
+        self.drift = self._drift_monitor()
+        self.cache.clear()
+        
+        print(f"Models saved successfully! (bundle {self.bundle_version})")
     
-    def load_models(self):
-        """Load pre-trained models"""
-        try:
-            self.yield_model = joblib.load(f'{self.model_path}/yield_model.pkl')
-            self.recommendation_model = joblib.load(f'{self.model_path}/recommendation_model.pkl')
-            self.scaler = joblib.load(f'{self.model_path}/scaler.pkl')
-            self.crop_encoder = joblib.load(f'{self.model_path}/crop_encoder.pkl')
-            self.state_encoder = joblib.load(f'{self.model_path}/state_encoder.pkl')
-            self.district_encoder = joblib.load(f'{self.model_path}/district_encoder.pkl')
+    def compile_models(self):
+        """
+        Flatten the fitted forests into CompiledForest arrays with the scaler
+        folded into the thresholds, and check them against sklearn.
+        Forests outside tolerance are left uncompiled. Returns the check reports.
+        """
+        self.compiled_models = {}
+        if self.backend != 'random_forest':
+            print(f"Compiled inference needs random_forest models; {self.backend} bundles use sklearn inference")
+            return {}
+        
+        n_scaled = len(FEATURE_COLUMNS)
+        mean, scale = self.scaler.mean_, self.scaler.scale_
+        
+        # Check inputs drawn around the training distribution the scaler saw;
+        # half are rounded like the training data so many rows land on split ties
+        rng = np.random.default_rng(0)
+        features = mean + scale * rng.normal(size=(COMPILE_VERIFY_ROWS, n_scaled))
+        features[::2] = np.round(features[::2], 1)
+        features[:, :2] = np.round(features[:, :2])
+        crop_codes = rng.integers(0, len(self.crop_encoder.classes_), COMPILE_VERIFY_ROWS)
+        
+        reports = {}
+        for name in COMPILED_MODELS:
+            model = getattr(self, name)
+            if model is None:
+                continue
             
-            with open(f'{self.model_path}/training_stats.json', 'r') as f:
-                self.training_stats = json.load(f)
-                
-            self.is_trained = True
-            self.is_trained = True
-            return True
+            extra_columns = model.n_features_in_ - n_scaled
+            sample = features if extra_columns == 0 else np.column_stack([features, crop_codes])
+            # float32 class fractions unless they change any checked output
+            for compact in (True, False):
+                compiled = compile_forest(
+                    model,
+                    mean=np.concatenate([mean, np.zeros(extra_columns)]),
+                    scale=np.concatenate([scale, np.ones(extra_columns)]),
+                    compact=compact
+                )
+                report = verify_compiled(compiled, model, sample, self._scale_features)
+                if report['ok'] and compact and compiled.kind == 'classifier':
+                    # Suitability scores are class percentages rounded to 0.1
+                    expected = np.round(model.predict_proba(self._scale_features(sample)) * 100, 1)
+                    report['ok'] = bool(np.array_equal(np.round(compiled.predict_proba(sample) * 100, 1), expected))
+                if report['ok']:
+                    break
+            report['bytes'] = compiled.nbytes
+            report['precision'] = str(compiled.values.dtype)
+            reports[name] = report
             
-        except Exception as e:
+            if report['ok']:
+                self.compiled_models[name] = compiled
+            else:
+                print(f"Compiled {name} outside tolerance, keeping sklearn only: {report}")
+        
+        return reports
+    
+    def load_models(self, mmap=True, verify=None):
+        """
+        Load the active model bundle (verify: re-hash every artifact; default
+        AGRISMART_VERIFY_BUNDLE).
+        Returns False if no bundle has been trained yet; raises ModelBundleError
+        if the bundle is partial or corrupt rather than silently retraining.
+        """
+        required = COMPILED_ARTIFACTS if self.inference == 'compiled' else BUNDLE_ARTIFACTS
+        verify = self.verify_bundle if verify is None else verify
+        if mmap and self.inference == 'sklearn':
+            _, manifest = read_bundle(self.model_path, [], load=[])
+            backend = (manifest or {}).get('training_stats', {}).get('backend', DEFAULT_BACKEND)
+            mmap = memory_maps_well(backend)
+        artifacts, manifest = read_bundle(self.model_path, required, mmap=mmap, verify=verify,
+                                          load=required + [ENCODING_ARTIFACT, SKETCH_ARTIFACT])
+        if artifacts is None:
             return False
+        
+        for name in required:
+            if name.startswith('compiled_'):
+                self.compiled_models[name[len('compiled_'):]] = artifacts[name]
+            elif name != ENCODING_ARTIFACT:
+                setattr(self, name, artifacts[name])
+        self.encoding = artifacts.get(ENCODING_ARTIFACT)
+        if self.encoding is None:
+            # Bundle from before the encoding index: derive it from the LabelEncoders
+            self.encoding = EncodingIndex.from_encoders(
+                self.state_encoder, self.district_encoder, self.crop_encoder,
+                default_state=DEFAULT_INPUTS['state'], default_district=DEFAULT_INPUTS['district']
+            )
+        self.training_stats = manifest.get('training_stats', {})
+        self.bundle_version = manifest.get('version')
+        self.feature_sketch = artifacts.get(SKETCH_ARTIFACT)
+        self.drift = self._drift_monitor()
+        self.is_trained = True
+        self.surface = self._load_surface()
+        self.cache.clear()
+        return True
+    
+    def _build_sketch(self, features):
+        """Training-distribution sketch of a raw feature matrix (FEATURE_COLUMNS order)"""
+        return FeatureSketch.from_training(
+            features, ['state', 'district'] + NUMERIC_INPUTS,
+            categories={0: len(self.state_encoder.classes_), 1: len(self.district_encoder.classes_)}
+        )
+    
+    def _drift_monitor(self):
+        """Fresh (or resumed, see AGRISMART_DRIFT_FILE) monitor for the active bundle's sketch"""
+        if not self.drift_enabled or self.feature_sketch is None:
+            return None
+        monitor = DriftMonitor(self.feature_sketch, half_life=self.drift_half_life, key=self.bundle_version)
+        if self.drift_file:
+            monitor.load(self.drift_file)
+        return monitor
+    
+    def drift_report(self, inputs=None):
+        """
+        Per-feature drift against the training data, of the live inputs seen so
+        far or of `inputs` (rows, DataFrame or file path, as for the batch methods)
+        """
+        self.ensure_models()
+        if self.feature_sketch is None:
+            return {'error': 'The active bundle has no training sketch; retrain to enable drift monitoring'}
+        if inputs is not None:
+            # Undecayed counts of just these rows
+            monitor = DriftMonitor(self.feature_sketch, half_life=0, key=self.bundle_version)
+            features, valid, errors, notes = self._prepare_batch(inputs)
+            monitor.update(features[valid])
+        elif self.drift is None:
+            return {'error': 'Drift monitoring is disabled (AGRISMART_DRIFT=off)'}
+        else:
+            monitor = self.drift
+        return {'bundle_version': self.bundle_version, **monitor.report()}
+    
+    def save_drift_state(self):
+        """Persist live drift counts to AGRISMART_DRIFT_FILE (no-op when unset)"""
+        if self.drift is not None and self.drift_file:
+            self.drift.save(self.drift_file)
+    
+    def surface_path(self):
+        """Directory of the precomputed surface for the active bundle"""
+        return os.path.join(self.model_path, 'surfaces', str(self.bundle_version))
+    
+    def _load_surface(self):
+        """Memory-map this bundle's surface if one is enabled and was precomputed"""
+        path = self.surface_path()
+        if self.surface_method == 'off' or not os.path.isdir(path):
+            return None
+        surface = RecommendationSurface(path)
+        active = surface.enable(self.surface_method, *self.surface_bounds)
+        print(f"Recommendation surface: {active}/{len(surface.active)} locations within bounds", file=sys.stderr)
+        return surface if active else None
+    
+    def precompute_surface(self, axes=None, locations=None, top_k=DEFAULT_TOP_K,
+                           validation_samples=DEFAULT_VALIDATION_SAMPLES):
+        """
+        Evaluate both models over a grid of the numeric inputs for every known
+        district (with its most common state), or for `locations` [(state, district)],
+        then validate against the live models. axes: {name: (low, high, points)}
+        (see ml_surface.DEFAULT_SURFACE_AXES). Returns the validation report, with
+        the number of locations within bounds per method under 'active'.
+        """
+        self.ensure_models()
+        axes = axes or parse_axes(None, NUMERIC_INPUTS)
+        locations = locations or self.encoding.district_locations()
+        resolved = []
+        for state, district in locations:
+            state_code, district_code = self.encoding.state.code(state), self.encoding.district.code(district)
+            if state_code is None or district_code is None:
+                raise ValueError(f"Unknown location: {district}, {state}")
+            resolved.append((state_code, district_code, str(state), str(district)))
+        
+        surface = build_surface(
+            self.surface_path(), self._surface_scores, resolved, axes,
+            min_probability=MIN_CROP_PROBABILITY, top_k=top_k,
+            info={'bundle_version': self.bundle_version, 'inference': self.inference}
+        )
+        print(f"Validating against the live models ({validation_samples} points per location)...")
+        validation = validate_surface(surface, self._surface_scores, samples=validation_samples)
+        validation['active'] = {}
+        for method in SURFACE_METHODS:
+            validation['active'][method] = surface.enable(method, *self.surface_bounds)
+            errors = validation[method]
+            print(f"{method}: {validation['active'][method]}/{len(resolved)} locations within bounds "
+                  f"(median p95 yield error {np.median(errors['yield_error']):.3f}, "
+                  f"crop yield error {np.median(errors['crop_yield_error']):.3f}, "
+                  f"suitability error {np.median(errors['probability_error']):.3f}, "
+                  f"crop confidence error {np.median(errors['crop_confidence_error']):.3f})")
+        if not any(validation['active'].values()):
+            max_yield_error, max_probability_error = self.surface_bounds
+            print(f"WARNING: no location is within the error bounds (yield {max_yield_error}, "
+                  f"suitability {max_probability_error}), so the surface will never serve. Use finer "
+                  f"--axes or raise AGRISMART_SURFACE_MAX_YIELD_ERROR / AGRISMART_SURFACE_MAX_PROBABILITY_ERROR",
+                  file=sys.stderr)
+        
+        self.surface = self._load_surface()
+        return validation
+    
+    def _surface_scores(self, features):
+        """Live-model arrays stored in the surface for raw feature rows"""
+        distribution = self._yield_distribution(features)
+        yield_stats = np.column_stack([distribution['predicted'], distribution['confidence'],
+                                       distribution['std_dev'], distribution['quantiles'].T])
+        probabilities, classes, predicted, confidence = self._recommendation_arrays(features)
+        return (yield_stats, probabilities, classes,
+                np.broadcast_to(predicted, probabilities.shape), np.broadcast_to(confidence, probabilities.shape))
+    
+    def ensure_models(self):
+        """Load the model bundle before the first prediction"""
+        if not self.is_trained:
+            with self.metrics.stage('load'):
+                loaded = self.load_models()
+            if not loaded:
+                raise ModelBundleError(
+                    f"No trained model bundle in {self.model_path}; run `python ml_predictor.py train` first"
+                )
     
     def predict_yield(self, input_data):
         """Predict crop yield for given conditions"""
-        if not self.is_trained:
-            if not self.load_models():
-                self.train_models()
-        
         try:
-            # Prepare input features
-            state_encoded = self.state_encoder.transform([input_data.get('state', 'Punjab')])[0]
-            district_encoded = self.district_encoder.transform([input_data.get('district', 'Ludhiana')])[0]
-            
-            features = np.array([[
-                state_encoded,
-                district_encoded,
-                input_data.get('temperature', 25),
-                input_data.get('humidity', 65),
-                input_data.get('rainfall', 800),
-                input_data.get('ph', 6.8),
-                input_data.get('nitrogen', 120),
-                input_data.get('phosphorus', 60),
-                input_data.get('potassium', 80)
-            ]])
-            
-            # Scale features
-            features_scaled = self.scaler.transform(features)
-            
-            # Predict yield
-            predicted_yield = self.yield_model.predict(features_scaled)[0]
-            
-            # Get confidence (based on prediction interval)
-            # Use ensemble predictions for confidence estimation
-            tree_predictions = [tree.predict(features_scaled)[0] for tree in self.yield_model.estimators_[:10]]
-            std_dev = np.std(tree_predictions)
-            confidence = max(0.6, min(0.95, 1 - (std_dev / predicted_yield) * 2))
-            
-            return {
-                'predicted_yield': round(predicted_yield, 0),
-                'confidence': round(confidence * 100, 1),
-                'yield_category': self.categorize_yield(predicted_yield),
-                'model_info': {
-                    'algorithm': 'Random Forest Regressor',
-                    'training_samples': self.training_stats.get('training_samples', 1200),
-                    'r2_score': self.training_stats.get('yield_r2', 0.85)
-                }
-            }
+            # A missing or corrupt bundle is reported like any other failure
+            self.ensure_models()
+            return self.predict_yield_batch([input_data])[0]
             
         except Exception as e:
-            print(f"Yield prediction error: {e}")
+            print(f"Yield prediction error: {e}", file=sys.stderr)
             return {'error': str(e)}
     
     def recommend_crops(self, input_data):
         """Recommend best crops for given conditions"""
-        if not self.is_trained:
-            if not self.load_models():
-                self.train_models()
-        
         try:
-            # Prepare input features (same as yield prediction)
-            state_encoded = self.state_encoder.transform([input_data.get('state', 'Punjab')])[0]
-            district_encoded = self.district_encoder.transform([input_data.get('district', 'Ludhiana')])[0]
+            self.ensure_models()
+            return self.recommend_crops_batch([input_data])[0]
             
-            features = np.array([[
-                state_encoded,
-                district_encoded,
-                input_data.get('temperature', 25),
-                input_data.get('humidity', 65),
-                input_data.get('rainfall', 800),
-                input_data.get('ph', 6.8),
-                input_data.get('nitrogen', 120),
-                input_data.get('phosphorus', 60),
-                input_data.get('potassium', 80)
-            ]])
-            
-            # Scale features
-            features_scaled = self.scaler.transform(features)
-            
-            # Get crop probabilities
-            crop_probabilities = self.recommendation_model.predict_proba(features_scaled)[0]
-            crop_classes = self.recommendation_model.classes_
-            
-            # Create recommendations
-            recommendations = []
-            for i, prob in enumerate(crop_probabilities):
-                if prob > 0.01:  # Only include crops with >1% probability
-                    crop_name = self.crop_encoder.inverse_transform([crop_classes[i]])[0]
-                    
-                    # Predict yield for this crop
-                    crop_input = input_data.copy()
-                    crop_input['crop'] = crop_name
-                    yield_pred = self.predict_yield(crop_input)
-                    
-                    recommendations.append({
-                        'crop': crop_name,
-                        'suitability_score': round(prob * 100, 1),
-                        'predicted_yield': yield_pred.get('predicted_yield', 0),
-                        'confidence': yield_pred.get('confidence', 0),
-                        'yield_category': yield_pred.get('yield_category', 'Unknown')
-                    })
-            
-            # Sort by suitability score
-            recommendations.sort(key=lambda x: x['suitability_score'], reverse=True)
+        except Exception as e:
+            print(f"Crop recommendation error: {e}", file=sys.stderr)
+            return {'error': str(e)}
+    
+    def predict_crop_yields(self, input_data, crops=None):
+        """
+        Yield for each candidate crop under the same conditions.
+        Uses the crop-conditioned model when available; all crops are scored
+        in a single forest call on a (crops x features) matrix.
+        """
+        try:
+            self.ensure_models()
+            with self.metrics.stage('request.predict_crop_yields'):
+                return self._predict_crop_yields(input_data, crops)
             
-            return {
-                'recommendations': recommendations[:5],  # Top 5 crops
-                'total_analyzed': len(recommendations),
-                'model_info': {
-                    'algorithm': 'Random Forest Classifier',
-                    'training_samples': self.training_stats.get('training_samples', 1200),
-                    'accuracy': self.training_stats.get('crop_accuracy', 0.88)
+        except Exception as e:
+            print(f"Crop yield prediction error: {e}", file=sys.stderr)
+            return {'error': str(e)}
+    
+    def _predict_crop_yields(self, input_data, crops):
+        """predict_crop_yields body (timed as one request)"""
+        with self.metrics.stage('encode'):
+            features, valid, errors, notes = self._prepare_batch([input_data])
+        if errors:
+            return {'error': errors[0]}
+        
+        if crops is None:
+            crops = input_data.get('crops') or list(self.encoding.crop.classes_)
+        crop_codes, known = self.encoding.crop.encode([str(crop) for crop in crops])
+        if not known.all():
+            return {'error': f"Unknown crop: {crops[int(np.flatnonzero(~known)[0])]}"}
+        crops = self.encoding.crop.decode(crop_codes)
+        
+        if self._has_crop_yield_model():
+            predicted, confidence = self._predict_crop_conditioned_yield(
+                np.repeat(features, len(crops), axis=0), crop_codes
+            )
+        else:
+            predicted, confidence = self._predict_yield_values(features)
+            predicted = np.repeat(predicted, len(crops))
+            confidence = np.repeat(confidence, len(crops))
+        
+        result = {
+            'crop_yields': [
+                {
+                    'crop': str(crop),
+                    'predicted_yield': round(float(y), 0),
+                    'confidence': round(float(c) * 100, 1),
+                    'yield_category': self.categorize_yield(y)
                 }
-            }
+                for crop, y, c in zip(crops, predicted, confidence)
+            ],
+            'crop_conditioned': self._has_crop_yield_model()
+        }
+        if notes:
+            result['warnings'] = notes[0]
+        return result
+    
+    def optimize_inputs(self, input_data, ranges=None, crop=None, prices=None, method=None,
+                        points=None, rounds=None):
+        """
+        Nitrogen / phosphorus / potassium (and optionally irrigation) levels that
+        maximize predicted yield for the site in input_data, or net value per
+        hectare when `prices` ({'crop': per kg, 'nitrogen': per kg, ...,
+        'irrigation': per mm}) are given. Any argument may instead be a key of
+        input_data. method: 'refine' (coarse-to-fine, default) or 'grid'.
+        """
+        try:
+            self.ensure_models()
+            with self.metrics.stage('request.optimize_inputs'):
+                return self._optimize_inputs(
+                    input_data,
+                    ranges=ranges or input_data.get('ranges'),
+                    crop=crop or input_data.get('crop'),
+                    prices=prices or input_data.get('prices'),
+                    method=method or input_data.get('method') or 'refine',
+                    points=points or input_data.get('points'),
+                    rounds=rounds or input_data.get('rounds') or DEFAULT_REFINE_ROUNDS
+                )
             
         except Exception as e:
-            print(f"Crop recommendation error: {e}")
+            print(f"Input optimization error: {e}", file=sys.stderr)
             return {'error': str(e)}
     
+    def _optimize_inputs(self, input_data, ranges, crop, prices, method, points, rounds):
+        """optimize_inputs body (timed as one request)"""
+        start = perf_counter()
+        features, valid, errors, notes = self._prepare_batch([input_data])
+        if errors:
+            return {'error': errors[0]}
+        site = features[0]
+        
+        crop_code = None
+        if crop is not None:
+            crop_code = self.encoding.crop.code(str(crop))
+            if crop_code is None:
+                return {'error': f"Unknown crop: {crop}"}
+        conditioned = crop_code is not None and self._has_crop_yield_model()
+        
+        ranges = parse_ranges(ranges)
+        names = list(ranges)
+        rainfall = FEATURE_COLUMNS.index('rainfall')
+        
+        def site_features(candidates):
+            rows = np.repeat(site[None, :], len(candidates), axis=0)
+            for j, name in enumerate(names):
+                if name == 'irrigation':
+                    rows[:, rainfall] += candidates[:, j]
+                else:
+                    rows[:, FEATURE_COLUMNS.index(name)] = candidates[:, j]
+            if conditioned:
+                rows = np.column_stack([rows, np.full(len(rows), crop_code)])
+            return rows
+        
+        model_name = 'crop_yield_model' if conditioned else 'yield_model'
+        found = search_inputs(lambda c: self._yield_distribution(site_features(c), model_name),
+                              ranges, method=method, points=points, rounds=rounds, prices=prices)
+        
+        # Current inputs (no irrigation) for comparison
+        current = np.array([0.0 if name == 'irrigation' else site[FEATURE_COLUMNS.index(name)] for name in names])
+        best = found['order'][0]
+        pair = site_features(np.stack([found['candidates'][best], current]))
+        if has_tree_spread(self.backend):
+            per_tree = self._tree_predictions(pair, model_name)
+            baseline = summarize_tree_predictions(per_tree[1:])
+            # Share of trees that predict more yield at the optimum than at the current inputs
+            win_probability = round(float(np.mean(per_tree[0] > per_tree[1])), 3)
+        else:
+            # Boosted models have no individual trees to compare
+            baseline = self._yield_distribution(pair[1:], model_name)
+            win_probability = None
+        
+        def candidate(i):
+            entry = {
+                'inputs': {name: round(float(v), 1) for name, v in zip(names, found['candidates'][i])},
+                'predicted_yield': round(float(found['predicted'][i]), 0),
+                'confidence': round(float(found['confidence'][i]) * 100, 1)
+            }
+            if prices:
+                entry['net_value'] = round(float(found['objective'][i]), 2)
+            return entry
+        
+        optimum = candidate(best)
+        optimum['yield_category'] = self.categorize_yield(found['predicted'][best])
+        optimum['uncertainty'] = {
+            'std_dev': round(float(found['std_dev'][best]), 1),
+            'quantiles': {f'p{int(q * 100)}': round(float(v), 0)
+                          for q, v in zip(YIELD_QUANTILES, found['quantiles'][:, best])}
+        }
+        current_entry = {
+            'inputs': {name: round(float(v), 1) for name, v in zip(names, current)},
+            'predicted_yield': round(float(baseline['predicted'][0]), 0),
+            'confidence': round(float(baseline['confidence'][0]) * 100, 1)
+        }
+        if prices:
+            current_entry['net_value'] = round(float(input_objective(baseline['predicted'], current[None, :], names, prices)[0]), 2)
+        
+        result = {
+            'optimum': optimum,
+            'current': current_entry,
+            'yield_gain': round(float(found['predicted'][best] - baseline['predicted'][0]), 0),
+            'win_probability': win_probability,
+            'top_candidates': [candidate(i) for i in found['order'][:TOP_CANDIDATES]],
+            'objective': 'net_value' if prices else 'yield',
+            'crop': str(self.encoding.crop.classes_[crop_code]) if crop_code is not None else None,
+            'crop_conditioned': conditioned,
+            'method': method,
+            'candidates_evaluated': len(found['candidates']),
+            'elapsed_ms': round((perf_counter() - start) * 1000, 1)
+        }
+        if notes:
+            result['warnings'] = notes[0]
+        return result
+    
+    def predict_yield_batch(self, inputs):
+        """
+        Predict yield for many rows at once.
+        inputs: list of dicts, a DataFrame, a pyarrow Table, a structured NumPy
+        array, or a CSV/JSONL/JSON/Arrow IPC/Parquet/.npy file path.
+        Returns one result per row in input order; bad rows get {'error': ...}
+        """
+        with self.metrics.stage('request.predict_yield'):
+            return self._run_batch('predict_yield', inputs, self._score_yield)
+    
+    def recommend_crops_batch(self, inputs):
+        """
+        Recommend crops for many rows at once (same inputs as predict_yield_batch).
+        The classifier and the yield forest each run once on the whole matrix.
+        """
+        with self.metrics.stage('request.recommend_crops'):
+            return self._run_batch('recommend_crops', inputs, self._score_recommendations)
+    
+    def score_file(self, command, input_path, output_path, keep=None, batch_rows=DEFAULT_BATCH_ROWS,
+                   matrix_columns=None):
+        """
+        Score a file into an Arrow IPC / Parquet / .npy output, batch_rows at a
+        time. Columnar inputs are read with only the input fields plus the
+        `keep` columns, which are copied to the output next to the results.
+        matrix_columns names the columns of a 2-D .npy input (default:
+        NUMERIC_INPUTS). Returns a summary of the run.
+        """
+        if command not in ('predict_yield', 'recommend_crops'):
+            raise ValueError(f"Cannot score files with: {command}")
+        self.ensure_models()
+        score = getattr(self, f'{command}_batch')
+        keep = list(dict.fromkeys(keep or []))
+        matrix_columns = matrix_columns or NUMERIC_INPUTS
+        start = perf_counter()
+        
+        if is_columnar(input_path):
+            missing = [name for name in keep if name not in file_columns(input_path, matrix_columns)]
+            if missing:
+                raise ValueError(f"Columns not in {input_path}: {', '.join(missing)}")
+            # A kept column may also be an input field; read it once
+            batches = iter_batches(input_path, list(dict.fromkeys(list(DEFAULT_INPUTS) + keep)), batch_rows,
+                                   matrix_columns)
+            rows = count_rows(input_path)
+        elif keep:
+            raise ValueError("Pass-through columns need an Arrow IPC, Parquet or .npy input")
+        else:
+            batches = [self._read_batch_file(input_path)]
+            rows = len(batches[0])
+        
+        metadata = {'command': command, 'bundle_version': self.bundle_version,
+                    'algorithm': ALGORITHMS[self.backend]['yield' if command == 'predict_yield' else 'recommendation']}
+        errors = 0
+        with ColumnarWriter(output_path, command, rows=rows, metadata=metadata) as writer:
+            for batch in batches:
+                results = score(batch)
+                errors += sum('error' in result for result in results)
+                writer.write(results, {name: batch[name] if isinstance(batch, np.ndarray) else batch.column(name)
+                                       for name in keep})
+        
+        elapsed = perf_counter() - start
+        return {
+            'command': command,
+            'rows': writer.written,
+            'errors': errors,
+            'output': str(output_path),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(writer.written / elapsed, 1) if elapsed > 0 else None
+        }
+    
+    def _run_batch(self, command, inputs, score):
+        """
+        Shared batch driver: encode, answer what the prediction cache already
+        holds, score the remaining distinct rows in one call, fill in errors.
+        """
+        self.ensure_models()
+        
+        with self.metrics.stage('encode'):
+            features, valid, errors, notes = self._prepare_batch(inputs)
+        results = [None] * len(valid)
+        rows = np.flatnonzero(valid)
+        self.metrics.count(f'{command}.rows', len(valid))
+        self.metrics.count(f'{command}.row_errors', len(errors))
+        self.metrics.count(f'{command}.category_fallbacks', len(notes))
+        if self.drift is not None and len(rows):
+            with self.metrics.stage('drift'):
+                self.drift.update(features[rows])
+        
+        if len(rows) and not self.cache.enabled:
+            for i, result in zip(rows, score(features[rows])):
+                results[i] = result
+        
+        elif len(rows):
+            with self.metrics.stage('cache'):
+                features = self.cache.quantize(features[rows])
+                keys = self.cache.keys(command, features)
+                pending = {}
+                for position, (i, key) in enumerate(zip(rows, keys)):
+                    cached = self.cache.get(key) if key not in pending else None
+                    if cached is not None:
+                        results[i] = cached
+                    else:
+                        pending.setdefault(key, []).append((position, i))
+            self.metrics.count(f'{command}.cache_hits', len(rows) - sum(map(len, pending.values())))
+            
+            if pending:
+                # Each distinct missing feature vector is scored once
+                first = [targets[0][0] for targets in pending.values()]
+                # Bulk jobs: only the last max_size new results would stay in the LRU cache
+                skipped = len(pending) - self.cache.max_size
+                for n, ((key, targets), result) in enumerate(zip(pending.items(), score(features[first]))):
+                    results[targets[0][1]] = result
+                    if n >= skipped:
+                        self.cache.put(key, result)
+                        for _, i in targets[1:]:
+                            results[i] = self.cache.get(key)
+                    else:
+                        for _, i in targets[1:]:
+                            results[i] = copy.deepcopy(result)
+        
+        for i, message in errors.items():
+            results[i] = {'error': message}
+        # Fallbacks for unknown categories are reported per row (never cached)
+        for i, messages in notes.items():
+            if 'error' not in results[i]:
+                results[i]['warnings'] = messages
+        return results
+    
+    def _score_with_surface(self, features, live, from_surface):
+        """Answer rows covered by the precomputed surface from it and the rest with `live`"""
+        if self.surface is None:
+            return live(features)
+        with self.metrics.stage('surface'):
+            hits, values = self.surface.lookup(features, self.surface_method)
+        self.metrics.count('surface_hits', int(hits.sum()))
+        
+        results = [None] * len(features)
+        for i, result in zip(np.flatnonzero(hits), from_surface(values)):
+            result['model_info']['surface'] = self.surface_method
+            results[i] = result
+        misses = np.flatnonzero(~hits)
+        if len(misses):
+            for i, result in zip(misses, live(features[misses])):
+                results[i] = result
+        return results
+    
+    def _score_yield(self, features):
+        """predict_yield results for valid raw feature rows"""
+        return self._score_with_surface(features, self._score_yield_live, self._surface_yield_results)
+    
+    def _surface_yield_results(self, values):
+        """predict_yield results from interpolated surface values"""
+        stats = values['yield']
+        return [self._yield_result(row[0], row[1], row[2], row[3:]) for row in stats]
+    
+    def _score_yield_live(self, features):
+        """predict_yield results from the forests"""
+        distribution = self._yield_distribution(features)
+        with self.metrics.stage('format'):
+            return [
+                self._yield_result(
+                    distribution['predicted'][row], distribution['confidence'][row],
+                    distribution['std_dev'][row], distribution['quantiles'][:, row]
+                )
+                for row in range(len(features))
+            ]
+    
+    def _score_recommendations(self, features):
+        """recommend_crops results for valid raw feature rows"""
+        return self._score_with_surface(features, self._score_recommendations_live,
+                                        self._surface_recommendation_results)
+    
+    def _surface_recommendation_results(self, values):
+        """recommend_crops results from interpolated surface values"""
+        crop_names = self.encoding.crop.classes_
+        results = []
+        for row in range(len(values['analyzed'])):
+            result = self._recommendation_result(values['probabilities'][row], crop_names,
+                                                 values['crop_yield'][row], values['crop_confidence'][row])
+            # Crops outside the stored top-k still count towards total_analyzed
+            result['total_analyzed'] = int(values['analyzed'][row])
+            results.append(result)
+        return results
+    
+    def _score_recommendations_live(self, features):
+        """recommend_crops results from the forests"""
+        crop_probabilities, crop_classes, predicted, confidence = self._recommendation_arrays(
+            features, reported=RECOMMENDED_CROPS
+        )
+        crop_names = self.encoding.crop.decode(crop_classes)
+        with self.metrics.stage('format'):
+            return [
+                self._recommendation_result(crop_probabilities[row], crop_names, predicted[row], confidence[row])
+                for row in range(len(features))
+            ]
+    
+    def _recommendation_arrays(self, features, reported=None):
+        """
+        Class probabilities, class codes, and predicted yield / confidence either
+        per (row, class) (crop-conditioned) or per row.
+        reported: only crops that can rank among this many by suitability score
+        get a crop-conditioned yield (others stay 0)
+        """
+        crop_probabilities, crop_classes = self._predict_crop_proba(features)
+        
+        if self._has_crop_yield_model():
+            candidates = crop_probabilities > MIN_CROP_PROBABILITY
+            if reported is not None and crop_probabilities.shape[1] > reported:
+                # Scores are rounded to 0.1%, so a crop more than 0.2% below the
+                # reported-th probability can never be ranked above it
+                cutoff = np.partition(crop_probabilities, -reported, axis=1)[:, -reported]
+                candidates &= crop_probabilities >= cutoff[:, None] - 0.002
+            # One pass over every (row, candidate crop) pair that can be reported
+            rows, classes = np.nonzero(candidates)
+            candidate_yield, candidate_confidence = self._predict_crop_conditioned_yield(
+                features[rows], crop_classes[classes]
+            )
+            predicted = np.zeros(crop_probabilities.shape)
+            confidence = np.zeros(crop_probabilities.shape)
+            predicted[rows, classes] = candidate_yield
+            confidence[rows, classes] = candidate_confidence
+        else:
+            # Crop is not a yield feature: one prediction per row serves every candidate
+            predicted, confidence = self._predict_yield_values(features)
+            predicted, confidence = predicted[:, None], confidence[:, None]
+        
+        return crop_probabilities, crop_classes, predicted, confidence
+    
+    def _model_inputs(self, features):
+        """Raw feature rows as the active backend's models expect them"""
+        return self._scale_features(features) if scales_inputs(self.backend) else features
+    
+    def _scale_features(self, features):
+        """Apply the scaler to the base feature columns; extra columns (crop code) pass through"""
+        n_scaled = len(FEATURE_COLUMNS)
+        with self.metrics.stage('scale'):
+            scaled = self.scaler.transform(features[:, :n_scaled])
+            if features.shape[1] > n_scaled:
+                scaled = np.column_stack([scaled, features[:, n_scaled:]])
+        return scaled
+    
+    def _tree_predictions(self, features, name='yield_model'):
+        """(n_rows, n_trees) outputs of a regression forest for raw feature rows"""
+        if self.inference == 'compiled':
+            with self.metrics.stage('forest'):
+                return self.compiled_models[name].tree_predictions(features)
+        
+        # Lookup arrays are built once per fitted model
+        model = getattr(self, name)
+        engine = self._uncertainty_engines.get(id(model))
+        if engine is None or engine.model is not model:
+            engine = ForestUncertainty(model)
+            self._uncertainty_engines[id(model)] = engine
+        scaled = self._scale_features(features)
+        with self.metrics.stage('forest'):
+            return engine.tree_predictions(scaled)
+    
+    def _yield_distribution(self, features, name='yield_model'):
+        """Prediction, tree spread, quantiles and confidence for raw feature rows"""
+        if self.inference == 'sklearn' and not has_tree_spread(self.backend):
+            # Boosted models report their own spread from quantile models
+            with self.metrics.stage('boosting'):
+                distribution = getattr(self, name).distribution(self._model_inputs(features))
+            distribution['confidence'] = yield_confidence(distribution['predicted'], distribution['std_dev'])
+            return distribution
+        
+        per_tree = self._tree_predictions(features, name)
+        with self.metrics.stage('uncertainty'):
+            return summarize_tree_predictions(per_tree)
+    
+    def _predict_yield_values(self, features, name='yield_model'):
+        """Yield and confidence for raw feature rows"""
+        distribution = self._yield_distribution(features, name)
+        return distribution['predicted'], distribution['confidence']
+    
+    def _predict_crop_conditioned_yield(self, features, crop_codes):
+        """Yield and confidence from the crop-conditioned model, one crop code per row"""
+        if len(crop_codes) == 0:
+            return np.zeros(0), np.zeros(0)
+        return self._predict_yield_values(np.column_stack([features, crop_codes]), 'crop_yield_model')
+    
+    def _predict_crop_proba(self, features):
+        """Class probabilities and encoded crop classes for raw feature rows"""
+        if self.inference == 'compiled':
+            compiled = self.compiled_models['recommendation_model']
+            with self.metrics.stage('classifier'):
+                return compiled.predict_proba(features), compiled.classes_
+        model = self.recommendation_model
+        inputs = self._model_inputs(features)
+        with self.metrics.stage('classifier'):
+            return model.predict_proba(inputs), model.classes_
+    
+    def _has_crop_yield_model(self):
+        """Whether a crop-conditioned yield model is available for inference"""
+        if self.inference == 'compiled':
+            return 'crop_yield_model' in self.compiled_models
+        return self.crop_yield_model is not None
+    
+    def _yield_result(self, predicted_yield, confidence, std_dev, quantiles):
+        """Build the predict_yield response for one row"""
+        return {
+            'predicted_yield': round(float(predicted_yield), 0),
+            'confidence': round(float(confidence) * 100, 1),
+            'yield_category': self.categorize_yield(predicted_yield),
+            'uncertainty': {
+                'std_dev': round(float(std_dev), 1),
+                'quantiles': {f'p{int(q * 100)}': round(float(v), 0) for q, v in zip(YIELD_QUANTILES, quantiles)}
+            },
+            'model_info': {
+                'algorithm': ALGORITHMS[self.backend]['yield'],
+                'training_samples': self.training_stats.get('training_samples', 1200),
+                'r2_score': self.training_stats.get('yield_r2', 0.85)
+            }
+        }
+    
+    def _recommendation_result(self, probabilities, crop_names, predicted_yield, confidence):
+        """
+        Build the recommend_crops response for one row.
+        predicted_yield / confidence are either one value shared by every crop
+        or one value per class (crop-conditioned)
+        """
+        predicted_yield = np.broadcast_to(predicted_yield, probabilities.shape)
+        confidence = np.broadcast_to(confidence, probabilities.shape)
+        
+        recommendations = []
+        for i in np.flatnonzero(probabilities > MIN_CROP_PROBABILITY):  # Only include crops with >1% probability
+            recommendations.append({
+                'crop': str(crop_names[i]),
+                'suitability_score': round(float(probabilities[i]) * 100, 1),
+                'predicted_yield': round(float(predicted_yield[i]), 0),
+                'confidence': round(float(confidence[i]) * 100, 1),
+                'yield_category': self.categorize_yield(predicted_yield[i])
+            })
+        
+        # Sort by suitability score
+        recommendations.sort(key=lambda x: x['suitability_score'], reverse=True)
+        
+        return {
+            'recommendations': recommendations[:RECOMMENDED_CROPS],
+            'total_analyzed': len(recommendations),
+            'model_info': {
+                'algorithm': ALGORITHMS[self.backend]['recommendation'],
+                'training_samples': self.training_stats.get('training_samples', 1200),
+                'accuracy': self.training_stats.get('crop_accuracy', 0.88)
+            }
+        }
+    
+    def _prepare_batch(self, inputs):
+        """
+        Turn a batch source into the raw (unscaled) feature matrix.
+        Returns (features, valid_mask, {row_index: error_message},
+        {row_index: [fallback notes]})
+        """
+        columns, n, errors = self._read_batch_columns(inputs)
+        features = np.zeros((n, len(FEATURE_COLUMNS)))
+        
+        # Categorical columns: hash lookups, with the configured unknown-category fallback
+        states = self._categorical_column(columns.get('state'), 'state', n)
+        districts = self._categorical_column(columns.get('district'), 'district', n)
+        if isinstance(states, DictionaryColumn) or isinstance(districts, DictionaryColumn):
+            features[:, 0], features[:, 1], encode_errors, notes = self._encode_location_pairs(states, districts)
+        else:
+            features[:, 0], features[:, 1], encode_errors, notes = self.encoding.encode_locations(
+                states, districts, self.unknown_category
+            )
+        for i, message in encode_errors.items():
+            errors.setdefault(i, message)
+        
+        # Numeric columns
+        for j, field in enumerate(NUMERIC_INPUTS, start=2):
+            features[:, j] = self._numeric_column(columns.get(field), field, n, errors)
+        
+        valid = np.ones(n, dtype=bool)
+        valid[list(errors)] = False
+        return features, valid, errors, notes
+    
+    def _encode_location_pairs(self, states, districts):
+        """encode_locations for dictionary-encoded columns: each distinct (state, district) pair once"""
+        states, districts = DictionaryColumn.of(states), DictionaryColumn.of(districts)
+        width = len(districts.labels)
+        pairs, inverse = np.unique(states.indices.astype(np.int64) * width + districts.indices, return_inverse=True)
+        state_codes, district_codes, pair_errors, pair_notes = self.encoding.encode_locations(
+            states.labels[pairs // width], districts.labels[pairs % width], self.unknown_category
+        )
+        
+        errors, notes = {}, {}
+        if pair_errors or pair_notes:
+            # Rows of each pair, grouped by one stable sort
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(len(pairs) + 1))
+            for pair, message in pair_errors.items():
+                errors.update((int(i), message) for i in order[bounds[pair]:bounds[pair + 1]])
+            for pair, messages in pair_notes.items():
+                notes.update((int(i), list(messages)) for i in order[bounds[pair]:bounds[pair + 1]])
+        return state_codes[inverse], district_codes[inverse], errors, notes
+    
+    def _read_batch_columns(self, inputs):
+        """Split a batch source into per-field value columns"""
+        if isinstance(inputs, (str, os.PathLike)):
+            # A 2-D .npy matrix holds the numeric inputs in model order
+            inputs = read_table(inputs, list(DEFAULT_INPUTS), NUMERIC_INPUTS) if is_columnar(inputs) \
+                else self._read_batch_file(inputs)
+        
+        errors = {}
+        columns = input_columns(inputs, DEFAULT_INPUTS, ('state', 'district'))
+        if columns is not None:
+            return columns, len(inputs), errors
+        
+        # A DataFrame can only exist if pandas is already loaded; don't import it for dict rows
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(inputs, pd.DataFrame):
+            columns = {field: inputs[field].to_numpy() for field in DEFAULT_INPUTS if field in inputs.columns}
+            return columns, len(inputs), errors
+        
+        rows = list(inputs)
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[i] = 'Input row must be an object'
+                rows[i] = {}
+        columns = {field: [row.get(field) for row in rows] for field in DEFAULT_INPUTS}
+        return columns, len(rows), errors
+    
+    def _read_batch_file(self, path):
+        """Load batch rows from a CSV, JSONL or JSON file"""
+        path = str(path)
+        if path.endswith('.csv'):
+            import pandas as pd
+            return pd.read_csv(path)
+        if path.endswith(('.jsonl', '.ndjson')):
+            with open(path, 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        if path.endswith('.json'):
+            with open(path, 'r') as f:
+                return json.load(f)
+        raise ValueError(f"Unsupported batch input format: {path}")
+    
+    def _categorical_column(self, values, field, n):
+        """String array for a categorical field with defaults filled in"""
+        default = DEFAULT_INPUTS[field]
+        if values is None:
+            return np.full(n, default, dtype=object)
+        if isinstance(values, DictionaryColumn):
+            # Only the distinct labels need filling in
+            return DictionaryColumn(self._categorical_column(values.labels, field, len(values.labels)),
+                                    values.indices)
+        return np.array([
+            default if v is None or (isinstance(v, float) and np.isnan(v)) else str(v)
+            for v in values
+        ], dtype=object)
+    
+    def _numeric_column(self, values, field, n, errors):
+        """Float array for a numeric field with defaults filled in; bad values are row errors"""
+        default = float(DEFAULT_INPUTS[field])
+        if values is None:
+            return np.full(n, default)
+        
+        try:
+            # No copy for float64 arrays (e.g. views of Arrow / memory-mapped columns)
+            column = np.asarray(values, dtype=float)
+        except (TypeError, ValueError):
+            column = np.empty(n)
+            for i, v in enumerate(values):
+                try:
+                    column[i] = np.nan if v is None else float(v)
+                except (TypeError, ValueError):
+                    column[i] = np.nan
+                    errors.setdefault(i, f"Invalid {field}: {v!r}")
+        
+        # Infinite values, and values the float32 tree thresholds cannot hold, fail their row only
+        with np.errstate(invalid='ignore'):
+            out_of_range = ~np.isnan(column) & ~(np.abs(column) <= np.finfo(np.float32).max)
+        for i in np.flatnonzero(out_of_range):
+            errors.setdefault(int(i), f"Invalid {field}: {float(column[i])!r}")
+        
+        missing = np.isnan(column) | out_of_range
+        return np.where(missing, default, column) if missing.any() else column
+    
+    def export_metrics(self):
+        """Write collected metrics to AGRISMART_METRICS_FILE or stderr (no-op when disabled)"""
+        self.metrics.gauge('cache_size', self.cache.stats()['size'])
+        self.metrics.export()
+    
     def categorize_yield(self, yield_value):
         """Categorize yield performance"""
         if yield_value > 3000:
@@ -490,18 +1608,246 @@ class AgriSmartMLPredictor:
         else:
             return 'Low'
 
+# Time spent importing this module and its dependencies
+IMPORT_SECONDS = perf_counter() - _IMPORT_STARTED
+
+def startup_check(runs=3, budget_ms=IMPORT_BUDGET_MS):
+    """
+    Measure cold start of the prediction path in fresh interpreters: import time,
+    model load and first prediction (median of `runs`). The check passes if the
+    import stays within budget and pulls in none of TRAINING_ONLY_MODULES.
+    """
+    import subprocess
+    
+    here = os.path.dirname(os.path.abspath(__file__))
+    reports = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_PROBE], cwd=here,
+                                capture_output=True, text=True, check=True).stdout
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+    
+    def median(key):
+        values = [r[key] for r in reports if r.get(key) is not None]
+        return round(float(np.median(values)), 1) if values else None
+    
+    imported = sorted({m for r in reports for m in r['imported_training_modules']})
+    import_ms = median('import_ms')
+    return {
+        'inference': os.environ.get('AGRISMART_INFERENCE', 'sklearn'),
+        'runs': runs,
+        'import_ms': import_ms,
+        'import_budget_ms': budget_ms,
+        'load_ms': median('load_ms'),
+        'first_prediction_ms': median('first_prediction_ms'),
+        'imported_training_modules': imported,
+        'ok': import_ms <= budget_ms and not imported
+    }
+
+def _pop_option(args, flag, default=None):
+    """Remove `flag value` from an argument list and return the value"""
+    if flag not in args:
+        return default
+    index = args.index(flag)
+    if index + 1 >= len(args):
+        raise ValueError(f"Missing value for {flag}")
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
 def main():
     """Main function to handle command line arguments"""
     if len(sys.argv) < 2:
         print("Usage: python ml_predictor.py <command> [data]")
-        print("Commands: train, predict_yield, recommend_crops")
+        print("Commands: train, train_historical, tune, update, compile, generate, predict_yield, recommend_crops, predict_crop_yields, optimize_inputs, batch, serve, startup_check, benchmark, precompute_surface, compare_backends, drift_report")
+        print("Train:    python ml_predictor.py train [n_samples] [--params leaderboard.json] "
+              "[--backend random_forest|hist_gradient_boosting]")
+        print("Tune:     python ml_predictor.py tune [n_samples] [--data rows.csv] [--folds K] [--workers N] "
+              "[--target-r2 X] [--target-crop-r2 X] [--target-accuracy X] [--output leaderboard.json]")
+        print("Historical: python ml_predictor.py train_historical [--sqlite <db>] [--snapshot <path>] [--refresh] [--backend name]")
+        print("Drift:    python ml_predictor.py drift_report [inputs.csv|.jsonl|.json]  "
+              "(live counts need AGRISMART_DRIFT_FILE)")
+        print("Compare:  python ml_predictor.py compare_backends [n_samples] [--backends a,b] [--data rows.csv] "
+              "[--output report.json]")
+        print("Update:   python ml_predictor.py update <new_rows.csv|.parquet|.arrow|.npy|.npz> [n_new_trees] [--max-trees N] [--rescale]")
+        print("Generate: python ml_predictor.py generate <output.csv|.parquet|.arrow> [n_samples] [seed]")
+        print("Batch:    python ml_predictor.py batch <predict_yield|recommend_crops> "
+              "<input.csv|.jsonl|.json|.arrow|.parquet|.npy> [output.jsonl|.arrow|.parquet|.npy] "
+              "[--keep col,...] [--batch-rows N] [--columns col,...]")
+        print("Surface:  python ml_predictor.py precompute_surface [--axes temperature=10:40:7,...] "
+              "[--locations 'State/District;...'] [--top-k K] [--samples N]")
+        print("Benchmark: python ml_predictor.py benchmark [--scales 1200,5000] [--commands a,b] [--inference sklearn,compiled] "
+              "[--repeats N] [--output report.json] [--baseline baseline.json] [--save-baseline] [--tolerance 0.2]")
         return
     
     command = sys.argv[1]
+    
+    if command == 'startup_check':
+        # Cold-start budget for the prediction path; non-zero exit if exceeded
+        report = startup_check()
+        print(json.dumps(report, indent=2))
+        if not report['ok']:
+            sys.exit(1)
+        return
+    
+    if command == 'benchmark':
+        # Offline performance suite; non-zero exit on regressions against the baseline
+        import ml_benchmark
+        args = sys.argv[2:]
+        save_baseline = '--save-baseline' in args
+        if save_baseline:
+            args.remove('--save-baseline')
+        scales = _pop_option(args, '--scales')
+        commands = _pop_option(args, '--commands')
+        modes = _pop_option(args, '--inference')
+        output = _pop_option(args, '--output')
+        baseline_path = _pop_option(args, '--baseline', ml_benchmark.BASELINE_PATH)
+        tolerance = float(_pop_option(args, '--tolerance', ml_benchmark.DEFAULT_TOLERANCE))
+        
+        report = ml_benchmark.run_benchmarks(
+            scales=[int(n) for n in scales.split(',')] if scales else None,
+            commands=commands.split(',') if commands else None,
+            inference_modes=modes.split(',') if modes else None,
+            repeats=int(_pop_option(args, '--repeats', ml_benchmark.DEFAULT_REPEATS))
+        )
+        if os.path.exists(baseline_path) and not save_baseline:
+            with open(baseline_path, 'r') as f:
+                baseline = json.load(f)
+            if baseline.get('environment') != report['environment']:
+                print("Note: baseline was recorded in a different environment; differences may not be regressions")
+            report['baseline'] = baseline_path
+            report['comparison'] = ml_benchmark.compare_with_baseline(report, baseline, tolerance)
+        elif not save_baseline:
+            print(f"No baseline at {baseline_path}; nothing compared (record one with --save-baseline)")
+        
+        ml_benchmark.print_report(report)
+        if output:
+            ml_benchmark.write_report(output, report)
+            print(f"Benchmark report written to {output}")
+        if save_baseline:
+            ml_benchmark.write_report(baseline_path, report)
+            print(f"Baseline saved to {baseline_path}")
+        if any(c['regression'] for c in report.get('comparison', [])):
+            sys.exit(1)
+        return
+    
+    if command == 'serve':
+        # Long-lived worker: load models once, answer many requests
+        from ml_server import run_server
+        run_server(AgriSmartMLPredictor, sys.argv[2:])
+        return
+    
     predictor = AgriSmartMLPredictor()
     
     if command == 'train':
-        predictor.train_models()
+        args = sys.argv[2:]
+        params_path = _pop_option(args, '--params')
+        backend = _pop_option(args, '--backend')
+        n_samples = int(args[0]) if args else 1200
+        forest_params = params_backend = None
+        if params_path:
+            # Parameters picked by `tune`; leaderboards that predate the recorded
+            # backend all come from the random forest search
+            with open(params_path, 'r') as f:
+                tuned = json.load(f)
+            forest_params = tuned['selected']
+            params_backend = tuned.get('backend', 'random_forest')
+        predictor.train_models(n_samples=n_samples, forest_params=forest_params, backend=backend,
+                               params_backend=params_backend)
+        
+    elif command == 'train_historical':
+        # Real rows from historical_crop_data; the cached snapshot is reused unless --refresh
+        args = sys.argv[2:]
+        backend = _pop_option(args, '--backend')
+        df = predictor.load_historical_training_data(
+            sqlite_path=_pop_option(args, '--sqlite'),
+            snapshot_path=_pop_option(args, '--snapshot'),
+            refresh='--refresh' in args
+        )
+        predictor.train_models(training_data=df, data_source='historical_crop_data', backend=backend)
+        
+    elif command == 'tune':
+        # Cross-validated forest search; writes a leaderboard with the selected parameters
+        args = sys.argv[2:]
+        data_path = _pop_option(args, '--data')
+        folds = int(_pop_option(args, '--folds', 5))
+        workers = _pop_option(args, '--workers')
+        output = _pop_option(args, '--output')
+        from ml_data_sources import read_training_file
+        targets = {}
+        for flag, task in (('--target-r2', 'yield'), ('--target-crop-r2', 'crop_yield'),
+                           ('--target-accuracy', 'recommendation')):
+            value = _pop_option(args, flag)
+            if value is not None:
+                targets[task] = float(value)
+        
+        predictor.tune_models(
+            n_samples=int(args[0]) if args else 1200,
+            training_data=read_training_file(data_path) if data_path else None,
+            folds=folds,
+            workers=int(workers) if workers else None,
+            targets=targets,
+            output=output
+        )
+        
+    elif command == 'compare_backends':
+        # Size / speed / accuracy of each model backend trained on the same rows
+        args = sys.argv[2:]
+        backends = _pop_option(args, '--backends')
+        data_path = _pop_option(args, '--data')
+        output = _pop_option(args, '--output')
+        from ml_data_sources import read_training_file
+        predictor.compare_backends(
+            n_samples=int(args[0]) if args else 5000,
+            training_data=read_training_file(data_path) if data_path else None,
+            backends=backends.split(',') if backends else BACKENDS,
+            output=output
+        )
+        
+    elif command == 'update':
+        # Add trees fitted on a new season of rows to the active bundle
+        args = sys.argv[2:]
+        rescale = '--rescale' in args
+        if rescale:
+            args.remove('--rescale')
+        max_trees = _pop_option(args, '--max-trees')
+        if not args:
+            print("Usage: python ml_predictor.py update <new_rows.csv|.parquet|.arrow|.npy|.npz> [n_new_trees] [--max-trees N] [--rescale]")
+            return
+        
+        from ml_data_sources import read_training_file
+        n_new_trees = int(args[1]) if len(args) > 1 else 20
+        predictor.update_models(read_training_file(args[0]), n_new_trees=n_new_trees,
+                                max_trees=int(max_trees) if max_trees else None,
+                                rescale=rescale, data_source=os.path.basename(args[0]))
+        
+    elif command == 'generate':
+        if len(sys.argv) < 3:
+            print("Usage: python ml_predictor.py generate <output.csv|.parquet|.arrow> [n_samples] [seed]")
+            return
+        
+        n_samples = int(sys.argv[3]) if len(sys.argv) > 3 else 1200
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else 42
+        written = write_synthetic_data(sys.argv[2], n_samples=n_samples, seed=seed)
+        print(f"Wrote {written} synthetic samples to {sys.argv[2]}")
+        
+    elif command == 'compile':
+        # Re-save the active bundle with freshly compiled forests
+        predictor = AgriSmartMLPredictor(inference='sklearn')
+        predictor.ensure_models()
+        predictor.save_models()
+        
+    elif command == 'precompute_surface':
+        # Grid lookups for the active bundle; served with AGRISMART_SURFACE=nearest|multilinear
+        args = sys.argv[2:]
+        locations = _pop_option(args, '--locations')
+        validation = predictor.precompute_surface(
+            axes=parse_axes(_pop_option(args, '--axes'), NUMERIC_INPUTS),
+            locations=[tuple(item.split('/', 1)) for item in locations.split(';')] if locations else None,
+            top_k=int(_pop_option(args, '--top-k', DEFAULT_TOP_K)),
+            validation_samples=int(_pop_option(args, '--samples', DEFAULT_VALIDATION_SAMPLES))
+        )
+        if not any(validation['active'].values()):
+            sys.exit(1)
         
     elif command == 'predict_yield':
         if len(sys.argv) < 3:
@@ -521,8 +1867,74 @@ def main():
         result = predictor.recommend_crops(input_data)
         print(json.dumps(result))
         
+    elif command == 'optimize_inputs':
+        if len(sys.argv) < 3:
+            print("Error: No input data provided")
+            return
+            
+        input_data = json.loads(sys.argv[2])
+        result = predictor.optimize_inputs(input_data)
+        print(json.dumps(result))
+        
+    elif command == 'predict_crop_yields':
+        if len(sys.argv) < 3:
+            print("Error: No input data provided")
+            return
+            
+        input_data = json.loads(sys.argv[2])
+        result = predictor.predict_crop_yields(input_data)
+        print(json.dumps(result))
+        
+    elif command == 'drift_report':
+        # Drift of a logged input file, or of the live counts in AGRISMART_DRIFT_FILE
+        result = predictor.drift_report(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(json.dumps(result, indent=2))
+        
+    elif command == 'batch':
+        args = sys.argv[2:]
+        keep = _pop_option(args, '--keep')
+        batch_rows = int(_pop_option(args, '--batch-rows', DEFAULT_BATCH_ROWS))
+        # Names of the columns of a 2-D .npy input
+        matrix_columns = _pop_option(args, '--columns')
+        matrix_columns = matrix_columns.split(',') if matrix_columns else None
+        if len(args) < 2 or args[0] not in ('predict_yield', 'recommend_crops'):
+            print("Usage: python ml_predictor.py batch <predict_yield|recommend_crops> <input> [output] "
+                  "[--keep col,...] [--batch-rows N] [--columns col,...]")
+            return
+        
+        if len(args) > 2 and is_columnar(args[2]):
+            # Columnar output, scored and written batch by batch; summary on stdout
+            summary = predictor.score_file(args[0], args[1], args[2], keep=keep.split(',') if keep else None,
+                                           batch_rows=batch_rows, matrix_columns=matrix_columns)
+            print(json.dumps(summary))
+        else:
+            batch_method = getattr(predictor, f"{args[0]}_batch")
+            inputs = args[1]
+            if matrix_columns and is_columnar(inputs):
+                inputs = read_table(inputs, list(DEFAULT_INPUTS), matrix_columns)
+            results = batch_method(inputs)
+            
+            # One JSON result per line, in input order
+            out = open(args[2], 'w') if len(args) > 2 else sys.stdout
+            try:
+                for result in results:
+                    out.write(json.dumps(result) + '\n')
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        
     else:
         print(f"Unknown command: {command}")
+        return
+    
+    # Timings and counters go to stderr / AGRISMART_METRICS_FILE, never the result stream
+    predictor.export_metrics()
+    predictor.save_drift_state()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    except ModelBundleError as e:
+        # Same {"error": ...} shape as prediction failures, instead of a traceback
+        print(json.dumps({'error': str(e)}))
+        sys.exit(1)
\ No newline at end of file
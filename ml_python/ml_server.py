@@ -0,0 +1,334 @@
+# AgriSmart Python ML System
+# Persistent prediction server
+# Keeps one warm AgriSmartMLPredictor in memory and answers newline-delimited
+# JSON requests over stdin/stdout or a local TCP socket
+
+import sys
+import json
+import time
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+
+from ml_batching import MicroBatcher, BATCHED_COMMANDS
+
+
+class PredictionServer:
+    """
+    Long-lived prediction worker.
+
+    Requests are one JSON object per line:
+        {"id": 1, "command": "recommend_crops", "data": {...}}
+    Responses echo the id so many requests can be in flight at once:
+        {"id": 1, "ok": true, "result": {...}}
+    With `batching` ({max_batch_size, max_wait_ms, workers}), concurrent
+    predict_yield / recommend_crops requests are merged by a MicroBatcher.
+    """
+
+    PREDICT_COMMANDS = ('predict_yield', 'recommend_crops', 'predict_crop_yields', 'optimize_inputs',
+                        'predict_yield_batch', 'recommend_crops_batch')
+
+    def __init__(self, predictor_factory, workers=4, batching=None):
+        self.predictor_factory = predictor_factory
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batching = batching
+        self.batcher = None
+        self.predictor = None
+        self.ready = False
+        self.reloading = False
+        self.started_at = time.time()
+        self.loaded_at = None
+        self.requests_served = 0
+        self.requests_failed = 0
+        self.in_flight = 0
+        self.last_reload_error = None
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+
+    def _load_predictor(self, verify=False):
+        """Create a predictor and make sure its models are in memory"""
+        predictor = self.predictor_factory()
+        if verify:
+            predictor.load_models(verify=True)
+        predictor.ensure_models()
+        return predictor
+
+    def start(self):
+        """Load models once before accepting traffic"""
+        self.predictor = self._load_predictor()
+        self.loaded_at = time.time()
+        if self.batching:
+            self.batcher = MicroBatcher(lambda: self.predictor, **self.batching).start()
+        self.ready = True
+        print("Prediction server ready", file=sys.stderr)
+
+    def reload(self):
+        """
+        Load a fresh predictor in the background and swap it in.
+        The current predictor keeps serving until the new one is ready;
+        on failure the old models stay active.
+        """
+        with self._lock:
+            if self.reloading:
+                return {'status': 'reload_in_progress'}
+            self.reloading = True
+
+        def _reload():
+            try:
+                # Counts carry over (via AGRISMART_DRIFT_FILE) if the bundle did not change
+                self.predictor.save_drift_state()
+                # Reloads run off the request path, so they also re-hash every artifact
+                predictor = self._load_predictor(verify=True)
+                with self._lock:
+                    self.predictor = predictor
+                    self.loaded_at = time.time()
+                    self.last_reload_error = None
+                print("Models reloaded", file=sys.stderr)
+            except Exception as e:
+                self.last_reload_error = str(e)
+                print(f"Model reload failed: {e}", file=sys.stderr)
+            finally:
+                self.reloading = False
+
+        threading.Thread(target=_reload, daemon=True).start()
+        return {'status': 'reload_started'}
+
+    def health(self):
+        """Liveness and readiness report"""
+        predictor = self.predictor
+        training_stats = predictor.training_stats if predictor else {}
+        return {
+            'status': 'ok',
+            'ready': self.ready,
+            'reloading': self.reloading,
+            'workers': self.workers,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'models_loaded_at': self.loaded_at,
+            'bundle_version': getattr(predictor, 'bundle_version', None),
+            'training_date': training_stats.get('training_date'),
+            'requests_served': self.requests_served,
+            'requests_failed': self.requests_failed,
+            'in_flight': self.in_flight,
+            'cache': predictor.cache.stats() if predictor else None,
+            'batching': self.batcher.stats() if self.batcher else None,
+            'drift': self._drift_summary(predictor)
+        }
+
+    def _drift_summary(self, predictor):
+        """Headline of the live drift report (full report: the 'drift' command)"""
+        if predictor is None or predictor.drift is None:
+            return None
+        report = predictor.drift.report()
+        return {key: report[key] for key in ('rows_seen', 'drifted_features', 'retrain_recommended')}
+
+    def metrics(self, fmt=None):
+        """Stage timings and counters of the active predictor (JSON or Prometheus text)"""
+        predictor = self.predictor
+        if predictor is None:
+            return {'enabled': False}
+        if fmt == 'prometheus':
+            return {'format': 'prometheus', 'text': predictor.metrics.render_prometheus()}
+        return {'enabled': predictor.metrics.enabled, **predictor.metrics.snapshot()}
+
+    def handle(self, request):
+        """Execute a single decoded request and build its response"""
+        request_id = request.get('id')
+        command = request.get('command')
+
+        try:
+            if command in self.PREDICT_COMMANDS:
+                if not self.ready:
+                    raise RuntimeError('Models are not loaded yet')
+                predictor = self.predictor
+                result = getattr(predictor, command)(request.get('data') or {})
+            elif command == 'health':
+                result = self.health()
+            elif command == 'drift':
+                if not self.ready:
+                    raise RuntimeError('Models are not loaded yet')
+                result = self.predictor.drift_report()
+            elif command == 'metrics':
+                result = self.metrics((request.get('data') or {}).get('format'))
+            elif command == 'ready':
+                result = {'ready': self.ready}
+            elif command == 'reload':
+                result = self.reload()
+            elif command == 'shutdown':
+                self._shutdown.set()
+                result = {'status': 'shutting_down'}
+            else:
+                raise ValueError(f"Unknown command: {command}")
+
+            return self._response(request_id, result)
+
+        except Exception as e:
+            return self._response(request_id, error=e)
+
+    def _response(self, request_id, result=None, error=None):
+        """Build a response and count it"""
+        if error is None:
+            ok = not (isinstance(result, dict) and 'error' in result)
+            response = {'id': request_id, 'ok': ok, 'result': result}
+        else:
+            response = {'id': request_id, 'ok': False, 'error': str(error)}
+
+        with self._lock:
+            self.requests_served += 1
+            if not response['ok']:
+                self.requests_failed += 1
+        return response
+
+    def _submit(self, line, write):
+        """Decode one request line and answer it on the worker pool"""
+        line = line.strip()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            write({'id': None, 'ok': False, 'error': f"Invalid JSON: {e}"})
+            return
+
+        # Answer shutdown inline so the read loop sees it immediately
+        if request.get('command') == 'shutdown':
+            write(self.handle(request))
+            return
+
+        with self._lock:
+            self.in_flight += 1
+
+        if self.batcher is not None and request.get('command') in BATCHED_COMMANDS:
+            self._submit_batched(request, write)
+            return
+
+        def _run():
+            try:
+                write(self.handle(request))
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        self.executor.submit(_run)
+
+    def _submit_batched(self, request, write):
+        """Queue a single-row prediction on the micro-batcher; answer when its batch finishes"""
+        request_id = request.get('id')
+
+        def _done(future):
+            try:
+                error = future.exception()
+                write(self._response(request_id, future.result()) if error is None
+                      else self._response(request_id, error=error))
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        try:
+            future = self.batcher.submit(request['command'], request.get('data') or {})
+        except Exception as e:
+            with self._lock:
+                self.in_flight -= 1
+            write(self._response(request_id, error=e))
+            return
+        future.add_done_callback(_done)
+
+    def _make_writer(self, stream):
+        """Serialize responses so concurrent workers never interleave lines"""
+        write_lock = threading.Lock()
+
+        def write(response):
+            payload = json.dumps(response) + '\n'
+            with write_lock:
+                stream.write(payload)
+                stream.flush()
+
+        return write
+
+    def serve_stdio(self, instream, outstream):
+        """Serve newline-delimited JSON on the given streams until EOF or shutdown"""
+        write = self._make_writer(outstream)
+        for line in instream:
+            self._submit(line, write)
+            if self._shutdown.is_set():
+                break
+        self._close()
+
+    def serve_tcp(self, host='127.0.0.1', port=8765):
+        """Serve newline-delimited JSON on a local TCP socket"""
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stream = _SocketTextWriter(self.wfile)
+                write = server._make_writer(stream)
+                for raw in self.rfile:
+                    server._submit(raw.decode('utf-8'), write)
+                    if server._shutdown.is_set():
+                        break
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((host, port), Handler) as tcp_server:
+            tcp_server.daemon_threads = True
+            threading.Thread(target=tcp_server.serve_forever, daemon=True).start()
+            print(f"Prediction server listening on {host}:{port}", file=sys.stderr)
+            self._shutdown.wait()
+            tcp_server.shutdown()
+        self._close()
+
+    def _close(self):
+        """Finish queued and running requests"""
+        if self.batcher is not None:
+            self.batcher.close()
+        self.executor.shutdown(wait=True)
+
+
+class _SocketTextWriter:
+    """Minimal text adapter over a socket's binary write file"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def run_server(predictor_factory, args):
+    """
+    Entry point for `ml_predictor.py serve [--port N] [--workers N]
+    [--batch-size N] [--batch-wait-ms X] [--batch-workers N]` (batching is on
+    when --batch-size is above 1)
+    """
+    settings = {'port': None, 'workers': 4}
+    batching = {}
+    options = {'--port': (settings, 'port', int), '--workers': (settings, 'workers', int),
+               '--batch-size': (batching, 'max_batch_size', int),
+               '--batch-wait-ms': (batching, 'max_wait_ms', float),
+               '--batch-workers': (batching, 'workers', int)}
+    for i in range(0, len(args), 2):
+        if args[i] not in options:
+            raise ValueError(f"Unknown serve option: {args[i]}")
+        if i + 1 >= len(args):
+            raise ValueError(f"Missing value for {args[i]}")
+        target, name, convert = options[args[i]]
+        target[name] = convert(args[i + 1])
+    port, workers = settings['port'], settings['workers']
+    if batching.get('max_batch_size', 1) <= 1:
+        batching = None
+
+    # Responses own stdout; anything the predictor prints goes to stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    server = PredictionServer(predictor_factory, workers=workers, batching=batching)
+    server.start()
+
+    if port is not None:
+        server.serve_tcp(port=port)
+    else:
+        server.serve_stdio(sys.stdin, protocol_out)
+    server.predictor.export_metrics()
+    server.predictor.save_drift_state()
@@ -0,0 +1,310 @@
+# AgriSmart Python ML System
+# Precomputed recommendation surface
+#
+# Offline, the models are evaluated (batch path) on a regular grid of the seven
+# numeric inputs for each known location. Per grid point the surface keeps the
+# yield summary and the top crops with their suitability, crop yield and
+# confidence, in .npy files that are memory-mapped at query time. A request
+# whose location is covered and whose inputs lie inside the grid is answered by
+# nearest-grid-point or multilinear interpolation instead of running the
+# forests. Every location is validated against the live models at random
+# off-grid points (yield, suitability, and the yield and confidence of the top
+# crops), and only locations within the configured error bounds serve.
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+SURFACE_METHODS = ('nearest', 'multilinear')
+
+# Grid per numeric input: (low, high, points); inputs outside it use the live models
+DEFAULT_SURFACE_AXES = {
+    'temperature': (10.0, 40.0, 6),
+    'humidity': (30.0, 95.0, 4),
+    'rainfall': (200.0, 1800.0, 6),
+    'ph': (4.5, 9.0, 4),
+    'nitrogen': (40.0, 250.0, 3),
+    'phosphorus': (15.0, 120.0, 3),
+    'potassium': (20.0, 180.0, 3)
+}
+
+# Crops kept per grid point (the response lists the top 5)
+DEFAULT_TOP_K = 8
+# Grid rows scored per forest call while building
+BUILD_CHUNK_ROWS = 20_000
+# Random off-grid points compared with the live models per location
+DEFAULT_VALIDATION_SAMPLES = 200
+# Validation errors are summarised by this quantile
+ERROR_QUANTILE = 0.95
+# Top crops per response whose yield and confidence are validated (recommend_crops lists 5)
+VALIDATED_CROPS = 5
+# Default bounds: relative yield error (predict_yield and per-crop yields) and
+# absolute suitability error (also applied to per-crop confidence)
+DEFAULT_MAX_YIELD_ERROR = 0.05
+DEFAULT_MAX_PROBABILITY_ERROR = 0.05
+
+MANIFEST_FILE = 'surface.json'
+
+
+def parse_axes(spec, names):
+    """
+    Grid axes from 'temperature=10:40:7,rainfall=200:1800:9' on top of the
+    defaults. Returns {name: (low, high, points)} in `names` order.
+    """
+    axes = dict(DEFAULT_SURFACE_AXES)
+    if spec:
+        for item in spec.split(','):
+            name, _, value = item.partition('=')
+            name = name.strip()
+            if name not in names:
+                raise ValueError(f"Unknown surface axis: {name}")
+            low, high, points = value.split(':')
+            axes[name] = (float(low), float(high), int(points))
+    return {name: axes[name] for name in names}
+
+
+def grid_points(axes):
+    """(G, D) matrix of every grid point, first axis slowest"""
+    values = [np.linspace(low, high, points) for low, high, points in axes.values()]
+    mesh = np.meshgrid(*values, indexing='ij')
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+def build_surface(path, score, locations, axes, min_probability, top_k=DEFAULT_TOP_K, info=None):
+    """
+    Evaluate `score` over the grid of every location and write the surface.
+
+    locations: [(state_code, district_code, state, district)]
+    score(features) -> (yield_stats (n, Y), probabilities (n, C), classes (C,),
+                        crop_yield (n, C), crop_confidence (n, C))
+    Arrays are written through .npy memory maps into a temporary directory that
+    replaces `path` when complete.
+    """
+    grid = grid_points(axes)
+    n_grid, n_locations = len(grid), len(locations)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    arrays = {}
+
+    def open_array(name, dtype, shape):
+        arrays[name] = np.lib.format.open_memmap(os.path.join(tmp_path, f'{name}.npy'), mode='w+',
+                                                 dtype=dtype, shape=shape)
+        return arrays[name]
+
+    n_classes = None
+    for l, (state_code, district_code, state, district) in enumerate(locations):
+        print(f"Surface {l + 1}/{n_locations}: {district}, {state} ({n_grid} grid points)")
+        for start in range(0, n_grid, BUILD_CHUNK_ROWS):
+            points = grid[start:start + BUILD_CHUNK_ROWS]
+            features = np.column_stack([np.full(len(points), state_code), np.full(len(points), district_code), points])
+            yield_stats, probabilities, classes, crop_yield, crop_confidence = score(features)
+
+            if not arrays:
+                n_classes = int(np.max(classes)) + 1
+                open_array('yield', np.float64, (n_locations, n_grid, yield_stats.shape[1]))
+                open_array('crops', np.int16, (n_locations, n_grid, top_k))
+                open_array('crop_stats', np.float64, (n_locations, n_grid, top_k, 3))
+                open_array('analyzed', np.int16, (n_locations, n_grid))
+
+            rows = slice(start, start + len(points))
+            arrays['yield'][l, rows] = yield_stats
+            arrays['analyzed'][l, rows] = (probabilities > min_probability).sum(axis=1)
+
+            # Top-k crops per point; crops at or under min_probability are never reported
+            top = np.argsort(-probabilities, axis=1, kind='stable')[:, :top_k]
+            picked = np.take_along_axis(probabilities, top, axis=1)
+            arrays['crops'][l, rows] = np.where(picked > min_probability, classes[top], -1)
+            arrays['crop_stats'][l, rows] = np.stack([
+                picked,
+                np.take_along_axis(crop_yield, top, axis=1),
+                np.take_along_axis(crop_confidence, top, axis=1)
+            ], axis=-1)
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    manifest = {
+        'created': datetime.now().isoformat(),
+        **(info or {}),
+        'axes': {name: list(axis) for name, axis in axes.items()},
+        'locations': [[state, district] for _, _, state, district in locations],
+        'location_codes': [[int(s), int(d)] for s, d, _, _ in locations],
+        'n_classes': n_classes,
+        'top_k': top_k,
+        'validation': None
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    os.rename(tmp_path, path)
+    return RecommendationSurface(path)
+
+
+class RecommendationSurface:
+    """Memory-mapped surface with grid interpolation"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+            self.manifest = json.load(f)
+        self.arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                       for name in ('yield', 'crops', 'crop_stats', 'analyzed')}
+
+        axes = self.manifest['axes']
+        self.axes = [np.linspace(low, high, int(points)) for low, high, points in axes.values()]
+        self.shape = tuple(len(axis) for axis in self.axes)
+        self.n_classes = self.manifest['n_classes']
+        self.locations = {tuple(codes): l for l, codes in enumerate(self.manifest['location_codes'])}
+        self.active = np.ones(len(self.locations), dtype=bool)
+
+        # Corner offsets of a grid cell for multilinear interpolation
+        n_dims = len(self.axes)
+        self._corners = (np.arange(2 ** n_dims)[:, None] >> np.arange(n_dims)[None, :]) & 1
+
+    def enable(self, method, max_yield_error, max_probability_error):
+        """
+        Serve only locations whose validated errors (for `method`) are within
+        the bounds. Returns the number of active locations.
+        """
+        validation = self.manifest.get('validation') or {}
+        errors = validation.get(method)
+        if errors is None or 'crop_yield_error' not in errors:
+            # Not validated, or validated before per-crop values were checked
+            self.active[:] = False
+        else:
+            self.active = ((np.asarray(errors['yield_error']) <= max_yield_error) &
+                           (np.asarray(errors['crop_yield_error']) <= max_yield_error) &
+                           (np.asarray(errors['probability_error']) <= max_probability_error) &
+                           (np.asarray(errors['crop_confidence_error']) <= max_probability_error))
+        return int(self.active.sum())
+
+    def _cells(self, points, method):
+        """Grid indices (n, m, D) and weights (n, m) of the m points used per row"""
+        positions = np.column_stack([np.interp(points[:, d], axis, np.arange(len(axis)))
+                                     for d, axis in enumerate(self.axes)])
+        if method == 'nearest':
+            return np.rint(positions).astype(np.intp)[:, None, :], np.ones((len(points), 1))
+
+        upper = np.array(self.shape) - 1
+        low = np.minimum(np.floor(positions).astype(np.intp), np.maximum(upper - 1, 0))
+        frac = positions - low
+        index = np.minimum(low[:, None, :] + self._corners[None, :, :], upper)
+        weights = np.where(self._corners[None, :, :] == 1, frac[:, None, :], 1 - frac[:, None, :]).prod(axis=2)
+        return index, weights
+
+    def lookup(self, features, method):
+        """
+        Interpolated values for raw feature rows (state code, district code,
+        numeric inputs in axis order). Returns (hits, values) where hits marks
+        rows answered by the surface and values holds, for those rows:
+        'yield' (h, Y), 'probabilities', 'crop_yield', 'crop_confidence'
+        (h, n_classes) and 'analyzed' (h,).
+        """
+        n = len(features)
+        location = np.array([self.locations.get((int(s), int(d)), -1)
+                             for s, d in zip(features[:, 0], features[:, 1])], dtype=np.intp)
+        points = features[:, 2:2 + len(self.axes)]
+        inside = np.all([(points[:, d] >= axis[0]) & (points[:, d] <= axis[-1])
+                         for d, axis in enumerate(self.axes)], axis=0) if n else np.zeros(0, dtype=bool)
+        hits = (location >= 0) & inside
+        hits[hits] = self.active[location[hits]]
+
+        rows = np.flatnonzero(hits)
+        index, weights = self._cells(points[rows], method)
+        flat = np.ravel_multi_index(tuple(np.moveaxis(index, -1, 0)), self.shape)
+        location = location[rows][:, None]
+
+        values = {
+            'yield': np.einsum('nm,nmy->ny', weights, self.arrays['yield'][location, flat]),
+            'analyzed': np.rint((weights * self.arrays['analyzed'][location, flat]).sum(axis=1)).astype(int)
+        }
+
+        # Crops missing from a corner's top-k count as probability 0 there; their
+        # yield and confidence are averaged over the corners that list them
+        crops = self.arrays['crops'][location, flat]
+        stats = self.arrays['crop_stats'][location, flat]
+        present = crops >= 0
+        row_ids = np.broadcast_to(np.arange(len(rows))[:, None, None], crops.shape)[present]
+        codes = crops[present]
+        w = np.broadcast_to(weights[:, :, None], crops.shape)[present]
+
+        shape = (len(rows), self.n_classes)
+        probabilities, weight_sum = np.zeros(shape), np.zeros(shape)
+        crop_yield, crop_confidence = np.zeros(shape), np.zeros(shape)
+        np.add.at(probabilities, (row_ids, codes), w * stats[..., 0][present])
+        np.add.at(weight_sum, (row_ids, codes), w)
+        np.add.at(crop_yield, (row_ids, codes), w * stats[..., 1][present])
+        np.add.at(crop_confidence, (row_ids, codes), w * stats[..., 2][present])
+        listed = weight_sum > 0
+        crop_yield[listed] /= weight_sum[listed]
+        crop_confidence[listed] /= weight_sum[listed]
+
+        values.update(probabilities=probabilities, crop_yield=crop_yield, crop_confidence=crop_confidence)
+        return hits, values
+
+
+def validate_surface(surface, score, samples=DEFAULT_VALIDATION_SAMPLES, seed=0):
+    """
+    Compare every location against the live models at random points inside
+    the grid, for each interpolation method. Per method and location records
+    the ERROR_QUANTILE of the relative yield error, of the largest absolute
+    suitability (probability) difference, and - over the VALIDATED_CROPS top
+    crops - of the largest relative crop yield and absolute confidence
+    difference, and stores them in the manifest.
+    """
+    rng = np.random.default_rng(seed)
+    lows = np.array([axis[0] for axis in surface.axes])
+    highs = np.array([axis[-1] for axis in surface.axes])
+    surface.active[:] = True
+
+    names = ('yield_error', 'probability_error', 'crop_yield_error', 'crop_confidence_error')
+    validation = {method: {name: [] for name in names} for method in SURFACE_METHODS}
+    for state_code, district_code in surface.manifest['location_codes']:
+        points = rng.uniform(lows, highs, size=(samples, len(lows)))
+        features = np.column_stack([np.full(samples, state_code), np.full(samples, district_code), points])
+        live_yield, live_probabilities, classes, live_crop_yield, live_crop_confidence = score(features)
+        probabilities = np.zeros((samples, surface.n_classes))
+        crop_yield = np.zeros((samples, surface.n_classes))
+        crop_confidence = np.zeros((samples, surface.n_classes))
+        probabilities[:, classes] = live_probabilities
+        crop_yield[:, classes] = live_crop_yield
+        crop_confidence[:, classes] = live_crop_confidence
+
+        for method in SURFACE_METHODS:
+            _, values = surface.lookup(features, method)
+            # Crops the surface would report first, where the live models give a crop yield
+            top = np.argsort(-values['probabilities'], axis=1, kind='stable')[:, :VALIDATED_CROPS]
+            reported = np.zeros(probabilities.shape, dtype=bool)
+            np.put_along_axis(reported, top, True, axis=1)
+            reported &= (values['probabilities'] > 0) & (crop_yield > 0)
+
+            errors = {
+                'yield_error': np.abs(values['yield'][:, 0] - live_yield[:, 0]) / np.maximum(np.abs(live_yield[:, 0]), 1),
+                'probability_error': np.abs(values['probabilities'] - probabilities).max(axis=1),
+                'crop_yield_error': np.where(
+                    reported, np.abs(values['crop_yield'] - crop_yield) / np.maximum(crop_yield, 1), 0
+                ).max(axis=1),
+                'crop_confidence_error': np.where(
+                    reported, np.abs(values['crop_confidence'] - crop_confidence), 0
+                ).max(axis=1)
+            }
+            for name in names:
+                validation[method][name].append(round(float(np.quantile(errors[name], ERROR_QUANTILE)), 5))
+
+    validation['samples'] = samples
+    validation['quantile'] = ERROR_QUANTILE
+    surface.manifest['validation'] = validation
+    manifest_path = os.path.join(surface.path, MANIFEST_FILE)
+    tmp_path = f'{manifest_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(surface.manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return validation
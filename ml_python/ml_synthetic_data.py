@@ -0,0 +1,246 @@
+# AgriSmart Python ML System
+# Vectorized synthetic training-data generator
+#
+# Every column is drawn as a whole array and the crop suitability factors are
+# computed with lookup tables and array operations, so millions of rows take
+# seconds. Large datasets are produced in chunks and can be streamed to
+# CSV or Parquet without holding everything in memory.
+
+import numpy as np
+
+# Your 37+ crops from the current system
+CROPS = [
+    'Rice', 'Wheat', 'Maize', 'Barley', 'Millet', 'Sorghum',  # Cereals
+    'Cotton', 'Sugarcane', 'Tobacco', 'Jute',  # Cash crops
+    'Groundnut', 'Sunflower', 'Sesame', 'Safflower', 'Mustard', 'Soybean',  # Oilseeds
+    'Chickpea', 'Pigeon Pea', 'Black Gram', 'Green Gram', 'Lentil', 'Field Pea',  # Pulses
+    'Potato', 'Tomato', 'Onion', 'Cabbage', 'Cauliflower', 'Carrot', 'Brinjal', 'Okra', 'Cucumber', 'Pumpkin',  # Vegetables
+    'Apple', 'Banana', 'Orange', 'Mango', 'Grapes', 'Pomegranate',  # Fruits
+    'Chili', 'Turmeric', 'Coriander', 'Cumin', 'Fenugreek'  # Spices
+]
+
+# Indian states and districts
+STATES = [
+    'Punjab', 'Haryana', 'Uttar Pradesh', 'Madhya Pradesh', 'Maharashtra',
+    'Gujarat', 'Rajasthan', 'West Bengal', 'Bihar', 'Odisha',
+    'Andhra Pradesh', 'Tamil Nadu', 'Karnataka', 'Kerala', 'Telangana'
+]
+
+DISTRICTS = [
+    'Ludhiana', 'Amritsar', 'Chandigarh', 'Gurugram', 'Faridabad',
+    'Agra', 'Lucknow', 'Kanpur', 'Indore', 'Bhopal', 'Mumbai', 'Pune',
+    'Ahmedabad', 'Surat', 'Jaipur', 'Jodhpur', 'Kolkata', 'Howrah'
+]
+
+# Soil types from your current system
+SOIL_TYPES = [
+    'Red', 'Black', 'Alluvial', 'Clayey', 'Sandy', 'Loamy', 'Silt',
+    'Peat', 'Chalk', 'Saline', 'Acidic', 'Alkaline', 'Volcanic', 'Desert', 'Laterite'
+]
+
+# Base yield for different crops (kg/ha)
+BASE_YIELDS = {
+    # Cereals - high yield potential
+    'Rice': 3500, 'Wheat': 3200, 'Maize': 4000, 'Barley': 2800, 'Millet': 1500, 'Sorghum': 2000,
+
+    # Cash crops - very high yield potential
+    'Cotton': 2500, 'Sugarcane': 75000, 'Tobacco': 2200, 'Jute': 2800,
+
+    # Oilseeds - moderate yield
+    'Groundnut': 2200, 'Sunflower': 1800, 'Sesame': 800, 'Safflower': 1200, 'Mustard': 1500, 'Soybean': 2500,
+
+    # Pulses - moderate yield
+    'Chickpea': 1800, 'Pigeon Pea': 1500, 'Black Gram': 1200, 'Green Gram': 1000, 'Lentil': 1300, 'Field Pea': 1800,
+
+    # Vegetables - high yield potential
+    'Potato': 25000, 'Tomato': 35000, 'Onion': 20000, 'Cabbage': 30000, 'Cauliflower': 25000,
+    'Carrot': 22000, 'Brinjal': 18000, 'Okra': 12000, 'Cucumber': 15000, 'Pumpkin': 20000,
+
+    # Fruits - very high yield potential
+    'Apple': 15000, 'Banana': 40000, 'Orange': 20000, 'Mango': 12000, 'Grapes': 18000, 'Pomegranate': 10000,
+
+    # Spices - moderate yield
+    'Chili': 3000, 'Turmeric': 6000, 'Coriander': 1500, 'Cumin': 1200, 'Fenugreek': 1800
+}
+DEFAULT_BASE_YIELD = 2000
+
+# Optimal temperature ranges for different crop categories
+TEMPERATURE_PREFS = {
+    'Rice': (20, 35), 'Wheat': (15, 25), 'Maize': (18, 32), 'Cotton': (21, 30),
+    'Sugarcane': (20, 35), 'Potato': (15, 25), 'Tomato': (18, 28)
+}
+DEFAULT_TEMPERATURE_RANGE = (18, 30)
+
+# Optimal rainfall ranges (mm)
+RAINFALL_PREFS = {
+    'Rice': (1000, 1500), 'Wheat': (400, 800), 'Cotton': (600, 1200),
+    'Sugarcane': (1200, 1800), 'Potato': (500, 800)
+}
+DEFAULT_RAINFALL_RANGE = (600, 1200)
+
+# Soil type suitability
+SOIL_SUITABILITY = {
+    'Alluvial': 1.0, 'Loamy': 0.95, 'Black': 0.9, 'Red': 0.85,
+    'Clayey': 0.8, 'Sandy': 0.7, 'Silt': 0.75, 'Laterite': 0.6
+}
+DEFAULT_SOIL_SUITABILITY = 0.7
+
+# (mean, std, low clip, high clip, decimals) for each environmental column
+ENVIRONMENT_DISTRIBUTIONS = {
+    'temperature': (25, 8, 15, 40, 1),      # 15-35°C typical range
+    'humidity': (65, 15, 30, 95, 1),        # 40-90% typical range
+    'rainfall': (800, 300, 200, 1800, 1),   # 200-1500mm typical range
+    'ph': (6.8, 1.2, 4.5, 9.0, 2),          # 4.5-8.5 typical range
+    'nitrogen': (120, 40, 40, 250, 1),      # 50-200 kg/ha
+    'phosphorus': (60, 20, 15, 120, 1),     # 20-100 kg/ha
+    'potassium': (80, 30, 20, 180, 1)       # 30-150 kg/ha
+}
+
+YIELD_NOISE_STD = 0.15   # 15% variability
+MIN_YIELD = 100          # Minimum viable yield
+
+# Per-crop lookup tables indexed by position in CROPS
+_BASE_YIELD_TABLE = np.array([BASE_YIELDS.get(c, DEFAULT_BASE_YIELD) for c in CROPS], dtype=np.float64)
+_TEMPERATURE_TABLE = np.array([TEMPERATURE_PREFS.get(c, DEFAULT_TEMPERATURE_RANGE) for c in CROPS], dtype=np.float64)
+_RAINFALL_TABLE = np.array([RAINFALL_PREFS.get(c, DEFAULT_RAINFALL_RANGE) for c in CROPS], dtype=np.float64)
+_SOIL_TABLE = np.array([SOIL_SUITABILITY.get(s, DEFAULT_SOIL_SUITABILITY) for s in SOIL_TYPES], dtype=np.float64)
+
+
+def range_factor(value, opt_min, opt_max, low_rate, low_floor, high_rate, high_floor):
+    """
+    Suitability factor: 1.0 inside [opt_min, opt_max], falling off linearly
+    outside it down to a floor. Works on scalars and arrays.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    below = np.maximum(low_floor, 1 - (opt_min - value) * low_rate)
+    above = np.maximum(high_floor, 1 - (value - opt_max) * high_rate)
+    return np.where(value < opt_min, below, np.where(value > opt_max, above, 1.0))
+
+
+def temperature_factor(temp, opt_min, opt_max):
+    """Temperature suitability factor for crops"""
+    return range_factor(temp, opt_min, opt_max, 0.05, 0.3, 0.05, 0.3)
+
+
+def humidity_factor(humidity):
+    """Humidity suitability factor"""
+    return range_factor(humidity, 50, 80, 0.02, 0.4, 0.01, 0.6)
+
+
+def rainfall_factor(rainfall, opt_min, opt_max):
+    """Rainfall suitability factor"""
+    return range_factor(rainfall, opt_min, opt_max, 0.0005, 0.3, 0.0003, 0.7)
+
+
+def ph_factor(ph):
+    """Soil pH suitability factor"""
+    return range_factor(ph, 6.0, 7.5, 0.1, 0.4, 0.08, 0.5)
+
+
+def nutrient_factor(n, p, k):
+    """Nutrient availability factor (optimal NPK ranges)"""
+    n, p, k = (np.asarray(v, dtype=np.float64) for v in (n, p, k))
+    n_factor = np.where(n > 0, np.minimum(1.0, n / 100), 0.3)
+    p_factor = np.where(p > 0, np.minimum(1.0, p / 50), 0.3)
+    k_factor = np.where(k > 0, np.minimum(1.0, k / 60), 0.3)
+    return (n_factor + p_factor + k_factor) / 3
+
+
+def generate_chunk(rng, n_samples):
+    """One DataFrame of synthetic samples drawn from `rng`"""
+    crop = rng.integers(0, len(CROPS), n_samples)
+    state = rng.integers(0, len(STATES), n_samples)
+    district = rng.integers(0, len(DISTRICTS), n_samples)
+    soil = rng.integers(0, len(SOIL_TYPES), n_samples)
+
+    # Environmental parameters with realistic ranges and bounds
+    env = {}
+    for column, (mean, std, low, high, _) in ENVIRONMENT_DISTRIBUTIONS.items():
+        env[column] = np.clip(rng.normal(mean, std, n_samples), low, high)
+
+    # Calculate yield based on crop-specific factors and conditions
+    yield_kg_ha = (
+        _BASE_YIELD_TABLE[crop]
+        * temperature_factor(env['temperature'], _TEMPERATURE_TABLE[crop, 0], _TEMPERATURE_TABLE[crop, 1])
+        * humidity_factor(env['humidity'])
+        * rainfall_factor(env['rainfall'], _RAINFALL_TABLE[crop, 0], _RAINFALL_TABLE[crop, 1])
+        * ph_factor(env['ph'])
+        * _SOIL_TABLE[soil]
+        * nutrient_factor(env['nitrogen'], env['phosphorus'], env['potassium'])
+    )
+    yield_kg_ha = yield_kg_ha * rng.normal(1.0, YIELD_NOISE_STD, n_samples)
+    yield_kg_ha = np.maximum(MIN_YIELD, yield_kg_ha)
+
+    # pandas only when data is generated; the predictor imports the tables above
+    import pandas as pd
+    data = {
+        'crop': pd.Categorical.from_codes(crop, CROPS),
+        'state': pd.Categorical.from_codes(state, STATES),
+        'district': pd.Categorical.from_codes(district, DISTRICTS),
+        'soil_type': pd.Categorical.from_codes(soil, SOIL_TYPES)
+    }
+    for column, (_, _, _, _, decimals) in ENVIRONMENT_DISTRIBUTIONS.items():
+        data[column] = np.round(env[column], decimals)
+    data['yield_kg_ha'] = np.round(yield_kg_ha, 0)
+    return pd.DataFrame(data)
+
+
+def iter_synthetic_chunks(n_samples=1200, seed=42, chunk_size=1_000_000):
+    """
+    Yield DataFrames of at most chunk_size rows until n_samples are produced.
+    The same (n_samples, seed, chunk_size) always reproduces the same data.
+    """
+    rng = np.random.default_rng(seed)
+    remaining = n_samples
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        yield generate_chunk(rng, size)
+        remaining -= size
+
+
+def generate_synthetic_data(n_samples=1200, seed=42, chunk_size=1_000_000):
+    """Whole synthetic dataset as one DataFrame"""
+    chunks = list(iter_synthetic_chunks(n_samples, seed, chunk_size))
+    if len(chunks) == 1:
+        return chunks[0]
+    import pandas as pd
+    return pd.concat(chunks, ignore_index=True)
+
+
+def write_synthetic_data(path, n_samples=1200, seed=42, chunk_size=1_000_000):
+    """
+    Stream a synthetic dataset to CSV or Parquet chunk by chunk, so datasets
+    bigger than RAM can be produced. Returns the number of rows written.
+    """
+    path = str(path)
+    written = 0
+
+    if path.endswith(('.parquet', '.arrow', '.feather')):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet / Arrow requires pyarrow: pip install pyarrow")
+
+        writer = None
+        try:
+            for chunk in iter_synthetic_chunks(n_samples, seed, chunk_size):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    # Arrow IPC file (uncompressed, so readers can memory-map it)
+                    writer = pq.ParquetWriter(path, table.schema) if path.endswith('.parquet') else \
+                        pa.ipc.new_file(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    if path.endswith('.csv'):
+        for chunk in iter_synthetic_chunks(n_samples, seed, chunk_size):
+            chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+            written += len(chunk)
+        return written
+
+    raise ValueError(f"Unsupported output format: {path} (use .csv, .parquet or .arrow)")
@@ -0,0 +1,238 @@
+# AgriSmart Python ML System
+# Cross-validated hyperparameter search for the forests
+#
+# The encoded feature matrix, both targets and the fold assignment are cached
+# once as .npy files; worker processes memory-map them instead of receiving a
+# copy per task. Every configuration is scored on the first fold, only the
+# most promising ones go on to the remaining folds (successive halving), and
+# each result records fit time, predict latency and model size alongside the
+# score so the fastest model that meets an accuracy target can be picked.
+
+import os
+import json
+import pickle
+import hashlib
+import itertools
+from time import perf_counter
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.metrics import r2_score, accuracy_score
+
+# Forest hyperparameters searched by default (every combination, per task).
+# Every parameter the trainer's defaults set is searched: `train --params` fits
+# exactly the selected configuration, with sklearn defaults for the rest.
+DEFAULT_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [10, 15, 20, None],
+    'min_samples_split': [2, 5],
+    'min_samples_leaf': [1, 3],
+    'max_features': ['sqrt', 1.0]
+}
+
+# Backend the searched models belong to (recorded so `train --params` can check it)
+BACKEND = 'random_forest'
+
+# Model per task, the score reported for it, its target and whether the crop
+# code is appended as a last feature (the crop-conditioned yield forest)
+TASKS = {
+    'yield': (RandomForestRegressor, 'r2', 'y_yield', False),
+    'crop_yield': (RandomForestRegressor, 'r2', 'y_yield', True),
+    'recommendation': (RandomForestClassifier, 'accuracy', 'y_crop', False)
+}
+
+DEFAULT_FOLDS = 5
+# Keep the best 1/HALVING_RATE of configurations after the first fold
+HALVING_RATE = 3
+# Single-row predictions timed per configuration
+LATENCY_REPEATS = 5
+# Default target when none is given: within this much of the best CV score
+DEFAULT_TARGET_MARGIN = 0.01
+
+# Arrays of the cached dataset, loaded once per worker process
+_DATA = None
+
+
+def cache_dataset(cache_dir, X, y_yield, y_crop, folds=DEFAULT_FOLDS, seed=42):
+    """
+    Write the encoded matrices and a shuffled fold assignment as .npy files in
+    a directory named by a hash of the data, reusing an existing one with the
+    same key. Returns its path.
+    """
+    arrays = {
+        'X': np.ascontiguousarray(X, dtype=np.float64),
+        'y_yield': np.ascontiguousarray(y_yield, dtype=np.float64),
+        'y_crop': np.ascontiguousarray(y_crop, dtype=np.int64)
+    }
+
+    digest = hashlib.sha256()
+    for array in arrays.values():
+        digest.update(array.tobytes())
+    digest.update(f'{folds}:{seed}'.encode())
+    path = os.path.join(cache_dir, f'tuning-{digest.hexdigest()[:16]}')
+
+    if not os.path.isdir(path):
+        rng = np.random.default_rng(seed)
+        arrays['fold'] = rng.permutation(len(arrays['X'])) % folds
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        os.makedirs(tmp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+        os.rename(tmp_path, path)
+    return path
+
+
+def _load_dataset(path):
+    """Worker initializer: memory-map the cached arrays once per process"""
+    global _DATA
+    _DATA = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+             for name in ('X', 'y_yield', 'y_crop', 'fold')}
+
+
+def _evaluate(task, params, fold):
+    """Fit one configuration on one fold; runs inside a worker process"""
+    model_class, metric, target, with_crop = TASKS[task]
+    X, y, fold_ids = _DATA['X'], _DATA[target], _DATA['fold']
+    if with_crop:
+        X = np.column_stack([X, _DATA['y_crop']])
+    train, test = fold_ids != fold, fold_ids == fold
+
+    model = model_class(**params, random_state=42, n_jobs=1)
+    start = perf_counter()
+    model.fit(X[train], y[train])
+    fit_time = perf_counter() - start
+
+    X_test = X[test]
+    start = perf_counter()
+    predicted = model.predict(X_test)
+    batch_time = perf_counter() - start
+
+    row = X_test[:1]
+    latencies = []
+    for _ in range(LATENCY_REPEATS):
+        start = perf_counter()
+        model.predict(row)
+        latencies.append(perf_counter() - start)
+
+    score = r2_score(y[test], predicted) if metric == 'r2' else accuracy_score(y[test], predicted)
+    return {
+        'task': task,
+        'params': params,
+        'fold': fold,
+        'score': float(score),
+        'fit_time_s': fit_time,
+        'predict_ms': float(np.median(latencies)) * 1000,
+        'batch_us_per_row': batch_time / max(1, len(X_test)) * 1e6,
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    }
+
+
+def expand_grid(grid):
+    """All parameter combinations of a {name: [values]} grid"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _summarize(task, params, results, pruned):
+    """One leaderboard row from the per-fold results of a configuration"""
+    scores = [r['score'] for r in results]
+    return {
+        'task': task,
+        'metric': TASKS[task][1],
+        'params': params,
+        'cv_mean': float(np.mean(scores)),
+        'cv_std': float(np.std(scores)),
+        'folds': len(results),
+        'pruned': pruned,
+        'fit_time_s': float(np.mean([r['fit_time_s'] for r in results])),
+        'predict_ms': float(np.median([r['predict_ms'] for r in results])),
+        'batch_us_per_row': float(np.mean([r['batch_us_per_row'] for r in results])),
+        'model_bytes': int(np.max([r['model_bytes'] for r in results]))
+    }
+
+
+def run_search(dataset_path, grid=None, tasks=tuple(TASKS), workers=None, folds=DEFAULT_FOLDS):
+    """
+    Successive-halving cross-validated search.
+    Returns leaderboard rows sorted by task, then mean CV score (best first).
+    """
+    configs = [(task, params) for task in tasks for params in expand_grid(grid or DEFAULT_GRID)]
+    workers = workers or os.cpu_count() or 1
+    results = {i: [] for i in range(len(configs))}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_load_dataset,
+                             initargs=(dataset_path,)) as pool:
+        def run(jobs):
+            futures = [(i, pool.submit(_evaluate, configs[i][0], configs[i][1], fold)) for i, fold in jobs]
+            for i, future in futures:
+                results[i].append(future.result())
+
+        # Rung 1: every configuration on the first fold
+        print(f"Scoring {len(configs)} configurations on fold 1 of {folds} ({workers} workers)...")
+        run([(i, 0) for i in range(len(configs))])
+
+        # Rung 2: only the best 1/HALVING_RATE per task continue
+        survivors = []
+        for task in tasks:
+            ranked = sorted((i for i, (t, _) in enumerate(configs) if t == task),
+                            key=lambda i: results[i][0]['score'], reverse=True)
+            survivors.extend(ranked[:max(1, -(-len(ranked) // HALVING_RATE))])
+        print(f"Scoring {len(survivors)} promising configurations on the remaining folds...")
+        run([(i, fold) for i in survivors for fold in range(1, folds)])
+
+    survivors = set(survivors)
+    leaderboard = [_summarize(task, params, results[i], i not in survivors)
+                   for i, (task, params) in enumerate(configs)]
+    leaderboard.sort(key=lambda row: (tasks.index(row['task']), row['pruned'], -row['cv_mean']))
+    return leaderboard
+
+
+def select_configs(leaderboard, targets=None):
+    """
+    Per task, the fully cross-validated configuration with the lowest
+    single-row predict latency whose mean score meets the target (default:
+    within DEFAULT_TARGET_MARGIN of the best). Returns {task: row}.
+    """
+    targets = targets or {}
+    selected = {}
+    for task in TASKS:
+        rows = [row for row in leaderboard if row['task'] == task and not row['pruned']]
+        if not rows:
+            continue
+        best = max(row['cv_mean'] for row in rows)
+        target = targets.get(task, best - DEFAULT_TARGET_MARGIN)
+        meeting = [row for row in rows if row['cv_mean'] >= target]
+        if meeting:
+            selected[task] = min(meeting, key=lambda row: row['predict_ms'])
+        else:
+            print(f"No {task} configuration reaches {target:.3f}; using the best ({best:.3f})")
+            selected[task] = max(rows, key=lambda row: row['cv_mean'])
+    return selected
+
+
+def write_leaderboard(path, leaderboard, selected, info):
+    """Save the leaderboard and the selected parameters as JSON"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(),
+            'backend': BACKEND,
+            **info,
+            'selected': {task: row['params'] for task, row in selected.items()},
+            'leaderboard': leaderboard
+        }, f, indent=2)
+
+
+def print_leaderboard(leaderboard, top=5):
+    """Best rows per task as a plain-text table"""
+    for task in TASKS:
+        rows = [row for row in leaderboard if row['task'] == task][:top]
+        if not rows:
+            continue
+        print(f"\n{task} ({rows[0]['metric']})")
+        print(f"{'cv_mean':>8} {'cv_std':>7} {'folds':>5} {'fit_s':>7} {'pred_ms':>8} {'size_kb':>9}  params")
+        for row in rows:
+            print(f"{row['cv_mean']:8.3f} {row['cv_std']:7.3f} {row['folds']:5d} {row['fit_time_s']:7.2f} "
+                  f"{row['predict_ms']:8.2f} {row['model_bytes'] / 1024:9.0f}  {row['params']}")
@@ -0,0 +1,48 @@
+# AgriSmart Python ML System
+# Shared test fixtures: one small trained bundle per test session
+
+import os
+import sys
+import shutil
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests run against the defaults, whatever the calling shell exports
+for name in [name for name in os.environ if name.startswith('AGRISMART_')]:
+    del os.environ[name]
+
+from ml_predictor import AgriSmartMLPredictor  # noqa: E402
+
+SAMPLE_INPUTS = [
+    {'crop': 'Rice', 'state': 'Punjab', 'district': 'Ludhiana'},
+    {'crop': 'Wheat', 'state': 'Uttar Pradesh', 'district': 'Lucknow', 'temperature': 18.0, 'rainfall': 450.0},
+    {'crop': 'Cotton', 'state': 'Maharashtra', 'district': 'Nagpur', 'ph': 7.8, 'nitrogen': 20.0},
+    {'crop': 'Maize', 'state': 'Karnataka', 'district': 'Bangalore', 'humidity': 55.0, 'potassium': 60.0},
+    {'crop': 'Sugarcane', 'state': 'Tamil Nadu', 'district': 'Chennai', 'temperature': 31.5, 'rainfall': 1400.0},
+]
+
+
+@pytest.fixture(scope='session')
+def trained_model_dir(tmp_path_factory):
+    """Model directory holding a small trained bundle (read-only; copy it to modify)"""
+    model_dir = tmp_path_factory.mktemp('models')
+    AgriSmartMLPredictor(model_path=str(model_dir)).train_models(n_samples=400, seed=1)
+    return model_dir
+
+
+@pytest.fixture
+def model_dir(trained_model_dir, tmp_path):
+    """Private copy of the trained model directory"""
+    path = tmp_path / 'models'
+    shutil.copytree(trained_model_dir, path)
+    return path
+
+
+@pytest.fixture
+def predictor(trained_model_dir):
+    """Predictor on the shared bundle"""
+    predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir))
+    predictor.ensure_models()
+    return predictor
@@ -0,0 +1,68 @@
+# Model backends: gradient boosting answers like the forests, ordered quantiles
+
+import numpy as np
+import pytest
+
+from ml_backends import BACKENDS, BoostedYieldModel, stratified_holdout_fits
+from ml_predictor import YIELD_QUANTILES, AgriSmartMLPredictor
+
+from conftest import SAMPLE_INPUTS
+
+
+def _shape(value):
+    """Nested key structure of a result (values replaced by their type)"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items() if key != 'algorithm'}
+    if isinstance(value, list):
+        return [_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+@pytest.fixture(scope='module')
+def boosted(tmp_path_factory):
+    """Predictor on a hist_gradient_boosting bundle trained like the session forests"""
+    model_dir = tmp_path_factory.mktemp('boosted')
+    AgriSmartMLPredictor(model_path=str(model_dir)).train_models(n_samples=400, seed=1,
+                                                                 backend='hist_gradient_boosting')
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir))
+    predictor.ensure_models()
+    return predictor
+
+
+def test_boosted_results_have_the_forest_shape(boosted, predictor):
+    assert boosted.backend == 'hist_gradient_boosting'
+    for conditions in SAMPLE_INPUTS:
+        assert _shape(boosted.predict_yield(conditions)) == _shape(predictor.predict_yield(conditions))
+        assert _shape(boosted.recommend_crops(conditions)) == _shape(predictor.recommend_crops(conditions))
+    assert boosted.predict_yield(SAMPLE_INPUTS[0])['model_info']['algorithm'] == \
+        'Histogram Gradient Boosting Regressor'
+
+
+def test_boosted_quantiles_are_ordered(boosted):
+    features = boosted._prepare_batch(SAMPLE_INPUTS)[0]
+    for name in ('yield_model', 'crop_yield_model'):
+        model = getattr(boosted, name)
+        assert isinstance(model, BoostedYieldModel)
+        inputs = features if name == 'yield_model' else np.column_stack([features, np.zeros(len(features))])
+        quantiles = model.distribution(inputs)['quantiles']
+        assert quantiles.shape == (len(YIELD_QUANTILES), len(features))
+        assert (np.diff(quantiles, axis=0) >= 0).all()
+
+    for result in boosted.predict_yield_batch(SAMPLE_INPUTS):
+        q = result['uncertainty']['quantiles']
+        assert q['p10'] <= q['p50'] <= q['p90']
+
+
+def test_compare_backends_reports_each_backend():
+    report = AgriSmartMLPredictor().compare_backends(n_samples=400, seed=1, latency_rows=20, repeats=1)
+    assert [row['backend'] for row in report] == list(BACKENDS)
+    for row in report:
+        assert row['model_bytes'] > 0 and row['batch_rows_per_second'] > 0
+
+
+def test_early_stopping_holdout_needs_every_crop():
+    assert stratified_holdout_fits(np.repeat(np.arange(5), 20), 0.1)
+    # A crop seen once cannot be on both sides
+    assert not stratified_holdout_fits(np.append(np.repeat(np.arange(5), 20), 5), 0.1)
+    # Holdout of 4 rows for 5 crops
+    assert not stratified_holdout_fits(np.repeat(np.arange(5), 8), 0.1)
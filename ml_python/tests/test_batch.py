@@ -0,0 +1,89 @@
+# Batch API: per-row errors in input order, DataFrame rows and CSV/JSONL files through `batch`
+
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+import ml_predictor
+
+from conftest import SAMPLE_INPUTS
+
+BAD_ROWS = {1: dict(SAMPLE_INPUTS[1], temperature='hot'), 3: ['Rice', 'Punjab']}
+
+
+def _with_bad_rows():
+    rows = list(SAMPLE_INPUTS)
+    for i, row in BAD_ROWS.items():
+        rows.insert(i, row)
+    return rows
+
+
+@pytest.mark.parametrize('command', ['predict_yield', 'recommend_crops'])
+def test_bad_rows_are_reported_in_place(predictor, command):
+    score = getattr(predictor, f'{command}_batch')
+    results = score(_with_bad_rows())
+
+    assert len(results) == len(SAMPLE_INPUTS) + len(BAD_ROWS)
+    assert results[1] == {'error': "Invalid temperature: 'hot'"}
+    assert results[3] == {'error': 'Input row must be an object'}
+    # The good rows around them are answered as if the bad ones were not there
+    good = [result for i, result in enumerate(results) if i not in BAD_ROWS]
+    assert good == score(SAMPLE_INPUTS)
+
+
+@pytest.mark.parametrize('command', ['predict_yield', 'recommend_crops'])
+def test_dataframe_rows_match_dict_rows(predictor, command):
+    score = getattr(predictor, f'{command}_batch')
+    # Missing numeric fields become NaN columns, filled with the defaults
+    assert score(pd.DataFrame(SAMPLE_INPUTS)) == score(SAMPLE_INPUTS)
+
+
+def _write_inputs(path):
+    if path.suffix == '.csv':
+        pd.DataFrame(_with_bad_rows()[:3]).to_csv(path, index=False)
+    else:
+        path.write_text(''.join(json.dumps(row) + '\n' for row in _with_bad_rows()[:3]))
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.jsonl'])
+def test_batch_command_scores_files(predictor, model_dir, tmp_path, monkeypatch, capsys, suffix):
+    source, output = tmp_path / f'rows{suffix}', tmp_path / 'results.jsonl'
+    _write_inputs(source)
+    monkeypatch.setattr(ml_predictor, 'MODEL_DIR', str(model_dir))
+    monkeypatch.setattr(sys, 'argv', ['ml_predictor.py', 'batch', 'predict_yield', str(source), str(output)])
+
+    ml_predictor.main()
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(results) == 3
+    assert results[1] == {'error': "Invalid temperature: 'hot'"}
+    assert [results[0], results[2]] == predictor.predict_yield_batch(SAMPLE_INPUTS[:2])
+    assert capsys.readouterr().out == ''
+
+
+def test_batch_command_writes_to_stdout(model_dir, tmp_path, monkeypatch, capsys):
+    source = tmp_path / 'rows.jsonl'
+    _write_inputs(source)
+    monkeypatch.setattr(ml_predictor, 'MODEL_DIR', str(model_dir))
+    monkeypatch.setattr(sys, 'argv', ['ml_predictor.py', 'batch', 'recommend_crops', str(source)])
+
+    ml_predictor.main()
+
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [sorted(result) for result in results] == [sorted(results[0]), ['error'], sorted(results[0])]
+    assert results[0]['recommendations']
+
+
+@pytest.mark.parametrize('value', [float('inf'), float('-inf'), 1e308])
+def test_out_of_range_numbers_fail_their_row_only(predictor, value):
+    rows = [SAMPLE_INPUTS[0], dict(SAMPLE_INPUTS[1], rainfall=value), SAMPLE_INPUTS[2]]
+    for command in ('predict_yield', 'recommend_crops'):
+        score = getattr(predictor, f'{command}_batch')
+        results = score(rows)
+        assert results[1] == {'error': f'Invalid rainfall: {value!r}'}
+        assert [results[0], results[2]] == score([SAMPLE_INPUTS[0], SAMPLE_INPUTS[2]])
+
+    # JSON overflow (1e400) parses to inf and the single-row call reports it
+    assert predictor.recommend_crops(json.loads('{"rainfall": 1e400}')) == {'error': 'Invalid rainfall: inf'}
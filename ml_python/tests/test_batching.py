@@ -0,0 +1,99 @@
+# Micro-batching: concurrent single rows merged into batch calls
+
+import io
+import json
+
+import pytest
+
+from ml_batching import MicroBatcher
+from ml_predictor import AgriSmartMLPredictor
+from ml_server import PredictionServer
+
+from conftest import SAMPLE_INPUTS
+
+
+@pytest.fixture
+def batcher(predictor):
+    batcher = MicroBatcher(lambda: predictor, max_batch_size=8, max_wait_ms=50, workers=1).start()
+    yield batcher
+    batcher.close()
+
+
+def test_rows_are_merged_and_answered_in_order(batcher, predictor):
+    rows = SAMPLE_INPUTS * 4
+    futures = [batcher.submit('predict_yield', row) for row in rows]
+    results = [future.result(timeout=30) for future in futures]
+
+    assert results == predictor.predict_yield_batch(rows)
+    stats = batcher.stats()
+    assert stats['rows'] == len(rows)
+    assert stats['batches'] < len(rows) and stats['largest_batch'] <= 8
+
+
+def test_commands_are_batched_separately(batcher, predictor):
+    yields = batcher.submit('predict_yield', SAMPLE_INPUTS[0])
+    crops = batcher.submit('recommend_crops', SAMPLE_INPUTS[0])
+    assert yields.result(timeout=30) == predictor.predict_yield_batch([SAMPLE_INPUTS[0]])[0]
+    assert crops.result(timeout=30) == predictor.recommend_crops_batch([SAMPLE_INPUTS[0]])[0]
+
+
+def test_invalid_submissions_are_rejected(batcher):
+    with pytest.raises(ValueError, match='not batched'):
+        batcher.submit('optimize_inputs', {})
+    with pytest.raises(ValueError, match='JSON object'):
+        batcher.submit('predict_yield', ['Rice'])
+
+
+def test_batch_failure_reaches_every_caller():
+    class Broken:
+        def predict_yield_batch(self, rows):
+            raise RuntimeError('model unavailable')
+
+    batcher = MicroBatcher(lambda: Broken(), max_wait_ms=20).start()
+    futures = [batcher.submit('predict_yield', row) for row in SAMPLE_INPUTS]
+    try:
+        for future in futures:
+            with pytest.raises(RuntimeError, match='model unavailable'):
+                future.result(timeout=30)
+    finally:
+        batcher.close()
+
+
+def test_bad_request_does_not_fail_its_batch():
+    calls = []
+
+    class Picky:
+        def predict_yield_batch(self, rows):
+            calls.append(len(rows))
+            if any('bad' in row for row in rows):
+                raise ValueError('bad row')
+            return [{'district': row['district']} for row in rows]
+
+    batcher = MicroBatcher(lambda: Picky(), max_batch_size=16, max_wait_ms=200).start()
+    rows = [dict(row, bad=True) if i == 2 else row for i, row in enumerate(SAMPLE_INPUTS)]
+    futures = [batcher.submit('predict_yield', row) for row in rows]
+    try:
+        with pytest.raises(ValueError, match='bad row'):
+            futures[2].result(timeout=30)
+        for i, (row, future) in enumerate(zip(rows, futures)):
+            if i != 2:
+                assert future.result(timeout=30) == {'district': row['district']}
+        # The merged call failed, then its rows ran alone
+        assert max(calls) > 1 and calls[-1] == 1
+    finally:
+        batcher.close()
+
+
+def test_server_answers_batched_requests_by_id(trained_model_dir, predictor):
+    server = PredictionServer(lambda: AgriSmartMLPredictor(model_path=str(trained_model_dir)),
+                              batching={'max_batch_size': 16, 'max_wait_ms': 20})
+    server.start()
+    requests = [{'id': i, 'command': 'predict_yield', 'data': data} for i, data in enumerate(SAMPLE_INPUTS)]
+    out = io.StringIO()
+    server.serve_stdio(io.StringIO(''.join(json.dumps(r) + '\n' for r in requests)), out)
+
+    by_id = {response['id']: response for response in map(json.loads, out.getvalue().splitlines())}
+    expected = predictor.predict_yield_batch(SAMPLE_INPUTS)
+    assert [by_id[i]['result'] for i in range(len(SAMPLE_INPUTS))] == expected
+    assert server.batcher.stats()['rows'] == len(SAMPLE_INPUTS)
+    assert server.in_flight == 0
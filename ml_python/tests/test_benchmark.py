@@ -0,0 +1,45 @@
+# Benchmark suite: one tiny scale end to end, and the baseline comparison
+
+import copy
+import json
+
+import pytest
+
+import ml_benchmark
+
+
+@pytest.fixture(scope='module')
+def report():
+    return ml_benchmark.run_benchmarks(scales=[300], commands=['predict_yield'], inference_modes=['sklearn'],
+                                       repeats=5)
+
+
+def test_report_has_every_metric(report, tmp_path):
+    train, infer = report['results']
+    assert (train['command'], train['scale']) == ('train_models', 300)
+    assert train['model_bytes'] > 0 and train['train_s'] > 0
+    assert (infer['command'], infer['inference']) == ('predict_yield', 'sklearn')
+    for key in ('cold_start_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'rows_per_s', 'peak_rss_mb'):
+        assert infer[key] > 0, key
+    assert infer['p50_ms'] <= infer['p95_ms'] <= infer['p99_ms']
+    assert report['settings']['scales'] == [300] and 'python' in report['environment']
+
+    # The report is plain JSON
+    path = tmp_path / 'report.json'
+    ml_benchmark.write_report(str(path), report)
+    assert json.loads(path.read_text())['results'] == report['results']
+
+
+def test_comparison_flags_only_regressions(report):
+    assert not any(c['regression'] for c in ml_benchmark.compare_with_baseline(report, report))
+
+    # A baseline that was twice as fast and half the size
+    baseline = copy.deepcopy(report)
+    for row in baseline['results']:
+        for metric, higher_is_better in ml_benchmark.COMPARED_METRICS.items():
+            if row.get(metric):
+                row[metric] = row[metric] * 2 if higher_is_better else row[metric] / 2
+    comparison = ml_benchmark.compare_with_baseline(report, baseline)
+    regressed = {(c['command'], c['metric']) for c in comparison if c['regression']}
+    assert ('train_models', 'model_bytes') in regressed
+    assert ('predict_yield', 'p50_ms') in regressed and ('predict_yield', 'rows_per_s') in regressed
@@ -0,0 +1,106 @@
+# Versioned bundles: integrity checks, atomic writes and pruning
+
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from ml_bundle import (CURRENT_POINTER, KEEP_BUNDLES, ModelBundleError, current_bundle_path, read_bundle,
+                       write_bundle)
+from ml_predictor import AgriSmartMLPredictor
+
+from conftest import SAMPLE_INPUTS
+
+
+def _artifact_path(model_dir, name='yield_model'):
+    return os.path.join(current_bundle_path(str(model_dir)), f'{name}.joblib')
+
+
+def _pointer(model_dir):
+    with open(os.path.join(model_dir, CURRENT_POINTER)) as f:
+        return f.read()
+
+
+def test_load_reads_the_active_bundle(model_dir):
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir))
+    assert predictor.load_models(verify=True)
+    assert _pointer(model_dir) == f'bundle-{predictor.bundle_version}'
+
+
+def test_no_bundle_is_not_an_error(tmp_path):
+    assert read_bundle(str(tmp_path), ['yield_model']) == (None, None)
+    assert not AgriSmartMLPredictor(model_path=str(tmp_path)).load_models()
+
+
+def test_checksum_mismatch_is_reported_when_verifying(model_dir):
+    path = _artifact_path(model_dir)
+    with open(path, 'r+b') as f:
+        f.seek(os.path.getsize(path) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(ModelBundleError, match='Checksum mismatch'):
+        AgriSmartMLPredictor(model_path=str(model_dir)).load_models(verify=True)
+
+
+def test_truncated_artifact_fails_every_load(model_dir):
+    path = _artifact_path(model_dir)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    with pytest.raises(ModelBundleError, match='Size mismatch'):
+        AgriSmartMLPredictor(model_path=str(model_dir)).load_models()
+
+
+def test_missing_artifact_is_reported(model_dir):
+    os.remove(_artifact_path(model_dir, 'scaler'))
+    with pytest.raises(ModelBundleError, match='Bundle file missing'):
+        AgriSmartMLPredictor(model_path=str(model_dir)).load_models()
+
+
+def test_corrupt_bundle_is_an_error_result_not_a_retrain(model_dir):
+    pointer = _pointer(model_dir)
+    os.remove(_artifact_path(model_dir))
+
+    result = AgriSmartMLPredictor(model_path=str(model_dir)).predict_yield({'crop': 'Rice'})
+    assert 'Bundle file missing' in result['error']
+    assert _pointer(model_dir) == pointer
+
+
+def test_failed_write_keeps_the_active_bundle(tmp_path):
+    version = write_bundle(str(tmp_path), {'values': np.arange(5)}, {})
+
+    with pytest.raises(Exception):
+        # Lambdas cannot be pickled, so the write fails part way through
+        write_bundle(str(tmp_path), {'values': np.arange(3), 'broken': lambda: None}, {})
+
+    assert _pointer(tmp_path) == f'bundle-{version}'
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-bundle-')]
+    artifacts, manifest = read_bundle(str(tmp_path), ['values'], verify=True)
+    np.testing.assert_array_equal(artifacts['values'], np.arange(5))
+    assert manifest['version'] == version
+
+
+def test_old_bundles_and_their_surfaces_are_pruned(tmp_path):
+    versions = []
+    for i in range(KEEP_BUNDLES + 2):
+        versions.append(write_bundle(str(tmp_path), {'values': np.arange(i + 1)}, {}))
+        os.makedirs(tmp_path / 'surfaces' / versions[-1])
+
+    # The last write prunes before its own surface exists
+    write_bundle(str(tmp_path), {'values': np.arange(1)}, {})
+    bundles = sorted(name for name in os.listdir(tmp_path) if name.startswith('bundle-'))
+    assert len(bundles) == KEEP_BUNDLES
+    assert _pointer(tmp_path) == bundles[-1]
+    surfaces = sorted(os.listdir(tmp_path / 'surfaces'))
+    assert surfaces == [name[len('bundle-'):] for name in bundles[:-1]]
+
+
+def test_bundled_scaler_takes_plain_arrays(predictor):
+    # Fitted on the bare matrix, so transform() on arrays has no feature names to check
+    assert not hasattr(predictor.scaler, 'feature_names_in_')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        predictor.predict_yield_batch(SAMPLE_INPUTS)
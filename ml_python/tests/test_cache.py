@@ -0,0 +1,91 @@
+# Prediction cache: hits on repeated conditions, invalidation when models change
+
+import numpy as np
+import pytest
+
+import ml_cache
+from ml_cache import PredictionCache
+from ml_predictor import AgriSmartMLPredictor
+
+from conftest import SAMPLE_INPUTS
+
+
+def test_repeated_conditions_hit_the_cache(predictor):
+    first = predictor.predict_yield(SAMPLE_INPUTS[0])
+    # Same conditions spelled differently share one entry
+    again = predictor.predict_yield(dict(SAMPLE_INPUTS[0], state=' punjab ', district='LUDHIANA'))
+
+    assert again == first
+    stats = predictor.cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+
+def test_cached_results_are_private_copies(predictor):
+    predictor.recommend_crops(SAMPLE_INPUTS[1])['recommendations'].clear()
+    assert predictor.recommend_crops(SAMPLE_INPUTS[1])['recommendations']
+    assert predictor.cache.stats()['hits'] == 1
+
+
+def test_update_invalidates_the_cache(model_dir):
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir))
+    predictor.predict_yield(SAMPLE_INPUTS[0])
+    version = predictor.bundle_version
+
+    new_rows = predictor.create_synthetic_training_data(n_samples=100, seed=3)
+    predictor.update_models(new_rows, n_new_trees=5)
+    assert predictor.bundle_version != version
+    assert predictor.cache.stats()['size'] == 0
+
+    result = predictor.predict_yield(SAMPLE_INPUTS[0])
+    assert result['model_info']['training_samples'] == 500
+    assert predictor.cache.stats()['hits'] == 0
+
+
+def test_reload_invalidates_the_cache(predictor):
+    predictor.predict_yield(SAMPLE_INPUTS[0])
+    invalidations = predictor.cache.stats()['invalidations']
+
+    assert predictor.load_models()
+    stats = predictor.cache.stats()
+    assert stats['size'] == 0 and stats['invalidations'] == invalidations + 1
+    predictor.predict_yield(SAMPLE_INPUTS[0])
+    assert predictor.cache.stats()['hits'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2, ttl=None)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ml_cache, 'monotonic', lambda: now[0])
+    cache = PredictionCache(max_size=10, ttl=5.0)
+    cache.put('a', 1)
+
+    now[0] += 4.9
+    assert cache.get('a') == 1
+    now[0] += 0.2
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_zero_size_disables_caching():
+    cache = PredictionCache(max_size=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None and not cache.enabled
+
+
+def test_quantization_snaps_features_to_the_grid():
+    steps = ml_cache.parse_quantization('temperature=0.5', ['state', 'temperature'])
+    cache = PredictionCache(steps=steps)
+    np.testing.assert_array_equal(cache.quantize(np.array([[3.0, 24.8]])), [[3.0, 25.0]])
+    with pytest.raises(ValueError, match='Unknown feature'):
+        ml_cache.parse_quantization('colour=1', ['state'])
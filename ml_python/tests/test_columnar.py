@@ -0,0 +1,167 @@
+# Columnar batch I/O: Arrow / Parquet / .npy files scored like the JSON batch API
+
+import os
+
+import numpy as np
+import pytest
+
+from ml_columnar import YIELD_RESULT_FIELDS, ColumnarWriter
+from ml_predictor import NUMERIC_INPUTS
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+ROWS = [
+    {'id': 1, 'crop': 'Rice', 'state': 'Punjab', 'district': 'Ludhiana', 'temperature': 25.0, 'rainfall': None},
+    {'id': 2, 'crop': 'Wheat', 'state': None, 'district': 'Lucknow', 'temperature': None, 'rainfall': 450.0},
+    {'id': 3, 'crop': None, 'state': 'Kerala', 'district': None, 'temperature': 30.0, 'rainfall': 1800.0},
+    {'id': 4, 'crop': 'Maize', 'state': 'Panjab', 'district': 'Ludhiana', 'temperature': 21.5, 'rainfall': 700.0},
+]
+
+
+def _write_arrow(path, table):
+    with pa.ipc.new_file(str(path), table.schema) as writer:
+        writer.write_table(table)
+
+
+def _expected_yield_columns(results):
+    """The batch API results flattened the way the columnar writer stores them"""
+    flat = []
+    for result in results:
+        uncertainty = result.get('uncertainty', {})
+        values = dict(result, std_dev=uncertainty.get('std_dev'), **uncertainty.get('quantiles', {}))
+        flat.append({field: values.get(field) for field in YIELD_RESULT_FIELDS + ['yield_category', 'error']})
+        flat[-1]['warnings'] = '; '.join(result['warnings']) if result.get('warnings') else None
+    return flat
+
+
+@pytest.mark.parametrize('suffix', ['.arrow', '.parquet'])
+def test_round_trip_with_keep_and_nulls(predictor, tmp_path, suffix):
+    table = pa.Table.from_pylist(ROWS)
+    source = tmp_path / 'in.arrow'
+    _write_arrow(source, table)
+    output = str(tmp_path / f'out{suffix}')
+
+    # 'state' is both a model input and a kept column; batches of 2 rows
+    summary = predictor.score_file('predict_yield', str(source), output, keep=['id', 'state', 'id'], batch_rows=2)
+    assert summary['rows'] == len(ROWS) and summary['errors'] == 0
+
+    result = pq.read_table(output) if suffix == '.parquet' else pa.ipc.open_file(output).read_all()
+    assert result.schema.names[:2] == ['id', 'state']
+    assert result.schema.metadata[b'command'] == b'predict_yield'
+    assert result.column('id').to_pylist() == [row['id'] for row in ROWS]
+    assert result.column('state').to_pylist() == [row['state'] for row in ROWS]
+
+    inputs = [{key: value for key, value in row.items() if key != 'id'} for row in ROWS]
+    expected = _expected_yield_columns(predictor.predict_yield_batch(inputs))
+    assert result.drop_columns(['id', 'state']).to_pylist() == expected
+    assert expected[3]['warnings'].startswith("Unknown state 'Panjab'")
+    assert not [name for name in os.listdir(tmp_path) if '.tmp-' in name]
+
+
+def test_recommendations_round_trip(predictor, tmp_path):
+    table = pa.Table.from_pylist(ROWS)
+    source = tmp_path / 'in.parquet'
+    pq.write_table(table, str(source))
+    output = str(tmp_path / 'out.arrow')
+
+    predictor.score_file('recommend_crops', str(source), output, keep=['id'])
+    result = pa.ipc.open_file(output).read_all().to_pylist()
+    expected = predictor.recommend_crops_batch([{k: v for k, v in row.items() if k != 'id'} for row in ROWS])
+
+    assert [row['id'] for row in result] == [row['id'] for row in ROWS]
+    for row, batch_result in zip(result, expected):
+        assert row['top_crop'] == batch_result['recommendations'][0]['crop']
+        assert [r['crop'] for r in row['recommendations']] == [r['crop'] for r in batch_result['recommendations']]
+
+
+def test_npy_round_trip_keeps_structured_fields(predictor, tmp_path):
+    source = np.zeros(len(ROWS), dtype=[('field_id', 'U16'), ('crop', 'U16'), ('state', 'U16'),
+                                        ('district', 'U16'), ('temperature', 'f8')])
+    source['field_id'] = [f'field-{row["id"]:04d}-long' for row in ROWS]
+    source['crop'] = [row['crop'] or 'Rice' for row in ROWS]
+    source['state'] = [row['state'] or 'Punjab' for row in ROWS]
+    source['district'] = [row['district'] or 'Ludhiana' for row in ROWS]
+    source['temperature'] = [np.nan if row['temperature'] is None else row['temperature'] for row in ROWS]
+    np.save(tmp_path / 'in.npy', source)
+    output = str(tmp_path / 'out.npy')
+
+    predictor.score_file('predict_yield', str(tmp_path / 'in.npy'), output, keep=['field_id'], batch_rows=2)
+    result = np.load(output)
+    assert result['field_id'].tolist() == source['field_id'].tolist()
+    assert result['valid'].all()
+
+    expected = predictor.predict_yield_batch([
+        {'crop': r['crop'], 'state': r['state'], 'district': r['district'],
+         'temperature': None if np.isnan(r['temperature']) else float(r['temperature'])}
+        for r in source
+    ])
+    np.testing.assert_array_equal(result['predicted_yield'], [r['predicted_yield'] for r in expected])
+
+
+def test_npy_matrix_columns_follow_the_numeric_inputs(predictor, tmp_path):
+    rng = np.random.default_rng(0)
+    matrix = np.column_stack([rng.uniform(low, high, 6) for low, high in
+                              [(15, 35), (40, 90), (300, 1500), (5.5, 8), (40, 200), (20, 100), (30, 150)]])
+    np.save(tmp_path / 'in.npy', matrix)
+    # Column-major files are converted rather than viewed
+    np.save(tmp_path / 'in-f.npy', np.asfortranarray(matrix))
+
+    # Without labels every row is scored at the default location
+    expected = predictor.predict_yield_batch([dict(zip(NUMERIC_INPUTS, map(float, row))) for row in matrix])
+    assert predictor.predict_yield_batch(str(tmp_path / 'in.npy')) == expected
+    for name in ('in.npy', 'in-f.npy'):
+        output = str(tmp_path / f'out-{name}')
+        predictor.score_file('predict_yield', str(tmp_path / name), output, keep=['ph'], batch_rows=4)
+        result = np.load(output)
+        np.testing.assert_array_equal(result['ph'], matrix[:, 3])
+        np.testing.assert_array_equal(result['predicted_yield'], [r['predicted_yield'] for r in expected])
+
+
+def test_npy_matrix_columns_can_be_named(predictor, tmp_path):
+    matrix = np.array([[30.0, 450.0], [18.0, 1400.0]])
+    np.save(tmp_path / 'in.npy', matrix)
+    output = str(tmp_path / 'out.npy')
+
+    predictor.score_file('predict_yield', str(tmp_path / 'in.npy'), output,
+                         matrix_columns=['temperature', 'rainfall'])
+    expected = predictor.predict_yield_batch([{'temperature': 30.0, 'rainfall': 450.0},
+                                              {'temperature': 18.0, 'rainfall': 1400.0}])
+    np.testing.assert_array_equal(np.load(output)['predicted_yield'], [r['predicted_yield'] for r in expected])
+
+    with pytest.raises(ValueError, match='has 2 columns; expected 3'):
+        predictor.score_file('predict_yield', str(tmp_path / 'in.npy'), output,
+                             matrix_columns=['temperature', 'rainfall', 'ph'])
+    np.save(tmp_path / 'labels.npy', np.array([['Punjab', 'Ludhiana']]))
+    with pytest.raises(ValueError, match='2-D numeric matrix'):
+        predictor.predict_yield_batch(str(tmp_path / 'labels.npy'))
+
+
+@pytest.mark.parametrize('keep, message', [(['state'], 'numeric pass-through columns only'),
+                                           (['code'], 'has nulls')])
+def test_npy_output_rejects_columns_it_cannot_hold(predictor, tmp_path, keep, message):
+    table = pa.Table.from_pylist(ROWS).append_column('code', pa.array([1, None, 3, 4], type=pa.int64()))
+    source = tmp_path / 'in.arrow'
+    _write_arrow(source, table)
+    output = tmp_path / 'out.npy'
+    output.write_bytes(b'previous results')
+
+    with pytest.raises(ValueError, match=message):
+        predictor.score_file('predict_yield', str(source), str(output), keep=keep)
+    assert output.read_bytes() == b'previous results'
+    assert sorted(os.listdir(tmp_path)) == ['in.arrow', 'out.npy']
+
+
+@pytest.mark.parametrize('suffix', ['.arrow', '.parquet', '.npy'])
+def test_failed_job_leaves_no_partial_output(tmp_path, suffix):
+    path = str(tmp_path / f'out{suffix}')
+    result = {'predicted_yield': 1000.0, 'confidence': 80.0}
+    with pytest.raises(KeyError):
+        with ColumnarWriter(path, 'predict_yield', rows=4) as writer:
+            writer.write([result, result])
+            raise KeyError('scoring failed')
+    assert os.listdir(tmp_path) == []
+
+    with ColumnarWriter(path, 'predict_yield', rows=0):
+        pass
+    assert os.listdir(tmp_path) == [f'out{suffix}']
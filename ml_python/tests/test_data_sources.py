@@ -0,0 +1,111 @@
+# Historical training data: SQLite extraction, cleaning and snapshot reuse
+
+import sqlite3
+
+import pytest
+
+from ml_data_sources import load_historical_data, snapshot_info, sqlite_source
+from ml_predictor import DEFAULT_INPUTS
+
+# historical_crop_data as in database/setup_mysql.sql, in SQLite types
+HISTORICAL_DDL = '''
+CREATE TABLE historical_crop_data (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  dist_code INT, crop_year INT, state_code INT,
+  state_name VARCHAR(64), district_name VARCHAR(64), crop VARCHAR(64),
+  area_hectares FLOAT, yield_kg_per_ha FLOAT, production_tonnes FLOAT,
+  temperature_c FLOAT, humidity_percent FLOAT, rainfall_mm FLOAT, ph FLOAT,
+  n_fertilizer FLOAT, p_fertilizer FLOAT, k_fertilizer FLOAT,
+  wind_speed FLOAT, solar_radiation FLOAT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+COLUMNS = ('crop_year', 'state_name', 'district_name', 'crop', 'yield_kg_per_ha', 'temperature_c',
+           'humidity_percent', 'rainfall_mm', 'ph', 'n_fertilizer', 'p_fertilizer', 'k_fertilizer', 'wind_speed')
+
+ROWS = [
+    (2019, 'Punjab', 'Ludhiana', 'Wheat', 4500.0, 18.0, 60.0, 650.0, 7.1, 130.0, 55.0, 40.0, 3.0),
+    (2020, ' Kerala ', 'Kochi', 'Rice', 2900.0, None, 85.0, None, 5.8, None, 30.0, 45.0, 2.0),
+    (2020, 'Punjab', 'Amritsar', None, 4100.0, 19.0, 58.0, 600.0, 7.0, 120.0, 50.0, 35.0, 3.5),
+    (2021, 'Punjab', 'Amritsar', 'Rice', None, 30.0, 70.0, 900.0, 6.9, 110.0, 45.0, 30.0, 3.1),
+]
+
+
+def _insert(db, rows):
+    connection = sqlite3.connect(db)
+    connection.executemany(
+        f"INSERT INTO historical_crop_data ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+    )
+    connection.commit()
+    connection.close()
+
+
+def _database(path, rows=ROWS):
+    connection = sqlite3.connect(path)
+    connection.execute(HISTORICAL_DDL)
+    connection.close()
+    _insert(str(path), rows)
+    return str(path)
+
+
+class CountingConnect:
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return sqlite3.connect(self.path)
+
+
+@pytest.mark.parametrize('extension', ['parquet', 'npz'])
+def test_rows_are_mapped_cleaned_and_defaulted(tmp_path, extension):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    db = _database(tmp_path / 'history.db')
+    df = load_historical_data(CountingConnect(db), DEFAULT_INPUTS, snapshot_path=str(tmp_path / f'snap.{extension}'),
+                              source=sqlite_source(db))
+
+    # Rows without a crop or a yield are dropped; the rest keep table order
+    assert list(df['crop']) == ['Wheat', 'Rice']
+    assert list(df['state']) == ['Punjab', 'Kerala']
+    assert list(df['district']) == ['Ludhiana', 'Kochi']
+    assert list(df['year']) == [2019, 2020]
+    wheat, rice = df.iloc[0], df.iloc[1]
+    assert (wheat['temperature'], wheat['rainfall'], wheat['nitrogen'], wheat['yield_kg_ha']) == \
+        (18.0, 650.0, 130.0, 4500.0)
+    assert (rice['humidity'], rice['ph'], rice['phosphorus'], rice['potassium']) == (85.0, 5.8, 30.0, 45.0)
+    # Missing readings take the prediction defaults
+    assert (rice['temperature'], rice['rainfall'], rice['nitrogen']) == \
+        (DEFAULT_INPUTS['temperature'], DEFAULT_INPUTS['rainfall'], DEFAULT_INPUTS['nitrogen'])
+    assert 'wind_speed' not in df.columns
+
+
+def test_snapshot_is_reused_until_refreshed(tmp_path):
+    db = _database(tmp_path / 'history.db')
+    snapshot = str(tmp_path / 'snap.npz')
+    connect = CountingConnect(db)
+    load_historical_data(connect, DEFAULT_INPUTS, snapshot_path=snapshot, source=sqlite_source(db))
+
+    # New rows in the database are not seen while the snapshot is reused
+    _insert(db, ROWS[:1])
+    assert len(load_historical_data(connect, DEFAULT_INPUTS, snapshot_path=snapshot, source=sqlite_source(db))) == 2
+    assert connect.calls == 1
+
+    assert len(load_historical_data(connect, DEFAULT_INPUTS, snapshot_path=snapshot, source=sqlite_source(db),
+                                    refresh=True)) == 3
+    assert connect.calls == 2
+    assert snapshot_info(snapshot)['rows'] == 3
+
+
+def test_snapshot_from_another_source_is_re_extracted(tmp_path):
+    first = _database(tmp_path / 'first.db')
+    second = _database(tmp_path / 'second.db', ROWS[:1])
+    snapshot = str(tmp_path / 'snap.npz')
+    load_historical_data(CountingConnect(first), DEFAULT_INPUTS, snapshot_path=snapshot, source=sqlite_source(first))
+
+    connect = CountingConnect(second)
+    df = load_historical_data(connect, DEFAULT_INPUTS, snapshot_path=snapshot, source=sqlite_source(second))
+    assert connect.calls == 1 and len(df) == 1
+    assert snapshot_info(snapshot)['source'] == sqlite_source(second)
@@ -0,0 +1,96 @@
+# Drift monitoring: PSI / KS of live inputs against the training sketch
+
+import numpy as np
+import pytest
+
+from ml_drift import MIN_REPORT_ROWS, DriftMonitor, FeatureSketch
+
+COLUMNS = ['state', 'temperature', 'rainfall']
+
+
+def _rows(n, seed, temperature_shift=0.0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(0, 4, n), rng.normal(25 + temperature_shift, 3, n),
+                            rng.normal(800, 100, n)])
+
+
+@pytest.fixture(scope='module')
+def sketch():
+    return FeatureSketch.from_training(_rows(20000, seed=0), COLUMNS, categories={0: 4})
+
+
+def test_sketch_summarizes_the_training_data(sketch):
+    summary = sketch.describe()
+    assert summary['rows'] == 20000
+    assert summary['features']['state'] == {'categories': 4}
+    assert summary['features']['temperature']['quantiles']['p50'] == pytest.approx(25, abs=0.2)
+
+
+def test_same_distribution_is_stable(sketch):
+    monitor = DriftMonitor(sketch, half_life=0)
+    monitor.update(_rows(5000, seed=1))
+    report = monitor.report()
+
+    assert report['rows_seen'] == 5000
+    assert not report['retrain_recommended']
+    assert {entry['status'] for entry in report['features'].values()} == {'stable'}
+
+
+def test_shifted_feature_is_flagged(sketch):
+    monitor = DriftMonitor(sketch, half_life=0)
+    monitor.update(_rows(5000, seed=1, temperature_shift=6.0))
+    report = monitor.report()
+
+    temperature = report['features']['temperature']
+    assert temperature['status'] == 'significant'
+    assert temperature['psi'] > 1.0 and temperature['ks'] > 0.6
+    assert temperature['above_training_share'] > 0.01
+    assert report['features']['rainfall']['status'] == 'stable'
+    assert report['drifted_features'] == ['temperature'] and report['retrain_recommended']
+
+
+def test_unknown_categories_are_counted(sketch):
+    monitor = DriftMonitor(sketch, half_life=0)
+    rows = _rows(1000, seed=2)
+    rows[:250, 0] = -1
+    monitor.update(rows)
+    assert monitor.report()['features']['state']['unknown_share'] == 0.25
+
+
+def test_few_rows_are_not_reported_as_drift(sketch):
+    monitor = DriftMonitor(sketch, half_life=0)
+    monitor.update(_rows(MIN_REPORT_ROWS - 1, seed=3, temperature_shift=10.0))
+    report = monitor.report()
+    assert report['features']['temperature']['status'] == 'insufficient_data'
+    assert not report['retrain_recommended']
+
+
+def test_recent_traffic_outweighs_old(sketch):
+    monitor = DriftMonitor(sketch, half_life=500)
+    monitor.update(_rows(5000, seed=4, temperature_shift=6.0))
+    for seed in range(5, 15):
+        monitor.update(_rows(500, seed=seed))
+    assert monitor.report()['features']['temperature']['status'] == 'stable'
+
+
+def test_counts_resume_only_for_the_same_bundle(sketch, tmp_path):
+    path = str(tmp_path / 'drift.npz')
+    monitor = DriftMonitor(sketch, key='v1')
+    monitor.update(_rows(300, seed=6))
+    monitor.save(path)
+
+    resumed = DriftMonitor(sketch, key='v1')
+    assert resumed.load(path)
+    assert resumed.rows_seen == 300
+    np.testing.assert_array_equal(resumed.counts, monitor.counts)
+    assert not DriftMonitor(sketch, key='v2').load(path)
+
+
+def test_predictor_reports_drift_of_shifted_inputs(predictor):
+    rows = predictor.create_synthetic_training_data(n_samples=1000, seed=5).drop(columns='yield_kg_ha')
+    baseline = predictor.drift_report(rows)
+    assert baseline['bundle_version'] == predictor.bundle_version
+    assert baseline['features']['temperature']['status'] != 'significant'
+
+    shifted = predictor.drift_report(rows.assign(temperature=rows['temperature'] + 15))
+    assert 'temperature' in shifted['drifted_features']
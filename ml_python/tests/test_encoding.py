@@ -0,0 +1,93 @@
+# Encoding index: O(1) lookups and the unknown-category policies
+
+import pickle
+
+import numpy as np
+import pytest
+
+from ml_encoding import LOWEST_CODE, CategoryIndex, EncodingIndex
+from ml_predictor import AgriSmartMLPredictor
+
+
+@pytest.fixture
+def index():
+    return EncodingIndex(
+        CategoryIndex(['Kerala', 'Punjab', 'Tamil Nadu']),
+        CategoryIndex(['Amritsar', 'Chennai', 'Kochi', 'Ludhiana']),
+        CategoryIndex(['Rice', 'Wheat']),
+        state_districts={'Kerala': 'Kochi', 'Punjab': 'Ludhiana', 'Tamil Nadu': 'Chennai'},
+        default_state='Punjab', default_district='Ludhiana'
+    )
+
+
+def test_labels_match_case_and_spacing_insensitively(index):
+    codes, known = index.state.encode(['Punjab', ' punjab ', 'TAMIL  NADU', 'Atlantis'])
+    np.testing.assert_array_equal(codes, [1, 1, 2, -1])
+    np.testing.assert_array_equal(known, [True, True, True, False])
+    assert index.state.decode([0, 2]).tolist() == ['Kerala', 'Tamil Nadu']
+
+
+def test_error_policy_rejects_unknown_rows(index):
+    _, _, errors, notes = index.encode_locations(['Punjab', 'Atlantis', 'Kerala'],
+                                                 ['Ludhiana', 'Ludhiana', 'Nowhere'], policy='error')
+    assert errors == {1: 'Unknown state: Atlantis', 2: 'Unknown district: Nowhere'}
+    assert notes == {}
+
+
+def test_state_default_uses_the_states_main_district(index):
+    states, districts, errors, notes = index.encode_locations(['Kerala'], ['Nowhere'], policy='state_default')
+    assert not errors
+    assert (states[0], districts[0]) == (0, index.district.code('Kochi'))
+    assert notes == {0: ["Unknown district 'Nowhere', using 'Kochi'"]}
+
+
+def test_nearest_corrects_misspellings_and_falls_back_to_defaults(index):
+    states, districts, errors, notes = index.encode_locations(['Panjab', 'Atlantis'], ['Ludhyana', 'Xyz'],
+                                                              policy='nearest')
+    assert not errors
+    assert states.tolist() == [1, index.state.code('Punjab')]
+    assert districts.tolist() == [index.district.code('Ludhiana')] * 2
+    assert notes[0] == ["Unknown state 'Panjab', using 'Punjab'", "Unknown district 'Ludhyana', using 'Ludhiana'"]
+
+
+def test_lowest_code_policy(index):
+    states, districts, errors, notes = index.encode_locations(['Atlantis'], ['Kochi'], policy='lowest_code')
+    assert not errors
+    assert (states[0], districts[0]) == (LOWEST_CODE, index.district.code('Kochi'))
+    assert notes == {0: ["Unknown state 'Atlantis', using the lowest state code ('Kerala')"]}
+
+
+def test_unknown_policy_name_is_rejected(index, trained_model_dir):
+    with pytest.raises(ValueError, match='Unknown category policy'):
+        index.encode_locations(['Punjab'], ['Ludhiana'], policy='guess')
+    with pytest.raises(ValueError, match='Unknown category policy'):
+        AgriSmartMLPredictor(model_path=str(trained_model_dir), unknown_category='guess')
+
+
+def test_index_survives_pickling(index):
+    restored = pickle.loads(pickle.dumps(index))
+    assert restored.state.code(' kerala') == 0
+    assert restored.encode_locations(['Panjab'], ['Amritsar'])[0].tolist() == [1]
+
+
+@pytest.mark.parametrize('policy', ['error', 'state_default', 'nearest', 'lowest_code'])
+def test_predictor_applies_the_policy(trained_model_dir, policy):
+    predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir), unknown_category=policy)
+    result = predictor.predict_yield({'crop': 'Rice', 'state': 'Atlantis', 'district': 'Ludhiana'})
+
+    if policy == 'error':
+        assert result == {'error': 'Unknown state: Atlantis'}
+    else:
+        assert result['predicted_yield'] > 0
+        assert result['warnings'][0].startswith("Unknown state 'Atlantis'")
+
+
+def test_lowest_code_scores_like_the_first_known_label(trained_model_dir):
+    predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir), unknown_category='lowest_code')
+    predictor.ensure_models()
+    first = predictor.encoding.state.classes_[0]
+    unknown = predictor.predict_yield({'crop': 'Rice', 'state': 'Atlantis', 'district': 'Ludhiana'})
+    known = predictor.predict_yield({'crop': 'Rice', 'state': first, 'district': 'Ludhiana'})
+
+    assert unknown.pop('warnings') == [f"Unknown state 'Atlantis', using the lowest state code ('{first}')"]
+    assert unknown == known
@@ -0,0 +1,85 @@
+# Compiled forests against the sklearn models they were compiled from
+
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from ml_forest_compiler import COMPACT_EVERY, TOP_LEVELS, compile_forest, verify_compiled
+from ml_predictor import AgriSmartMLPredictor
+
+from conftest import SAMPLE_INPUTS
+
+
+def _training_data(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    features = rng.normal(size=(n, 4)) * [1, 10, 100, 0.5] + [0, 50, 800, 6.5]
+    # Half the rows sit on rounded values, so many land exactly on split thresholds
+    features[::2] = np.round(features[::2], 1)
+    target = features[:, 0] * 3 + np.sin(features[:, 1]) + rng.normal(size=n)
+    return features, target
+
+
+@pytest.fixture(scope='module')
+def scaled_regressor():
+    features, target = _training_data()
+    scaler = StandardScaler().fit(features)
+    model = RandomForestRegressor(n_estimators=8, random_state=0).fit(scaler.transform(features), target)
+    return model, scaler, features
+
+
+def test_regressor_matches_sklearn_with_folded_scaler(scaled_regressor):
+    model, scaler, features = scaled_regressor
+    compiled = compile_forest(model, mean=scaler.mean_, scale=scaler.scale_)
+    # Deep enough to run the top-level layout and at least one compaction
+    assert compiled.max_depth > TOP_LEVELS + COMPACT_EVERY
+
+    expected = model.predict(scaler.transform(features))
+    np.testing.assert_allclose(compiled.predict(features), expected, rtol=1e-12)
+
+
+def test_regressor_leaf_paths_match_sklearn(scaled_regressor):
+    model, scaler, features = scaled_regressor
+    compiled = compile_forest(model, mean=scaler.mean_, scale=scaler.scale_)
+    per_tree = np.column_stack([tree.predict(scaler.transform(features)) for tree in model.estimators_])
+    np.testing.assert_array_equal(compiled.tree_predictions(features), per_tree)
+
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_classifier_matches_sklearn(compact):
+    features, target = _training_data(seed=1)
+    labels = np.digitize(target, [-2.0, 0.0, 2.0])
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(features, labels)
+    compiled = compile_forest(model, compact=compact)
+
+    assert compiled.values.dtype == (np.float32 if compact else np.float64)
+    np.testing.assert_array_equal(compiled.classes_, model.classes_)
+    np.testing.assert_allclose(compiled.predict_proba(features), model.predict_proba(features),
+                               atol=1e-6 if compact else 1e-12)
+    report = verify_compiled(compiled, model, features, lambda x: x)
+    assert report['ok'] and report['argmax_agreement'] == 1.0
+
+
+def test_pickled_forest_predicts_the_same(scaled_regressor):
+    model, scaler, features = scaled_regressor
+    compiled = compile_forest(model, mean=scaler.mean_, scale=scaler.scale_)
+    expected = compiled.predict(features[:100])
+    restored = pickle.loads(pickle.dumps(compiled))
+    assert '_top' not in restored.__dict__
+    np.testing.assert_array_equal(restored.predict(features[:100]), expected)
+
+
+def test_compiled_predictor_matches_sklearn(trained_model_dir):
+    sklearn_predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir), inference='sklearn')
+    compiled_predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir), inference='compiled')
+
+    rng = np.random.default_rng(2)
+    inputs = [dict(row, temperature=float(t), rainfall=float(r))
+              for row in SAMPLE_INPUTS
+              for t, r in zip(rng.uniform(10, 40, 20).round(1), rng.uniform(200, 2500, 20).round())]
+
+    assert compiled_predictor.predict_yield_batch(inputs) == sklearn_predictor.predict_yield_batch(inputs)
+    assert compiled_predictor.recommend_crops_batch(inputs) == sklearn_predictor.recommend_crops_batch(inputs)
+    assert set(compiled_predictor.compiled_models) == {'yield_model', 'crop_yield_model', 'recommendation_model'}
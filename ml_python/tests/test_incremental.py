@@ -0,0 +1,114 @@
+# Incremental updates: extended encoders, grown forests and re-scaled splits
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from ml_incremental import extend_encoder, grow_forest, remap_thresholds
+from ml_predictor import AgriSmartMLPredictor
+
+
+def _new_rows(predictor, n=120, seed=3):
+    df = predictor.create_synthetic_training_data(n_samples=n, seed=seed)
+    df[['state', 'district', 'crop']] = df[['state', 'district', 'crop']].astype(str)
+    df.loc[df.index[:10], ['state', 'district', 'crop']] = ['Atlantis', 'Nowhere', 'Quinoa']
+    return df
+
+
+def _per_tree(model, X):
+    return np.array([tree.predict(X) for tree in model.estimators_])
+
+
+def test_extend_encoder_keeps_existing_codes():
+    encoder = LabelEncoder().fit(['Rice', 'Wheat', 'Maize'])
+    codes = encoder.transform(['Maize', 'Rice', 'Wheat'])
+
+    assert extend_encoder(encoder, ['Wheat', 'Barley', 'Quinoa', 'Barley']) == ['Barley', 'Quinoa']
+    np.testing.assert_array_equal(encoder.transform(['Maize', 'Rice', 'Wheat']), codes)
+    np.testing.assert_array_equal(encoder.transform(['Barley', 'Quinoa']), [3, 4])
+    assert extend_encoder(encoder, ['Rice']) == []
+
+
+def test_grow_forest_appends_and_caps_trees():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(200, 3)), rng.normal(size=200)
+    model = RandomForestRegressor(n_estimators=6, max_depth=4, random_state=0).fit(X, y)
+    original = list(model.estimators_)
+
+    grow_forest(model, X, y, n_new_trees=3, random_state=1)
+    assert model.n_estimators == len(model.estimators_) == 9
+    assert all(a is b for a, b in zip(model.estimators_, original))
+
+    # The oldest trees are retired first
+    grown = list(model.estimators_)
+    grow_forest(model, X, y, n_new_trees=3, max_trees=7, random_state=2)
+    assert model.n_estimators == len(model.estimators_) == 7
+    assert all(a is b for a, b in zip(model.estimators_, grown[5:]))
+
+
+def test_remap_thresholds_follows_the_new_scaling():
+    rng = np.random.default_rng(1)
+    X_raw = rng.normal(loc=[20, 800, 6.5], scale=[5, 200, 0.5], size=(400, 3))
+    y = X_raw @ [3.0, 0.5, 100.0] + rng.normal(size=400)
+    old = StandardScaler().fit(X_raw[:200])
+    new = StandardScaler().fit(X_raw)
+    model = RandomForestRegressor(n_estimators=5, max_depth=6, random_state=0).fit(old.transform(X_raw), y)
+    expected = model.predict(old.transform(X_raw))
+
+    remap_thresholds(model, old.mean_, old.scale_, new.mean_, new.scale_)
+    np.testing.assert_allclose(model.predict(new.transform(X_raw)), expected)
+
+
+def test_update_extends_encoders_and_grows_every_forest(model_dir):
+    before = AgriSmartMLPredictor(model_path=str(model_dir))
+    before.ensure_models()
+    classes = {name: list(getattr(before, name).classes_)
+               for name in ('crop_encoder', 'state_encoder', 'district_encoder')}
+    n_trees = {name: len(getattr(before, name).estimators_)
+               for name in ('yield_model', 'crop_yield_model', 'recommendation_model')}
+
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir))
+    added = predictor.update_models(_new_rows(predictor), n_new_trees=5)
+
+    assert added == {'crop': ['Quinoa'], 'state': ['Atlantis'], 'district': ['Nowhere']}
+    for name, labels in classes.items():
+        assert list(getattr(predictor, name).classes_[:len(labels)]) == labels
+    for name, count in n_trees.items():
+        assert len(getattr(predictor, name).estimators_) == count + 5
+    assert predictor.training_stats['n_trees'] == {name: count + 5 for name, count in n_trees.items()}
+
+    # The new labels are usable right away
+    result = predictor.predict_yield({'state': 'Atlantis', 'district': 'Nowhere'})
+    assert result['predicted_yield'] > 0
+
+    # Capped: the oldest trees are retired
+    predictor.update_models(_new_rows(predictor, seed=4), n_new_trees=5, max_trees=n_trees['yield_model'])
+    assert len(predictor.yield_model.estimators_) == n_trees['yield_model']
+
+
+def test_existing_trees_are_unchanged_without_rescale(model_dir):
+    before = AgriSmartMLPredictor(model_path=str(model_dir))
+    before.ensure_models()
+    old_rows = before.create_synthetic_training_data(n_samples=200, seed=1)
+    X = before.scaler.transform(np.column_stack([
+        before.state_encoder.transform(old_rows['state']),
+        before.district_encoder.transform(old_rows['district'])
+    ] + [old_rows[column].to_numpy(dtype=float) for column in
+         ('temperature', 'humidity', 'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium')]))
+    n_old = len(before.yield_model.estimators_)
+    expected = _per_tree(before.yield_model, X)
+
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir))
+    predictor.update_models(_new_rows(predictor), n_new_trees=5, rescale=False)
+
+    np.testing.assert_array_equal(predictor.scaler.mean_, before.scaler.mean_)
+    np.testing.assert_array_equal(_per_tree(predictor.yield_model, X)[:n_old], expected)
+
+
+def test_boosted_bundles_are_rejected(tmp_path):
+    predictor = AgriSmartMLPredictor(model_path=str(tmp_path))
+    predictor.train_models(n_samples=1000, seed=2, backend='hist_gradient_boosting')
+
+    with pytest.raises(ValueError, match='random_forest'):
+        predictor.update_models(_new_rows(predictor), n_new_trees=5)
@@ -0,0 +1,76 @@
+# Stage metrics: snapshot, Prometheus histograms and side-channel export
+
+import os
+import re
+
+import ml_metrics
+from ml_metrics import STAGE_BUCKETS, Metrics
+from ml_predictor import AgriSmartMLPredictor
+
+from conftest import SAMPLE_INPUTS
+
+
+def _predict(trained_model_dir, metrics):
+    predictor = AgriSmartMLPredictor(model_path=str(trained_model_dir), metrics=metrics, cache_size=0)
+    predictor.predict_yield(SAMPLE_INPUTS[0])
+    predictor.recommend_crops(SAMPLE_INPUTS[1])
+    return predictor
+
+
+def test_stage_counts_appear_in_the_snapshot(trained_model_dir):
+    metrics = Metrics(enabled=True)
+    _predict(trained_model_dir, metrics)
+
+    stages = metrics.snapshot()['stages']
+    assert stages['load']['count'] == 1
+    assert stages['forest']['count'] >= 1 and stages['classifier']['count'] == 1
+    assert all(stage['total_ms'] >= stage['max_ms'] >= 0 for stage in stages.values())
+    assert 'import_seconds' in metrics.snapshot()['gauges']
+
+
+def test_prometheus_buckets_are_cumulative(trained_model_dir):
+    metrics = Metrics(enabled=True, fmt='prometheus')
+    _predict(trained_model_dir, metrics)
+    text = metrics.render_prometheus()
+
+    for stage, record in metrics.snapshot()['stages'].items():
+        buckets = re.findall(rf'agrismart_stage_seconds_bucket{{stage="{re.escape(stage)}",le="([^"]+)"}} (\d+)', text)
+        assert [le for le, _ in buckets] == [str(bound) for bound in STAGE_BUCKETS] + ['+Inf']
+        counts = [int(n) for _, n in buckets]
+        assert counts == sorted(counts)
+        assert counts[-1] == record['count']
+        assert f'agrismart_stage_seconds_count{{stage="{stage}"}} {record["count"]}' in text
+
+
+def test_export_replaces_the_metrics_file(trained_model_dir, tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'agrismart.prom'
+    path.write_text('stale\n')
+    monkeypatch.setenv('AGRISMART_METRICS', 'prometheus')
+    monkeypatch.setenv('AGRISMART_METRICS_FILE', str(path))
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(ml_metrics.os, 'replace', lambda src, dst: (replaced.append((src, dst)),
+                                                                    real_replace(src, dst)))
+
+    predictor = _predict(trained_model_dir, Metrics.from_env())
+    predictor.export_metrics()
+
+    # Written next to the target, then renamed over it in one step
+    [(src, dst)] = replaced
+    assert dst == str(path) and os.path.dirname(src) == str(tmp_path)
+    assert os.listdir(tmp_path) == ['agrismart.prom']
+    text = path.read_text()
+    assert 'stale' not in text and 'le="+Inf"' in text
+    assert capsys.readouterr().out == ''
+
+
+def test_disabled_metrics_stay_silent(trained_model_dir, tmp_path, capsys):
+    metrics = Metrics(enabled=False, path=str(tmp_path / 'metrics.json'))
+    predictor = _predict(trained_model_dir, metrics)
+    capsys.readouterr()
+    predictor.export_metrics()
+
+    captured = capsys.readouterr()
+    assert (captured.out, captured.err) == ('', '')
+    assert metrics.snapshot() == {'stages': {}, 'counters': {}, 'gauges': {}}
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,67 @@
+# Input optimization: grid optimum, coarse-to-fine refinement and range parsing
+
+import numpy as np
+import pytest
+
+from ml_optimize import DEFAULT_INPUT_RANGES, candidate_grid, parse_ranges, search
+
+from conftest import SAMPLE_INPUTS
+
+NAMES = list(DEFAULT_INPUT_RANGES)
+
+
+def test_grid_optimum_is_the_batch_argmax(predictor):
+    # Without a crop the optimizer scores the same yield model as predict_yield
+    site = {key: value for key, value in SAMPLE_INPUTS[1].items() if key != 'crop'}
+    result = predictor.optimize_inputs(site, method='grid', points=4)
+
+    lows, highs = np.array(list(DEFAULT_INPUT_RANGES.values())).T
+    candidates = candidate_grid(lows, highs, 4)
+    batch = predictor.predict_yield_batch([dict(site, **dict(zip(NAMES, row))) for row in candidates])
+    yields = np.array([entry['predicted_yield'] for entry in batch])
+
+    assert result['candidates_evaluated'] == len(candidates)
+    assert result['optimum']['predicted_yield'] == yields.max()
+    best = [{name: round(float(v), 1) for name, v in zip(NAMES, row)} for row in candidates[yields == yields.max()]]
+    assert result['optimum']['inputs'] in best
+
+
+def test_refine_is_never_worse_than_its_coarse_grid(predictor):
+    for site in SAMPLE_INPUTS:
+        coarse = predictor.optimize_inputs(site, method='grid', points=5)
+        refined = predictor.optimize_inputs(site, method='refine', points=5, rounds=3)
+        assert refined['optimum']['predicted_yield'] >= coarse['optimum']['predicted_yield']
+        assert refined['candidates_evaluated'] > coarse['candidates_evaluated']
+
+
+def test_refine_closes_in_on_a_smooth_optimum():
+    target = np.array([133.0, 71.0])
+
+    def evaluate(candidates):
+        return {'predicted': -np.square(candidates - target).sum(axis=1)}
+
+    ranges = {'nitrogen': (40.0, 250.0), 'phosphorus': (15.0, 120.0)}
+    grid = search(evaluate, ranges, method='grid', points=5)
+    refined = search(evaluate, ranges, method='refine', points=5, rounds=4)
+
+    grid_best = grid['candidates'][grid['order'][0]]
+    refined_best = refined['candidates'][refined['order'][0]]
+    assert np.abs(refined_best - target).max() < np.abs(grid_best - target).max()
+
+
+@pytest.mark.parametrize('ranges, message', [
+    ({'sulphur': (0, 10)}, 'Cannot optimize'),
+    ({'nitrogen': (100, 50)}, 'Invalid range'),
+    ({'nitrogen': (-5, 50)}, 'Invalid range'),
+    ({'nitrogen': ('low', 'high')}, 'could not convert'),
+    ({'nitrogen': (50,)}, 'not enough values'),
+])
+def test_malformed_ranges_are_rejected(ranges, message):
+    with pytest.raises(ValueError, match=message):
+        parse_ranges(ranges)
+
+
+def test_ranges_follow_the_input_order():
+    parsed = parse_ranges({'irrigation': (0, 100), 'nitrogen': ['40', '120']})
+    assert parsed == {'nitrogen': (40.0, 120.0), 'irrigation': (0.0, 100.0)}
+    assert parse_ranges() == DEFAULT_INPUT_RANGES
@@ -0,0 +1,39 @@
+# Crop-conditioned yields in recommend_crops: one shared row, one forest call
+
+import numpy as np
+
+from conftest import SAMPLE_INPUTS
+
+
+def _crop_yield_model_output(predictor, conditions, crops):
+    """crop_yield_model evaluated directly on the shared scaled row plus each crop code"""
+    features = predictor._prepare_batch([conditions])[0]
+    codes, _ = predictor.encoding.crop.encode(crops)
+    shared = predictor.scaler.transform(features)
+    return predictor.crop_yield_model.predict(np.column_stack([np.repeat(shared, len(crops), axis=0), codes]))
+
+
+def test_yield_depends_on_the_crop(predictor):
+    for conditions in SAMPLE_INPUTS:
+        recommendations = predictor.recommend_crops(conditions)['recommendations']
+        assert len({rec['predicted_yield'] for rec in recommendations}) > 1
+
+    crop_yields = predictor.predict_crop_yields(SAMPLE_INPUTS[0], crops=['Rice', 'Wheat', 'Sugarcane'])
+    assert crop_yields['crop_conditioned']
+    assert len({row['predicted_yield'] for row in crop_yields['crop_yields']}) == 3
+
+
+def test_recommended_yields_match_the_crop_yield_model(predictor):
+    for conditions, result in zip(SAMPLE_INPUTS, predictor.recommend_crops_batch(SAMPLE_INPUTS)):
+        crops = [rec['crop'] for rec in result['recommendations']]
+        expected = _crop_yield_model_output(predictor, conditions, crops)
+        assert [rec['predicted_yield'] for rec in result['recommendations']] == \
+            [round(float(value), 0) for value in expected]
+
+
+def test_predict_crop_yields_matches_the_crop_yield_model(predictor):
+    crops = list(predictor.encoding.crop.classes_)
+    result = predictor.predict_crop_yields(SAMPLE_INPUTS[2], crops=crops)
+    expected = _crop_yield_model_output(predictor, SAMPLE_INPUTS[2], crops)
+    assert [row['predicted_yield'] for row in result['crop_yields']] == \
+        [round(float(value), 0) for value in expected]
@@ -0,0 +1,88 @@
+# Persistent server: newline-delimited JSON requests and responses
+
+import io
+import json
+import time
+
+import pytest
+
+from ml_predictor import AgriSmartMLPredictor
+from ml_server import PredictionServer
+
+from conftest import SAMPLE_INPUTS
+
+
+@pytest.fixture
+def server(trained_model_dir):
+    server = PredictionServer(lambda: AgriSmartMLPredictor(model_path=str(trained_model_dir)), workers=2)
+    server.start()
+    return server
+
+
+def _serve(server, requests):
+    """Run the stdio loop over request lines; responses by id"""
+    lines = [request if isinstance(request, str) else json.dumps(request) for request in requests]
+    out = io.StringIO()
+    server.serve_stdio(io.StringIO('\n'.join(lines) + '\n'), out)
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    return {response['id']: response for response in responses}, responses
+
+
+def test_requests_are_answered_by_id(server):
+    direct = AgriSmartMLPredictor(model_path=server.predictor.model_path)
+    by_id, responses = _serve(server, [
+        {'id': i, 'command': 'predict_yield', 'data': data} for i, data in enumerate(SAMPLE_INPUTS)
+    ] + [{'id': 'rec', 'command': 'recommend_crops', 'data': SAMPLE_INPUTS[0]}])
+
+    assert len(responses) == len(SAMPLE_INPUTS) + 1
+    for i, data in enumerate(SAMPLE_INPUTS):
+        assert by_id[i] == {'id': i, 'ok': True, 'result': direct.predict_yield(data)}
+    assert by_id['rec']['result'] == direct.recommend_crops(SAMPLE_INPUTS[0])
+    assert server.requests_served == len(responses) and server.in_flight == 0
+
+
+def test_errors_are_responses_not_crashes(server):
+    by_id, responses = _serve(server, [
+        '{not json',
+        {'id': 1, 'command': 'teleport'},
+        {'id': 2, 'command': 'predict_yield', 'data': {'crop': 'Rice', 'temperature': 'hot'}},
+        {'id': 3, 'command': 'health'},
+    ])
+
+    assert by_id[None]['ok'] is False and by_id[None]['error'].startswith('Invalid JSON')
+    assert by_id[1] == {'id': 1, 'ok': False, 'error': 'Unknown command: teleport'}
+    assert by_id[2]['ok'] is False and 'error' in by_id[2]['result']
+    health = by_id[3]['result']
+    assert health['ready'] and health['bundle_version'] == server.predictor.bundle_version
+    assert server.requests_failed == 2
+
+
+def test_shutdown_stops_reading(server):
+    by_id, responses = _serve(server, [
+        {'id': 1, 'command': 'ready'},
+        {'id': 2, 'command': 'shutdown'},
+        {'id': 3, 'command': 'ready'},
+    ])
+    assert by_id[1]['result'] == {'ready': True}
+    assert by_id[2]['result'] == {'status': 'shutting_down'}
+    assert 3 not in by_id
+
+
+def test_predictions_wait_for_models(trained_model_dir):
+    server = PredictionServer(lambda: AgriSmartMLPredictor(model_path=str(trained_model_dir)))
+    response = server.handle({'id': 1, 'command': 'predict_yield', 'data': SAMPLE_INPUTS[0]})
+    assert response == {'id': 1, 'ok': False, 'error': 'Models are not loaded yet'}
+    server.executor.shutdown()
+
+
+def test_reload_swaps_in_a_fresh_predictor(server):
+    previous, loaded_at = server.predictor, server.loaded_at
+    assert server.handle({'id': 1, 'command': 'reload'})['result'] == {'status': 'reload_started'}
+
+    deadline = time.time() + 30
+    while server.reloading and time.time() < deadline:
+        time.sleep(0.01)
+    assert server.predictor is not previous
+    assert server.loaded_at > loaded_at and server.last_reload_error is None
+    assert server.handle({'id': 2, 'command': 'predict_yield', 'data': SAMPLE_INPUTS[0]})['ok']
+    server._close()
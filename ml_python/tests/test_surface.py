@@ -0,0 +1,90 @@
+# Recommendation surface: validation covers per-crop values, answers stay in bounds
+
+import numpy as np
+import pytest
+
+from ml_predictor import NUMERIC_INPUTS, AgriSmartMLPredictor
+from ml_surface import SURFACE_METHODS, parse_axes
+
+# Two grid points per axis, in a small box so interpolation stays close to the forests
+AXES = 'temperature=24:26:2,humidity=64:66:2,rainfall=790:810:2,ph=6.7:6.9:2,' \
+       'nitrogen=118:122:2,phosphorus=58:62:2,potassium=78:82:2'
+BOUNDS = (0.3, 0.1)
+
+
+def _inputs(locations, n, seed=0):
+    rng = np.random.default_rng(seed)
+    axes = parse_axes(AXES, NUMERIC_INPUTS)
+    rows = []
+    for i in range(n):
+        state, district = locations[i % len(locations)]
+        rows.append({'state': state, 'district': district,
+                     **{name: float(rng.uniform(low, high)) for name, (low, high, _) in axes.items()}})
+    return rows
+
+
+@pytest.fixture
+def surface_predictor(model_dir):
+    predictor = AgriSmartMLPredictor(model_path=str(model_dir), surface='multilinear', cache_size=0)
+    predictor.surface_bounds = BOUNDS
+    predictor.ensure_models()
+    locations = predictor.encoding.district_locations()[:2]
+    validation = predictor.precompute_surface(axes=parse_axes(AXES, NUMERIC_INPUTS), locations=locations,
+                                              validation_samples=50)
+    return predictor, validation, locations
+
+
+def test_validation_reports_per_crop_errors(surface_predictor):
+    _, validation, locations = surface_predictor
+    for method in SURFACE_METHODS:
+        errors = validation[method]
+        for name in ('yield_error', 'probability_error', 'crop_yield_error', 'crop_confidence_error'):
+            assert len(errors[name]) == len(locations)
+    assert validation['active']['multilinear'] == len(locations)
+
+
+def test_interpolated_answers_stay_within_the_bounds(surface_predictor, model_dir):
+    predictor, _, locations = surface_predictor
+    live = AgriSmartMLPredictor(model_path=str(model_dir), cache_size=0)
+    inputs = _inputs(locations, 40)
+    max_yield_error, max_probability_error = BOUNDS
+
+    yield_errors, crop_yield_errors, confidence_errors = [], [], []
+    for served, expected in zip(predictor.recommend_crops_batch(inputs), live.recommend_crops_batch(inputs)):
+        assert served['model_info']['surface'] == 'multilinear'
+        live_crops = {rec['crop']: rec for rec in expected['recommendations']}
+        for rec in served['recommendations']:
+            if rec['crop'] in live_crops:
+                reference = live_crops[rec['crop']]
+                crop_yield_errors.append(abs(rec['predicted_yield'] - reference['predicted_yield']) /
+                                         max(reference['predicted_yield'], 1))
+                confidence_errors.append(abs(rec['confidence'] - reference['confidence']) / 100)
+    for served, expected in zip(predictor.predict_yield_batch(inputs), live.predict_yield_batch(inputs)):
+        assert served['model_info']['surface'] == 'multilinear'
+        yield_errors.append(abs(served['predicted_yield'] - expected['predicted_yield']) /
+                            max(expected['predicted_yield'], 1))
+
+    # Validation bounds the 95th percentile of each error
+    assert crop_yield_errors
+    assert np.quantile(yield_errors, 0.95) <= max_yield_error
+    assert np.quantile(crop_yield_errors, 0.95) <= max_yield_error
+    assert np.quantile(confidence_errors, 0.95) <= max_probability_error
+
+
+def test_per_crop_errors_gate_locations(surface_predictor):
+    predictor, validation, locations = surface_predictor
+    errors = validation['multilinear']
+    # A bound that every predict_yield error meets, but per-crop yields do not
+    bound = max(errors['yield_error'])
+    assert max(errors['crop_yield_error']) > bound
+    active = predictor.surface.enable('multilinear', bound, 1.0)
+    assert active == sum(error <= bound for error in errors['crop_yield_error']) < len(locations)
+
+
+def test_surfaces_without_per_crop_validation_do_not_serve(surface_predictor):
+    predictor, _, _ = surface_predictor
+    surface = predictor.surface
+    for errors in surface.manifest['validation'].values():
+        if isinstance(errors, dict):
+            errors.pop('crop_yield_error', None)
+    assert surface.enable('multilinear', *BOUNDS) == 0
@@ -0,0 +1,113 @@
+# Synthetic data: vectorized factors match the original per-row rules, reproducible streams
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_synthetic_data import (BASE_YIELDS, CROPS, DEFAULT_BASE_YIELD, DEFAULT_RAINFALL_RANGE,
+                               DEFAULT_TEMPERATURE_RANGE, ENVIRONMENT_DISTRIBUTIONS, MIN_YIELD, RAINFALL_PREFS,
+                               SOIL_SUITABILITY, SOIL_TYPES, TEMPERATURE_PREFS, YIELD_NOISE_STD,
+                               generate_synthetic_data, humidity_factor, iter_synthetic_chunks, nutrient_factor,
+                               ph_factor, rainfall_factor, temperature_factor, write_synthetic_data)
+
+
+# The per-row rules the generator used before it was vectorized
+def _scalar_range(value, opt_min, opt_max, low_rate, low_floor, high_rate, high_floor):
+    if opt_min <= value <= opt_max:
+        return 1.0
+    elif value < opt_min:
+        return max(low_floor, 1 - (opt_min - value) * low_rate)
+    else:
+        return max(high_floor, 1 - (value - opt_max) * high_rate)
+
+
+def _scalar_nutrient(n, p, k):
+    n_factor = min(1.0, n / 100) if n > 0 else 0.3
+    p_factor = min(1.0, p / 50) if p > 0 else 0.3
+    k_factor = min(1.0, k / 60) if k > 0 else 0.3
+    return (n_factor + p_factor + k_factor) / 3
+
+
+def _scalar_yield(crop, soil, env, noise):
+    temp_range = TEMPERATURE_PREFS.get(crop, DEFAULT_TEMPERATURE_RANGE)
+    rain_range = RAINFALL_PREFS.get(crop, DEFAULT_RAINFALL_RANGE)
+    value = (BASE_YIELDS.get(crop, DEFAULT_BASE_YIELD)
+             * _scalar_range(env['temperature'], *temp_range, 0.05, 0.3, 0.05, 0.3)
+             * _scalar_range(env['humidity'], 50, 80, 0.02, 0.4, 0.01, 0.6)
+             * _scalar_range(env['rainfall'], *rain_range, 0.0005, 0.3, 0.0003, 0.7)
+             * _scalar_range(env['ph'], 6.0, 7.5, 0.1, 0.4, 0.08, 0.5)
+             * SOIL_SUITABILITY.get(soil, 0.7)
+             * _scalar_nutrient(env['nitrogen'], env['phosphorus'], env['potassium']))
+    return max(MIN_YIELD, value * noise)
+
+
+def _baseline_rows(n_samples, seed):
+    """The original row-at-a-time generator (legacy global-seed stream, minus the location columns)"""
+    rng = np.random.RandomState(seed)
+    rows = []
+    for _ in range(n_samples):
+        crop, soil = rng.choice(CROPS), rng.choice(SOIL_TYPES)
+        env = {column: float(np.clip(rng.normal(mean, std), low, high))
+               for column, (mean, std, low, high, _) in ENVIRONMENT_DISTRIBUTIONS.items()}
+        rows.append({'crop': crop, 'yield_kg_ha': _scalar_yield(crop, soil, env, rng.normal(1.0, YIELD_NOISE_STD))})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize('factor, scalar', [
+    (lambda v: temperature_factor(v, 20, 35), lambda v: _scalar_range(v, 20, 35, 0.05, 0.3, 0.05, 0.3)),
+    (humidity_factor, lambda v: _scalar_range(v, 50, 80, 0.02, 0.4, 0.01, 0.6)),
+    (lambda v: rainfall_factor(v, 1000, 1500), lambda v: _scalar_range(v, 1000, 1500, 0.0005, 0.3, 0.0003, 0.7)),
+    (ph_factor, lambda v: _scalar_range(v, 6.0, 7.5, 0.1, 0.4, 0.08, 0.5)),
+])
+def test_range_factors_match_the_scalar_rules(factor, scalar):
+    # Inside, on and around both optimum edges, and far enough out to reach the floors
+    probes = [0, 4.5, 5.9, 6.0, 6.8, 7.5, 7.6, 15, 19.9, 20, 27, 35, 35.1, 40, 49, 50, 65, 80, 81, 95, 200,
+              999, 1000, 1200, 1500, 1501, 1800, 5000, 1e5]
+    np.testing.assert_allclose(factor(np.array(probes)), [scalar(v) for v in probes], rtol=0, atol=1e-12)
+    assert factor(probes[5]) == scalar(probes[5])
+
+
+def test_nutrient_factor_matches_the_scalar_rule():
+    n, p, k = np.meshgrid([0, 40, 100, 250], [0, 15, 50, 120], [-1, 20, 60, 180])
+    expected = [_scalar_nutrient(*values) for values in zip(n.ravel(), p.ravel(), k.ravel())]
+    np.testing.assert_allclose(nutrient_factor(n.ravel(), p.ravel(), k.ravel()), expected, rtol=0, atol=1e-12)
+
+
+def test_chunks_reproduce_and_files_round_trip(tmp_path):
+    first = pd.concat(iter_synthetic_chunks(2500, seed=7, chunk_size=1000), ignore_index=True)
+    again = generate_synthetic_data(2500, seed=7, chunk_size=1000)
+    pd.testing.assert_frame_equal(first, again)
+    assert [len(chunk) for chunk in iter_synthetic_chunks(2500, seed=7, chunk_size=1000)] == [1000, 1000, 500]
+    assert not generate_synthetic_data(2500, seed=8, chunk_size=1000).equals(first)
+
+    expected = first.astype({column: str for column in ('crop', 'state', 'district', 'soil_type')})
+    for name in ('rows.csv', 'rows.parquet'):
+        path = tmp_path / name
+        assert write_synthetic_data(path, 2500, seed=7, chunk_size=1000) == 2500
+        written = pd.read_csv(path) if name.endswith('.csv') else pd.read_parquet(path)
+        written = written.astype({column: str for column in ('crop', 'state', 'district', 'soil_type')})
+        pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+
+
+def test_yields_and_crop_frequencies_stay_in_the_baseline_ranges():
+    data = generate_synthetic_data(20000, seed=42)
+    baseline = _baseline_rows(20000, seed=42)
+
+    # Environmental columns inside their clip bounds
+    for column, (_, _, low, high, _) in ENVIRONMENT_DISTRIBUTIONS.items():
+        assert data[column].between(low, high).all(), column
+
+    # Every crop about equally often, as with the per-row draws
+    for frame in (data, baseline):
+        counts = frame['crop'].value_counts()
+        assert set(counts.index) == set(CROPS)
+        assert counts.min() > 0.75 * len(frame) / len(CROPS) and counts.max() < 1.25 * len(frame) / len(CROPS)
+
+    # Per crop, yields span the same range relative to the crop's base yield
+    for frame in (data, baseline):
+        frame['relative'] = frame['yield_kg_ha'] / frame['crop'].astype(str).map(BASE_YIELDS)
+    assert data['yield_kg_ha'].min() >= MIN_YIELD
+    new = data.assign(crop=data['crop'].astype(str)).groupby('crop')['relative']
+    old = baseline.groupby('crop')['relative']
+    assert (new.max() <= old.max().max() * 1.2).all()
+    np.testing.assert_allclose(new.median(), old.median()[new.median().index], rtol=0.1)
@@ -0,0 +1,73 @@
+# Hyperparameter search: successive halving, selection and `train --params`
+
+import json
+import sys
+
+import pytest
+
+import ml_predictor
+import ml_tuning
+from ml_bundle import CURRENT_POINTER
+from ml_predictor import AgriSmartMLPredictor
+from ml_synthetic_data import generate_synthetic_data
+
+GRID = {'n_estimators': [4, 8], 'max_depth': [6]}
+
+
+def _row(task, predict_ms, cv_mean, pruned=False):
+    return {'task': task, 'metric': 'r2', 'params': {'predict_ms': predict_ms}, 'cv_mean': cv_mean,
+            'pruned': pruned, 'predict_ms': predict_ms}
+
+
+@pytest.fixture(scope='module')
+def leaderboard(tmp_path_factory):
+    df = generate_synthetic_data(n_samples=300, seed=5)
+    X = df[['temperature', 'humidity', 'rainfall', 'ph', 'nitrogen', 'phosphorus', 'potassium']].to_numpy()
+    y_crop = df['crop'].astype('category').cat.codes.to_numpy()
+    path = ml_tuning.cache_dataset(str(tmp_path_factory.mktemp('tuning')), X, df['yield_kg_ha'], y_crop, folds=2)
+    return ml_tuning.run_search(path, grid=GRID, workers=1, folds=2)
+
+
+def test_every_task_is_searched_and_the_weaker_half_pruned(leaderboard):
+    assert len(leaderboard) == 2 * len(ml_tuning.TASKS)
+    for task in ml_tuning.TASKS:
+        rows = [row for row in leaderboard if row['task'] == task]
+        kept, pruned = rows
+        # Survivors are listed first and ran every fold; pruned rows stop after fold 1
+        assert (kept['pruned'], kept['folds']) == (False, 2)
+        assert (pruned['pruned'], pruned['folds']) == (True, 1)
+
+
+def test_selection_prefers_the_fastest_row_meeting_the_target():
+    rows = [
+        _row('yield', predict_ms=3.0, cv_mean=0.90),
+        _row('yield', predict_ms=1.0, cv_mean=0.85),
+        _row('yield', predict_ms=2.0, cv_mean=0.89),
+        _row('yield', predict_ms=0.5, cv_mean=0.95, pruned=True),
+    ]
+    assert ml_tuning.select_configs(rows)['yield']['predict_ms'] == 2.0
+    assert ml_tuning.select_configs(rows, {'yield': 0.8})['yield']['predict_ms'] == 1.0
+    # Nothing reaches the target: the best fully validated row
+    assert ml_tuning.select_configs(rows, {'yield': 0.99})['yield']['predict_ms'] == 3.0
+
+
+def test_tuned_parameters_replace_the_defaults(tmp_path):
+    predictor = AgriSmartMLPredictor(model_path=str(tmp_path))
+    predictor.train_models(n_samples=200, seed=2, forest_params={'yield': {'n_estimators': 7}})
+
+    assert len(predictor.yield_model.estimators_) == 7
+    # Not the trainer's min_samples_split=5: the search never scored it
+    assert predictor.yield_model.min_samples_split == 2
+    assert predictor.training_stats['forest_params']['recommendation'] == \
+        ml_predictor.RECOMMENDATION_FOREST_PARAMS
+
+
+def test_train_rejects_parameters_tuned_for_another_backend(tmp_path, monkeypatch):
+    params = tmp_path / 'leaderboard.json'
+    params.write_text(json.dumps({'backend': 'hist_gradient_boosting', 'selected': {}}))
+    monkeypatch.setattr(ml_predictor, 'MODEL_DIR', str(tmp_path / 'models'))
+    monkeypatch.setattr(sys, 'argv', ['ml_predictor.py', 'train', '200', '--params', str(params)])
+
+    with pytest.raises(ValueError, match='tuned for hist_gradient_boosting'):
+        ml_predictor.main()
+    assert not (tmp_path / 'models' / CURRENT_POINTER).exists()
@@ -0,0 +1,41 @@
+# Vectorized per-tree uncertainty against a plain loop over the forest's trees
+
+import numpy as np
+
+from ml_predictor import YIELD_QUANTILES, ForestUncertainty, summarize_tree_predictions
+
+from conftest import SAMPLE_INPUTS
+
+
+def _loop_per_tree(model, X):
+    return np.array([tree.predict(X) for tree in model.estimators_])
+
+
+def test_tree_matrix_matches_each_tree(predictor):
+    features = predictor._prepare_batch(SAMPLE_INPUTS)[0]
+    X = predictor.scaler.transform(features)
+    model = predictor.yield_model
+
+    per_tree = ForestUncertainty(model).tree_predictions(X)
+    expected = _loop_per_tree(model, X)
+    assert per_tree.shape == (len(X), len(model.estimators_))
+    np.testing.assert_allclose(per_tree, expected.T)
+
+    summary = summarize_tree_predictions(per_tree)
+    np.testing.assert_allclose(summary['predicted'], model.predict(X))
+    np.testing.assert_allclose(summary['std_dev'], np.std(expected, axis=0))
+    np.testing.assert_allclose(summary['quantiles'], np.quantile(expected, YIELD_QUANTILES, axis=0))
+
+
+def test_batch_uncertainty_matches_the_tree_loop(predictor):
+    features = predictor._prepare_batch(SAMPLE_INPUTS)[0]
+    expected = _loop_per_tree(predictor.yield_model, predictor.scaler.transform(features))
+    std_dev = np.std(expected, axis=0)
+    quantiles = np.quantile(expected, YIELD_QUANTILES, axis=0)
+
+    for row, result in enumerate(predictor.predict_yield_batch(SAMPLE_INPUTS)):
+        assert result['predicted_yield'] == round(float(expected[:, row].mean()), 0)
+        assert result['uncertainty']['std_dev'] == round(float(std_dev[row]), 1)
+        assert result['uncertainty']['quantiles'] == {
+            f'p{int(q * 100)}': round(float(v), 0) for q, v in zip(YIELD_QUANTILES, quantiles[:, row])
+        }
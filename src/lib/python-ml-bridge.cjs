@@ -4,12 +4,170 @@
 const { spawn } = require('child_process');
 const path = require('path');
 
+// After a `serve` worker dies before answering anything (e.g. no trained bundle),
+// requests go straight to one-shot processes for this long, doubling up to the max
+const WORKER_RETRY_MS = 5000;
+const WORKER_RETRY_MAX_MS = 60000;
+
 class PythonMLBridge {
     constructor() {
         this.pythonPath = 'python'; // Adjust if needed (python3, full path, etc.)
         this.scriptPath = path.join(__dirname, '../../ml_python/ml_predictor.py');
         this.isTraining = false;
         this.isInitialized = false;
+
+        // Persistent `serve` worker - models stay loaded between requests
+        this.worker = null;
+        this.nextRequestId = 1;
+        // Set while a worker that failed to start is not retried (see WORKER_RETRY_MS)
+        this.workerRetryAt = 0;
+        this.workerRetryMs = WORKER_RETRY_MS;
+    }
+
+    startWorker() {
+        if (this.worker) return this.worker;
+
+        const worker = spawn(this.pythonPath, [this.scriptPath, 'serve']);
+        this.worker = worker;
+        // Requests in flight on this worker; rejected when it exits, even after stopWorker
+        const pendingRequests = new Map();
+        worker.pendingRequests = pendingRequests;
+        let buffer = '';
+        let answered = false;
+
+        worker.stdout.on('data', (data) => {
+            buffer += data.toString();
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline).trim();
+                buffer = buffer.slice(newline + 1);
+                if (!line) continue;
+
+                try {
+                    const response = JSON.parse(line);
+                    answered = true;
+                    this.workerRetryMs = WORKER_RETRY_MS;
+                    const pending = pendingRequests.get(response.id);
+                    if (!pending) continue;
+                    pendingRequests.delete(response.id);
+
+                    if (response.ok || response.result) {
+                        pending.resolve(response.result);
+                    } else {
+                        // The worker is up and answered; this is not a transport failure
+                        const error = new Error(response.error || 'Python worker request failed');
+                        error.fromWorker = true;
+                        pending.reject(error);
+                    }
+                } catch (parseError) {
+                    console.error('Failed to parse Python worker output:', parseError);
+                }
+            }
+        });
+
+        worker.stderr.on('data', (data) => {
+            console.error('Python Worker:', data.toString());
+        });
+
+        let exited = false;
+        const handleExit = (reason) => {
+            if (exited) return;
+            exited = true;
+            for (const pending of pendingRequests.values()) {
+                pending.reject(new Error(`Python worker exited: ${reason}`));
+            }
+            pendingRequests.clear();
+            if (this.worker !== worker) return;
+            this.worker = null;
+
+            if (!answered) {
+                // Died before answering anything: do not respawn it on every request
+                this.workerRetryAt = Date.now() + this.workerRetryMs;
+                console.error(`Python worker failed to start; using one-shot processes for ${this.workerRetryMs} ms`);
+                this.workerRetryMs = Math.min(this.workerRetryMs * 2, WORKER_RETRY_MAX_MS);
+            }
+        };
+
+        worker.on('close', (code) => handleExit(`code ${code}`));
+        worker.on('error', (error) => handleExit(error.message));
+        // Writing to a worker that already died (EPIPE) must not crash the Node process
+        worker.stdin.on('error', (error) => handleExit(`stdin ${error.message}`));
+
+        return worker;
+    }
+
+    sendToWorker(command, data) {
+        const worker = this.startWorker();
+        const id = this.nextRequestId++;
+
+        return new Promise((resolve, reject) => {
+            worker.pendingRequests.set(id, { resolve, reject });
+            worker.stdin.write(JSON.stringify({ id, command, data }) + '\n');
+        });
+    }
+
+    reloadWorker() {
+        // New models may fix what kept the worker from starting
+        this.workerRetryAt = 0;
+        this.workerRetryMs = WORKER_RETRY_MS;
+        // A running worker swaps in the new bundle in the background; one started later loads it anyway
+        if (!this.worker) return;
+        this.sendToWorker('reload', {}).catch((error) => {
+            console.error('Python worker reload failed, restarting worker:', error.message);
+            this.stopWorker();
+        });
+    }
+
+    stopWorker() {
+        if (!this.worker) return;
+        this.worker.stdin.write(JSON.stringify({ id: 0, command: 'shutdown' }) + '\n');
+        this.worker.stdin.end();
+        this.worker = null;
+    }
+
+    async runPython(command, inputJson) {
+        // Prefer the warm worker; fall back to a one-shot process only if it cannot be
+        // reached (errors it answers with are final), or while it is failing to start
+        if (Date.now() >= this.workerRetryAt) {
+            try {
+                return await this.sendToWorker(command, JSON.parse(inputJson));
+            } catch (workerError) {
+                if (workerError.fromWorker) throw workerError;
+                console.error('Python worker unavailable, spawning one-shot process:', workerError.message);
+            }
+        }
+
+        return new Promise((resolve, reject) => {
+            const python = spawn(this.pythonPath, [
+                this.scriptPath,
+                command,
+                inputJson
+            ]);
+
+            let output = '';
+            let errorOutput = '';
+
+            python.stdout.on('data', (data) => {
+                output += data.toString();
+            });
+
+            python.stderr.on('data', (data) => {
+                errorOutput += data.toString();
+            });
+
+            python.on('close', (code) => {
+                if (code === 0) {
+                    try {
+                        const result = JSON.parse(output.trim());
+                        resolve(result);
+                    } catch (parseError) {
+                        reject(new Error(`Failed to parse Python output: ${parseError}`));
+                    }
+                } else {
+                    reject(new Error(`Python ${command} failed: ${errorOutput}`));
+                }
+            });
+        });
     }
 
     async initialize() {
@@ -37,8 +195,9 @@ class PythonMLBridge {
 
     async checkModelsExist() {
         const fs = require('fs');
-        const modelPath = path.join(__dirname, '../../ml_python/models/yield_model.pkl');
-        return fs.existsSync(modelPath);
+        // The active versioned bundle is named by models/CURRENT
+        const bundlePointer = path.join(__dirname, '../../ml_python/models/CURRENT');
+        return fs.existsSync(bundlePointer);
     }
 
     async trainModels() {
@@ -74,6 +233,7 @@ class PythonMLBridge {
                 
                 if (code === 0) {
                     console.log('✅ Python ML models trained successfully!');
+                    this.reloadWorker();
                     resolve(output);
                 } else {
                     console.error('❌ Python training failed with code:', code);
@@ -99,37 +259,7 @@ class PythonMLBridge {
                 potassium: inputData.potassium || 80
             });
 
-            return new Promise((resolve, reject) => {
-                const python = spawn(this.pythonPath, [
-                    this.scriptPath, 
-                    'predict_yield', 
-                    inputJson
-                ]);
-
-                let output = '';
-                let errorOutput = '';
-
-                python.stdout.on('data', (data) => {
-                    output += data.toString();
-                });
-
-                python.stderr.on('data', (data) => {
-                    errorOutput += data.toString();
-                });
-
-                python.on('close', (code) => {
-                    if (code === 0) {
-                        try {
-                            const result = JSON.parse(output.trim());
-                            resolve(result);
-                        } catch (parseError) {
-                            reject(new Error(`Failed to parse Python output: ${parseError}`));
-                        }
-                    } else {
-                        reject(new Error(`Python prediction failed: ${errorOutput}`));
-                    }
-                });
-            });
+            return await this.runPython('predict_yield', inputJson);
 
         } catch (error) {
             console.error('❌ Yield prediction error:', error);
@@ -153,37 +283,7 @@ class PythonMLBridge {
                 potassium: inputData.potassium || 80
             });
 
-            return new Promise((resolve, reject) => {
-                const python = spawn(this.pythonPath, [
-                    this.scriptPath,
-                    'recommend_crops',
-                    inputJson
-                ]);
-
-                let output = '';
-                let errorOutput = '';
-
-                python.stdout.on('data', (data) => {
-                    output += data.toString();
-                });
-
-                python.stderr.on('data', (data) => {
-                    errorOutput += data.toString();
-                });
-
-                python.on('close', (code) => {
-                    if (code === 0) {
-                        try {
-                            const result = JSON.parse(output.trim());
-                            resolve(result);
-                        } catch (parseError) {
-                            reject(new Error(`Failed to parse Python output: ${parseError}`));
-                        }
-                    } else {
-                        reject(new Error(`Python recommendation failed: ${errorOutput}`));
-                    }
-                });
-            });
+            return await this.runPython('recommend_crops', inputJson);
 
         } catch (error) {
             console.error('❌ Crop recommendation error:', error);
@@ -266,11 +366,15 @@ class PythonMLBridge {
     async getModelInfo() {
         try {
             const fs = require('fs');
-            const statsPath = path.join(__dirname, '../../ml_python/models/training_stats.json');
+            const modelDir = path.join(__dirname, '../../ml_python/models');
+            const bundlePointer = path.join(modelDir, 'CURRENT');
             
-            if (fs.existsSync(statsPath)) {
-                const stats = JSON.parse(fs.readFileSync(statsPath, 'utf8'));
+            if (fs.existsSync(bundlePointer)) {
+                const bundleName = fs.readFileSync(bundlePointer, 'utf8').trim();
+                const manifest = JSON.parse(fs.readFileSync(path.join(modelDir, bundleName, 'manifest.json'), 'utf8'));
+                const stats = manifest.training_stats;
                 return {
+                    bundle_version: manifest.version,
                     algorithm: 'Python Random Forest (Scikit-learn)',
                     training_samples: stats.training_samples,
                     num_crops: stats.num_crops,
@@ -49,6 +49,8 @@ async function testPythonML() {
 
     } catch (error) {
         console.error('❌ Test failed:', error);
+    } finally {
+        WebMLPredictor.stopWorker();
     }
 }
 